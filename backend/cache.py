@@ -0,0 +1,283 @@
+"""
+Caches for work that is expensive to repeat.
+
+ExtractionCache maps an upload's SHA-256 (plus file type and extractor
+version) to the extracted text, so re-uploading the same resume skips
+extraction. LLMResponseCache maps normalized resume text (plus model and
+prompt version) to the model's cleaned text, so re-processing costs no
+LLM call. Both look in an in-process LRU first and then in MongoDB.
+SingleFlight makes concurrent requests for the same key share one call,
+including its progress reports.
+"""
+import re
+import time
+import asyncio
+import hashlib
+import logging
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from extraction import ExtractionResult, EXTRACTOR_VERSION
+
+logger = logging.getLogger(__name__)
+
+# How many writes between checks of the persistent tier's entry count
+EVICTION_CHECK_INTERVAL = 50
+# Keys of the persistent tier's one index (besides _id): TTL expiry and eviction order
+CREATED_AT_INDEX = [("created_at", 1)]
+# Eviction order: oldest entries first
+EVICTION_SORT = [("created_at", 1)]
+
+class LRUCache:
+    """In-process LRU cache bounded by the total size of its entries"""
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int] = len, ttl_seconds: float = None):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.ttl_seconds = ttl_seconds
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, _, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            self.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        self.pop(key)
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        self._entries[key] = (value, size, expires_at)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+
+    def pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[1]
+
+class TwoTierCache(ABC):
+    """Memory LRU in front of a MongoDB collection, with optional TTL and entry cap"""
+
+    def __init__(self, collection, max_bytes: int, sizeof: Callable[[Any], int], enabled: bool = True,
+                 ttl_seconds: float = None, max_entries: int = None):
+        self.collection = collection
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory = LRUCache(max_bytes, sizeof=sizeof, ttl_seconds=ttl_seconds)
+        self._writes = 0
+        self._counters = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "evicted": 0}
+
+    @abstractmethod
+    def to_document(self, value: Any) -> Dict[str, Any]:
+        """The MongoDB fields stored for a value"""
+
+    @abstractmethod
+    def from_document(self, document: Dict[str, Any]) -> Any:
+        """The value stored in a MongoDB document"""
+
+    async def ensure_indexes(self):
+        """TTL index on created_at; also serves the oldest-first eviction query"""
+        if not self.enabled:
+            return
+        options = {"expireAfterSeconds": int(self.ttl_seconds)} if self.ttl_seconds else {}
+        try:
+            await self.collection.create_index(CREATED_AT_INDEX, **options)
+        except Exception as e:
+            logger.warning(f"Could not create cache index on {self.collection.name}: {e}")
+
+    async def lookup(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+
+        value = self.memory.get(key)
+        if value is not None:
+            self._counters["memory_hits"] += 1
+            return value
+
+        try:
+            document = await self.collection.find_one({"_id": key})
+        except Exception as e:
+            logger.warning(f"Cache lookup in {self.collection.name} failed: {e}")
+            document = None
+        # Mongo's TTL monitor only runs once a minute, so check expiry here too
+        if document is not None and self.ttl_seconds:
+            created_at = document["created_at"].replace(tzinfo=timezone.utc)
+            if created_at < datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds):
+                document = None
+        if document is None:
+            self._counters["misses"] += 1
+            return None
+
+        self._counters["mongo_hits"] += 1
+        value = self.from_document(document)
+        self.memory.put(key, value)
+        return value
+
+    async def store(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        self.memory.put(key, value)
+        try:
+            await self.collection.replace_one(
+                {"_id": key},
+                {**self.to_document(value), "created_at": datetime.now(timezone.utc)},
+                upsert=True
+            )
+            self._writes += 1
+            if self.max_entries and self._writes % EVICTION_CHECK_INTERVAL == 0:
+                await self._evict_oldest()
+        except Exception as e:
+            logger.warning(f"Cache write to {self.collection.name} failed: {e}")
+
+    async def _evict_oldest(self):
+        excess = await self.collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        oldest = self.collection.find({}, {"_id": 1}).sort(EVICTION_SORT).limit(excess)
+        ids = [document["_id"] async for document in oldest]
+        if ids:
+            result = await self.collection.delete_many({"_id": {"$in": ids}})
+            self._counters["evicted"] += result.deleted_count
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.current_bytes,
+            **self._counters,
+        }
+
+class ExtractionCache(TwoTierCache):
+    """Extracted upload text keyed by content hash"""
+
+    def __init__(self, collection, max_bytes: int = 64 * 1024 * 1024, enabled: bool = True,
+                 ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 100000):
+        # Bounded like the LLM cache: entries hold the full text of uploaded resumes
+        super().__init__(
+            collection, max_bytes, sizeof=lambda result: len(result.text), enabled=enabled,
+            ttl_seconds=ttl_seconds, max_entries=max_entries
+        )
+
+    @staticmethod
+    def key(content_hash: str, file_type: str) -> str:
+        return f"{content_hash}:{file_type}:{EXTRACTOR_VERSION}"
+
+    def to_document(self, result: ExtractionResult) -> Dict[str, Any]:
+        return {"text": result.text, "extraction_method": result.method, "quality": result.quality}
+
+    def from_document(self, document: Dict[str, Any]) -> ExtractionResult:
+        return ExtractionResult(document["text"], document["extraction_method"], document.get("quality"))
+
+    async def get(self, content_hash: str, file_type: str) -> Optional[ExtractionResult]:
+        return await self.lookup(self.key(content_hash, file_type))
+
+    async def put(self, content_hash: str, file_type: str, result: ExtractionResult):
+        await self.store(self.key(content_hash, file_type), result)
+
+class SingleFlight:
+    """Share one in-flight call among concurrent callers asking for the same key"""
+
+    def __init__(self):
+        self._calls = {}
+        # Progress callbacks of the callers sharing each call, and its latest report
+        self._reporters = {}
+        self._progress = {}
+        self._counters = {"started": 0, "shared": 0}
+
+    async def do(self, key: str, fn: Callable, *args, report_progress: Callable = None) -> Any:
+        """fn(*args), shared; with report_progress, fn also gets a callback reaching every sharing caller"""
+        if report_progress:
+            self._reporters.setdefault(key, []).append(report_progress)
+        try:
+            task = self._calls.get(key)
+            if task is None:
+                if report_progress:
+                    args = (*args, lambda *progress: self._report(key, *progress))
+                task = asyncio.ensure_future(fn(*args))
+                self._calls[key] = task
+                task.add_done_callback(lambda done: self._finish(key))
+                # If every caller went away, the failure is still handled
+                task.add_done_callback(lambda done: done.cancelled() or done.exception())
+                self._counters["started"] += 1
+            else:
+                self._counters["shared"] += 1
+                if report_progress and key in self._progress:
+                    await report_progress(*self._progress[key])
+            # One caller leaving must not cancel the call for the others
+            return await asyncio.shield(task)
+        finally:
+            if report_progress:
+                self._reporters[key].remove(report_progress)
+                if not self._reporters[key]:
+                    del self._reporters[key]
+
+    def _finish(self, key: str):
+        self._calls.pop(key, None)
+        self._progress.pop(key, None)
+
+    async def _report(self, key: str, *progress):
+        self._progress[key] = progress
+        for report_progress in list(self._reporters.get(key, ())):
+            try:
+                await report_progress(*progress)
+            except Exception as e:
+                # One caller's bookkeeping must not fail the call it shares
+                logger.warning(f"Progress report for {key} failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._calls), **self._counters}
+
+_BLANKS_RE = re.compile(r'[ \t]+')
+
+def normalize_llm_input(text: str) -> str:
+    """Normalize text so trivially different copies share a cache entry"""
+    text = unicodedata.normalize('NFC', text).replace('\r\n', '\n')
+    return "\n".join(_BLANKS_RE.sub(' ', line).strip() for line in text.split("\n")).strip()
+
+class LLMResponseCache(TwoTierCache):
+    """Cleaned text keyed by normalized input, model and prompt version"""
+
+    def __init__(self, collection, max_bytes: int = 32 * 1024 * 1024, enabled: bool = True,
+                 ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 100000):
+        super().__init__(
+            collection, max_bytes, sizeof=len, enabled=enabled,
+            ttl_seconds=ttl_seconds, max_entries=max_entries
+        )
+
+    @staticmethod
+    def key(text: str, model: str, prompt_version: str) -> str:
+        digest = hashlib.sha256()
+        for part in (normalize_llm_input(text), model, prompt_version):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def to_document(self, response: str) -> Dict[str, Any]:
+        return {"response": response}
+
+    def from_document(self, document: Dict[str, Any]) -> str:
+        return document["response"]
+
+    async def get(self, text: str, model: str, prompt_version: str) -> Optional[str]:
+        return await self.lookup(self.key(text, model, prompt_version))
+
+    async def put(self, text: str, model: str, prompt_version: str, response: str):
+        await self.store(self.key(text, model, prompt_version), response)
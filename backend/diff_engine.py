@@ -0,0 +1,331 @@
+"""
+Token diff for change detection.
+
+detect_word_changes used difflib.SequenceMatcher, whose autojunk heuristic
+ignores every token that makes up more than 1% of a long document (spaces,
+bullets, commas, "and") and so misaligns repetitive resumes. It also found
+each change's offset by re-joining all preceding tokens, which is
+quadratic. This engine interns tokens to integer ids and runs a histogram
+diff: a region is split around the longest common run through its rarest
+shared token, recursively. When every shared token is too common (a
+resume of near-identical bullets) the region is split near its diagonal
+instead. Small regions are solved exactly with Myers' O(ND) algorithm.
+token_offsets gives every token's character offset from one prefix sum.
+
+opcodes() has the shape of SequenceMatcher.get_opcodes().
+
+Long documents are diffed hierarchically: plan_document_diff matches whole
+lines first (most lines come back from the model untouched), anchoring on
+lines that are unique on both sides, and only the regions between
+unchanged lines get a word-level diff. The regions are
+independent, so region_blocks can run them in parallel in shards.
+"""
+import re
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import accumulate
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+TOKEN_RE = re.compile(r'\S+|\s+')
+LINE_RE = re.compile(r'[^\n]*\n|[^\n]+')
+
+# Tokens occurring more often than this in a region are never used as anchors
+MAX_CHAIN = 64
+# Regions with at most this many tokens (both sides together) go straight to Myers
+MYERS_REGION_TOKENS = 256
+# Edit distance past which Myers gives up and the region is reported as replaced
+MYERS_MAX_COST = 128
+
+Block = Tuple[int, int, int]  # (i, j, size): a[i:i + size] == b[j:j + size]
+Opcode = Tuple[str, int, int, int, int]
+Region = Tuple[List[int], List[int], int, int]  # token ids of a changed region on each side, and where they start
+
+def tokenize(text: str) -> List[str]:
+    """Words and the whitespace runs between them; joining the tokens gives back the text"""
+    return TOKEN_RE.findall(text)
+
+def token_offsets(tokens: Sequence[str]) -> List[int]:
+    """Character offset of every token, plus the total length at the end"""
+    return [0, *accumulate(map(len, tokens))]
+
+def intern_tokens(a: Sequence[str], b: Sequence[str]) -> Tuple[List[int], List[int]]:
+    """Map equal tokens to equal integers, so comparisons are int comparisons"""
+    ids: Dict[str, int] = {}
+    return [ids.setdefault(token, len(ids)) for token in a], [ids.setdefault(token, len(ids)) for token in b]
+
+def _myers(a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int,
+           max_cost: int = MYERS_MAX_COST) -> Optional[List[Block]]:
+    """Matching blocks of a shortest edit script, or None if it needs more than max_cost edits"""
+    n, m = ahi - alo, bhi - blo
+    max_d = min(n + m, max_cost)
+    offset = max_d + 1
+    v = [0] * (2 * offset + 1)
+    trace = []
+    for d in range(max_d + 1):
+        trace.append(v[:])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return _myers_blocks(trace, offset, n, m, alo, blo)
+    return None
+
+def _myers_blocks(trace: List[List[int]], offset: int, x: int, y: int, alo: int, blo: int) -> List[Block]:
+    """Walk the Myers trace back from the end, collecting the diagonal runs"""
+    blocks = []
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+            previous_k = k + 1
+        else:
+            previous_k = k - 1
+        previous_x = v[offset + previous_k]
+        previous_y = previous_x - previous_k
+        snake = min(x - previous_x, y - previous_y) if d else min(x, y)
+        if snake > 0:
+            blocks.append((alo + x - snake, blo + y - snake, snake))
+        x, y = previous_x, previous_y
+    blocks.reverse()
+    return blocks
+
+def _extend(a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int, i: int, j: int) -> Block:
+    """The common run through a[i] == b[j], as far as it goes both ways inside the region"""
+    start_i, start_j = i, j
+    while start_i > alo and start_j > blo and a[start_i - 1] == b[start_j - 1]:
+        start_i -= 1
+        start_j -= 1
+    end_i, end_j = i + 1, j + 1
+    while end_i < ahi and end_j < bhi and a[end_i] == b[end_j]:
+        end_i += 1
+        end_j += 1
+    return start_i, start_j, end_i - start_i
+
+def _histogram_anchor(a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int,
+                      occurrences: Dict[int, List[int]]) -> Optional[Block]:
+    """The longest common run through the rarest token the two regions share"""
+    # A token is as rare as its count on the more frequent side: one "the" in a
+    # against three in b is no anchor
+    b_counts = Counter(b[blo:bhi])
+
+    def count(token: int) -> int:
+        return max(len(occurrences[token]), b_counts[token])
+
+    # Cleaning edits are local, so the two sides never drift far from the
+    # proportional alignment; a repeated bullet far off it is a false match
+    slack = MAX_CHAIN + abs((ahi - alo) - (bhi - blo))
+    best, best_count = None, MAX_CHAIN
+    j = blo
+    while j < bhi:
+        if b[j] not in occurrences or count(b[j]) > best_count:
+            j += 1
+            continue
+        next_j = j + 1
+        expected = alo + (j - blo) * (ahi - alo) // (bhi - blo)
+        for i in occurrences[b[j]]:
+            if abs(i - expected) > slack:
+                continue
+            run = _extend(a, b, alo, ahi, blo, bhi, i, j)
+            # The run is as rare as its rarest token
+            run_count = min(count(token) for token in a[run[0]:run[0] + run[2]])
+            if best is None or run_count < best_count or (run_count == best_count and run[2] > best[2]):
+                best, best_count = run, run_count
+            next_j = max(next_j, run[1] + run[2])
+        j = next_j
+    return best
+
+def _diagonal_anchor(a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int,
+                     occurrences: Dict[int, List[int]]) -> Optional[Block]:
+    """The longest common run through the middle of b within MAX_CHAIN tokens of the proportional alignment"""
+    # Every shared token is too common to anchor on (a resume of near-identical bullets);
+    # edits are sparse, so the match is almost always close to the diagonal
+    best = None
+    middle = (blo + bhi) // 2
+    for j in range(max(blo, middle - 8), min(bhi, middle + 8)):
+        if best is not None and best[1] <= j < best[1] + best[2]:
+            continue
+        positions = occurrences.get(b[j], [])
+        expected = alo + (j - blo) * (ahi - alo) // (bhi - blo)
+        first = bisect_left(positions, expected - MAX_CHAIN)
+        last = bisect_right(positions, expected + MAX_CHAIN)
+        for i in positions[first:last]:
+            run = _extend(a, b, alo, ahi, blo, bhi, i, j)
+            if best is None or run[2] > best[2]:
+                best = run
+    return best
+
+def matching_blocks(a: List[int], b: List[int]) -> List[Block]:
+    """Sorted, non-adjacent (i, j, size) runs where a and b agree"""
+    blocks = []
+    regions = [(0, len(a), 0, len(b))]
+    while regions:
+        alo, ahi, blo, bhi = regions.pop()
+        # Common prefix and suffix are matched without searching
+        size = 0
+        while alo + size < ahi and blo + size < bhi and a[alo + size] == b[blo + size]:
+            size += 1
+        if size:
+            blocks.append((alo, blo, size))
+            alo, blo = alo + size, blo + size
+        size = 0
+        while ahi - size > alo and bhi - size > blo and a[ahi - size - 1] == b[bhi - size - 1]:
+            size += 1
+        if size:
+            blocks.append((ahi - size, bhi - size, size))
+            ahi, bhi = ahi - size, bhi - size
+        if alo == ahi or blo == bhi:
+            continue
+
+        anchor = None
+        if (ahi - alo) + (bhi - blo) > MYERS_REGION_TOKENS:
+            occurrences: Dict[int, List[int]] = {}
+            for i in range(alo, ahi):
+                occurrences.setdefault(a[i], []).append(i)
+            anchor = (_histogram_anchor(a, b, alo, ahi, blo, bhi, occurrences)
+                      or _diagonal_anchor(a, b, alo, ahi, blo, bhi, occurrences))
+        if anchor is None:
+            # Small, or nothing shared; anything Myers cannot solve cheaply stays replaced
+            blocks.extend(_myers(a, b, alo, ahi, blo, bhi) or [])
+            continue
+        i, j, size = anchor
+        blocks.append(anchor)
+        regions.append((alo, i, blo, j))
+        regions.append((i + size, ahi, j + size, bhi))
+
+    return merge_blocks(blocks)
+
+def merge_blocks(blocks: List[Block]) -> List[Block]:
+    """Sort blocks and merge runs that touch, as SequenceMatcher does"""
+    merged = []
+    for i, j, size in sorted(blocks):
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + size)
+        else:
+            merged.append((i, j, size))
+    return merged
+
+def opcodes(a: Sequence[str], b: Sequence[str]) -> List[Opcode]:
+    """(tag, i1, i2, j1, j2) tuples turning token list a into b, like SequenceMatcher.get_opcodes()"""
+    a_ids, b_ids = intern_tokens(a, b)
+    return opcodes_from_blocks(matching_blocks(a_ids, b_ids), len(a), len(b))
+
+def opcodes_from_blocks(blocks: List[Block], n: int, m: int) -> List[Opcode]:
+    """Opcodes for sequences of lengths n and m given their merged matching blocks"""
+    operations = []
+    i = j = 0
+    for block_i, block_j, size in blocks + [(n, m, 0)]:
+        if i < block_i and j < block_j:
+            operations.append(('replace', i, block_i, j, block_j))
+        elif i < block_i:
+            operations.append(('delete', i, block_i, j, block_j))
+        elif j < block_j:
+            operations.append(('insert', i, block_i, j, block_j))
+        i, j = block_i + size, block_j + size
+        if size:
+            operations.append(('equal', block_i, i, block_j, j))
+    return operations
+
+class DocumentDiff(NamedTuple):
+    """A line-level diff, with the changed regions still to be diffed word by word"""
+    a_tokens: List[str]
+    b_tokens: List[str]
+    line_blocks: List[Block]  # token blocks covering the unchanged lines
+    regions: List[Region]
+
+def tokenize_lines(text: str) -> Tuple[List[str], List[int]]:
+    """tokenize() line by line, so no token spans a line break; returns the tokens and each line's first token"""
+    tokens, line_starts = [], []
+    for line in LINE_RE.findall(text):
+        line_starts.append(len(tokens))
+        tokens.extend(TOKEN_RE.findall(line))
+    line_starts.append(len(tokens))
+    return tokens, line_starts
+
+def unique_line_blocks(a_lines: List[int], b_lines: List[int]) -> List[Block]:
+    """Patience-style line matches: lines unique on both sides, in order, grown over equal neighbours"""
+    a_counts, b_counts = Counter(a_lines), Counter(b_lines)
+    b_unique = {line: j for j, line in enumerate(b_lines) if b_counts[line] == 1}
+    pairs = [(i, b_unique[line]) for i, line in enumerate(a_lines) if a_counts[line] == 1 and line in b_unique]
+
+    # Longest increasing run of b positions (pairs are already in a order)
+    tails, tail_pairs, previous = [], [], [None] * len(pairs)
+    for index, (i, j) in enumerate(pairs):
+        position = bisect_left(tails, j)
+        previous[index] = tail_pairs[position - 1] if position else None
+        if position == len(tails):
+            tails.append(j)
+            tail_pairs.append(index)
+        else:
+            tails[position] = j
+            tail_pairs[position] = index
+    anchors, index = [], tail_pairs[-1] if tail_pairs else None
+    while index is not None:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+
+    # Repeated lines (blank lines, identical bullets) next to an anchor are matched too
+    blocks = []
+    low_i = low_j = 0
+    for number, (i, j) in enumerate(anchors):
+        high_i, high_j = anchors[number + 1] if number + 1 < len(anchors) else (len(a_lines), len(b_lines))
+        start_i, start_j = i, j
+        while start_i > low_i and start_j > low_j and a_lines[start_i - 1] == b_lines[start_j - 1]:
+            start_i -= 1
+            start_j -= 1
+        end_i, end_j = i + 1, j + 1
+        while end_i < high_i and end_j < high_j and a_lines[end_i] == b_lines[end_j]:
+            end_i += 1
+            end_j += 1
+        blocks.append((start_i, start_j, end_i - start_i))
+        low_i, low_j = end_i, end_j
+    return blocks
+
+def plan_document_diff(a_text: str, b_text: str) -> DocumentDiff:
+    """Match whole lines first; only the lines in between need a word-level diff"""
+    a_tokens, a_starts = tokenize_lines(a_text)
+    b_tokens, b_starts = tokenize_lines(b_text)
+    a_ids, b_ids = intern_tokens(a_tokens, b_tokens)
+    # Lines are compared by interned id too, so equal lines cost one int comparison
+    a_lines, b_lines = intern_tokens(LINE_RE.findall(a_text), LINE_RE.findall(b_text))
+
+    line_blocks, regions = [], []
+    line_i = line_j = 0
+    for block_i, block_j, size in unique_line_blocks(a_lines, b_lines) + [(len(a_lines), len(b_lines), 0)]:
+        if line_i < block_i or line_j < block_j:
+            alo, ahi = a_starts[line_i], a_starts[block_i]
+            blo, bhi = b_starts[line_j], b_starts[block_j]
+            regions.append((a_ids[alo:ahi], b_ids[blo:bhi], alo, blo))
+        if size:
+            # Equal lines tokenize identically
+            line_blocks.append((a_starts[block_i], b_starts[block_j], a_starts[block_i + size] - a_starts[block_i]))
+        line_i, line_j = block_i + size, block_j + size
+    return DocumentDiff(a_tokens, b_tokens, line_blocks, regions)
+
+def region_blocks(regions: List[Region]) -> List[Block]:
+    """Word-level matching blocks of changed regions, in document token positions"""
+    blocks = []
+    for a_ids, b_ids, alo, blo in regions:
+        blocks.extend((alo + i, blo + j, size) for i, j, size in matching_blocks(a_ids, b_ids))
+    return blocks
+
+def shard_regions(regions: List[Region], shards: int) -> List[List[Region]]:
+    """Split regions into at most `shards` groups of similar total size"""
+    groups = [[] for _ in range(max(1, min(shards, len(regions))))]
+    sizes = [0] * len(groups)
+    for region in sorted(regions, key=lambda region: len(region[0]) + len(region[1]), reverse=True):
+        smallest = sizes.index(min(sizes))
+        groups[smallest].append(region)
+        sizes[smallest] += len(region[0]) + len(region[1])
+    return groups
+
+def document_opcodes(diff: DocumentDiff, blocks: List[Block]) -> List[Opcode]:
+    """Token opcodes for a planned document diff, given region_blocks() of all its regions"""
+    return opcodes_from_blocks(merge_blocks(diff.line_blocks + blocks), len(diff.a_tokens), len(diff.b_tokens))
@@ -0,0 +1,116 @@
+"""
+Edit lists from the LLM.
+
+In the 'edits' cleaning mode the model does not rewrite the resume; it
+returns only the changes it would make, as JSON:
+
+    {"edits": [{"find": "teh team", "replace": "the team", "category": "grammar", "offset": 120}]}
+
+parse_edit_list validates the response, locate_edits anchors each edit in
+the text the model saw (the offset only picks between repeated anchors,
+models count characters badly) and apply_edits produces the cleaned text.
+Edits that cannot be anchored, or that overlap an earlier one, are dropped
+rather than failing the whole response.
+"""
+import re
+import json
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+EDIT_CATEGORIES = ('grammar', 'punctuation', 'style')
+
+_CODE_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+class EditListError(ValueError):
+    """The model's response is not a usable edit list"""
+
+class LocatedEdit(NamedTuple):
+    start: int
+    end: int
+    original: str
+    suggested: str
+    category: str
+
+def parse_edit_list(response: str) -> List[Dict[str, Any]]:
+    """Validate the model's JSON; returns edits with find, replace, category and offset"""
+    try:
+        data = json.loads(_CODE_FENCE_RE.sub('', response.strip()))
+    except ValueError as e:
+        raise EditListError(f"Response is not JSON: {e}")
+    edits = data.get('edits') if isinstance(data, dict) else data
+    if not isinstance(edits, list):
+        raise EditListError("Response has no list of edits")
+
+    parsed = []
+    for edit in edits:
+        if not isinstance(edit, dict):
+            continue
+        find, replace = edit.get('find'), edit.get('replace')
+        if not isinstance(find, str) or not isinstance(replace, str) or not find.strip():
+            continue
+        category = str(edit.get('category') or '').lower()
+        offset = edit.get('offset')
+        parsed.append({
+            "find": find.strip(),
+            "replace": replace.strip(),
+            "category": category if category in EDIT_CATEGORIES else 'grammar',
+            "offset": offset if isinstance(offset, int) and not isinstance(offset, bool) else None
+        })
+    if len(parsed) < len(edits):
+        logger.warning(f"Ignored {len(edits) - len(parsed)} malformed edits from the model")
+    return parsed
+
+def _anchor_pattern(find: str) -> re.Pattern:
+    """Match `find` only as whole words, so "teh" never matches inside "tehran" """
+    pattern = re.escape(find)
+    if re.match(r"\w", find):
+        pattern = r"(?<!\w)" + pattern
+    if re.search(r"\w$", find):
+        pattern += r"(?!\w)"
+    return re.compile(pattern)
+
+def _find_anchor(text: str, find: str, offset: Optional[int], cursor: int) -> int:
+    """Start of the occurrence nearest the offset hint, else the first one after the cursor; -1 if none"""
+    starts = [match.start() for match in _anchor_pattern(find).finditer(text)]
+    if not starts:
+        return -1
+    if offset is not None:
+        return min(starts, key=lambda start: abs(start - offset))
+    # Edits come in text order, so prefer occurrences after the previous edit
+    return next((start for start in starts if start >= cursor), starts[0])
+
+def locate_edits(text: str, edits: List[Dict[str, Any]]) -> List[LocatedEdit]:
+    """Anchor edits in text, dropping ones that cannot be found or overlap an earlier one"""
+    located, cursor = [], 0
+    for edit in edits:
+        start = _find_anchor(text, edit["find"], edit["offset"], cursor)
+        if start < 0 or edit["find"] == edit["replace"]:
+            continue
+        end = start + len(edit["find"])
+        if not edit["replace"]:
+            # Deleting words also deletes one of the spaces around them
+            if text[end:end + 1] == ' ':
+                end += 1
+            elif text[start - 1:start] == ' ':
+                start -= 1
+        if any(start < other.end and other.start < end for other in located):
+            continue
+        located.append(LocatedEdit(start, end, text[start:end], edit["replace"], edit["category"]))
+        cursor = end
+
+    located.sort()
+    if len(located) < len(edits):
+        logger.info(f"Kept {len(located)} of {len(edits)} edits from the model")
+    return located
+
+def apply_edits(text: str, edits: List[LocatedEdit]) -> str:
+    """Text with the (sorted, non-overlapping) edits applied"""
+    parts, position = [], 0
+    for edit in edits:
+        parts.append(text[position:edit.start])
+        parts.append(edit.suggested)
+        position = edit.end
+    parts.append(text[position:])
+    return ''.join(parts)
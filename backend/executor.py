@@ -0,0 +1,290 @@
+"""
+Extraction executor.
+
+Runs the blocking document parsers (pdfplumber, PyMuPDF, pdfminer, PyPDF2,
+DOCX XML) off the event loop, in a process pool by default or a thread
+pool when EXTRACTION_EXECUTOR=thread. The queue in front of the pool is
+bounded so a burst of large uploads is rejected early instead of piling up.
+
+Process workers run under an address-space ceiling, and a job that keeps a
+worker busy past its deadline gets the pool's processes killed and the
+pool rebuilt; jobs caught in the crossfire are resubmitted once. When a
+worker dies on its own (a crash, or the memory ceiling) the pool cannot
+say whose job it was: a job that was alone in the pool is the culprit and
+fails, otherwise every job in flight is retried one at a time in a
+single-worker pool, so the culprit takes down only itself the second time.
+"""
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# Number of recent jobs kept for the timing metrics
+METRICS_WINDOW = 500
+# How often a waiting caller checks whether its running job is overdue
+WATCHDOG_INTERVAL = 1.0
+
+class ExtractionQueueFull(Exception):
+    """Raised when the extraction queue has no free slots"""
+
+class ExtractionTimeout(Exception):
+    """Raised when a job runs past the executor's hard deadline"""
+
+class ExtractionWorkerCrashed(Exception):
+    """Raised when a job's worker process dies under it (a crash, or the memory ceiling)"""
+
+class _PoolBroken(Exception):
+    """A pool broke under a job that was not alone in it; the job may be retried"""
+
+    def __init__(self, generation):
+        super().__init__("Extraction pool broke")
+        self.generation = generation
+
+class _PoolGeneration:
+    """One pool instance: its unfinished jobs, and whether we killed it on purpose"""
+
+    def __init__(self):
+        self.jobs = 0
+        self.killed = False
+
+def _limit_worker_memory(max_bytes: int):
+    """Process-pool initializer: cap the worker's address space"""
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (max_bytes, max_bytes))
+    except (ImportError, ValueError, OSError) as e:
+        logger.warning(f"Could not limit extraction worker memory: {e}")
+
+def _timed_call(fn: Callable, args: tuple) -> tuple:
+    """Run fn inside the worker and report when it started and finished"""
+    started_at = time.time()
+    result = fn(*args)
+    return result, started_at, time.time()
+
+def _percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize_timings(values) -> Dict[str, float]:
+    """avg/p50/p95/max of durations in seconds, reported in milliseconds"""
+    values = list(values)
+    return {
+        "avg_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        "p50_ms": round(_percentile(values, 0.5) * 1000, 2),
+        "p95_ms": round(_percentile(values, 0.95) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2) if values else 0.0,
+    }
+
+class ExtractionExecutor:
+    """Bounded, instrumented front end for a process or thread pool"""
+
+    def __init__(self, kind: str = "process", max_workers: int = None, max_queue: int = 32,
+                 job_timeout: float = None, max_memory_mb: int = None):
+        if kind not in ("process", "thread"):
+            raise ValueError(f"Unsupported extraction executor: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.job_timeout = job_timeout
+        self.max_memory_mb = max_memory_mb
+        self._pool = None
+        self._generation = _PoolGeneration()
+        # Single-worker pool for retrying jobs that may have crashed a worker
+        self._isolation_pool = None
+        self._isolation_lock = asyncio.Lock()
+        self._pending = 0
+        self._queue_wait = deque(maxlen=METRICS_WINDOW)
+        self._exec_time = deque(maxlen=METRICS_WINDOW)
+        self._counters = {
+            "submitted": 0, "completed": 0, "failed": 0, "cancelled": 0, "rejected": 0,
+            "timed_out": 0, "retried": 0, "crashed": 0, "pool_restarts": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "ExtractionExecutor":
+        workers = os.environ.get('EXTRACTION_WORKERS')
+        return cls(
+            kind=os.environ.get('EXTRACTION_EXECUTOR', 'process').lower(),
+            max_workers=int(workers) if workers else None,
+            max_queue=int(os.environ.get('EXTRACTION_QUEUE_SIZE', '32')),
+            job_timeout=float(os.environ.get('EXTRACTION_JOB_TIMEOUT', '120')) or None,
+            max_memory_mb=int(os.environ.get('EXTRACTION_MAX_MEMORY_MB', '1024')) or None,
+        )
+
+    def _process_pool(self, max_workers: int) -> ProcessPoolExecutor:
+        # forkserver avoids forking the event loop and Motor's threads
+        context = multiprocessing.get_context(os.environ.get('EXTRACTION_START_METHOD', 'forkserver'))
+        initializer, initargs = None, ()
+        if self.max_memory_mb:
+            initializer, initargs = _limit_worker_memory, (self.max_memory_mb * 1024 * 1024,)
+        return ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=context, initializer=initializer, initargs=initargs
+        )
+
+    def start(self):
+        if self._pool is not None:
+            return
+        if self.kind == "process":
+            self._pool = self._process_pool(self.max_workers)
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="extraction")
+        logger.info(f"Extraction executor started: {self.kind} pool with {self.max_workers} workers")
+
+    def shutdown(self):
+        for pool in (self._pool, self._isolation_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = self._isolation_pool = None
+
+    @staticmethod
+    def _kill(pool):
+        """Stop a pool, killing any busy process workers"""
+        # There is no public API to stop a busy worker; killing them marks
+        # the pool broken, which fails its other in-flight futures
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.kill()
+        pool.shutdown(wait=False)
+
+    def _restart(self, generation: _PoolGeneration, kill: bool = False):
+        """Stop pool `generation` and start a fresh pool; `kill` marks a deliberate kill"""
+        if generation is not self._generation or self._pool is None:
+            return  # Already replaced by another caller
+        generation.killed = kill
+        self._kill(self._pool)
+        self._pool = None
+        self._generation = _PoolGeneration()
+        self._counters["pool_restarts"] += 1
+        self.start()
+
+    def _kill_isolation_pool(self):
+        if self._isolation_pool is not None:
+            self._kill(self._isolation_pool)
+            self._isolation_pool = None
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) in the pool; cancelling the caller cancels the job"""
+        if self._pool is None:
+            self.start()
+        if self._pending >= self.capacity:
+            self._counters["rejected"] += 1
+            raise ExtractionQueueFull(f"Extraction queue is full ({self._pending} jobs pending)")
+
+        self._pending += 1
+        self._counters["submitted"] += 1
+        try:
+            submitted_at = time.time()
+            try:
+                result, started_at, finished_at = await self._run_in_pool(fn, args)
+            except _PoolBroken as broken:
+                self._counters["retried"] += 1
+                submitted_at = time.time()
+                if broken.generation.killed:
+                    # Another job overran its deadline; this one is innocent
+                    result, started_at, finished_at = await self._run_in_pool(fn, args, retry=True)
+                else:
+                    result, started_at, finished_at = await self._run_isolated(fn, args)
+        except asyncio.CancelledError:
+            self._counters["cancelled"] += 1
+            raise
+        except ExtractionTimeout:
+            self._counters["timed_out"] += 1
+            raise
+        except ExtractionWorkerCrashed:
+            self._counters["crashed"] += 1
+            raise
+        except Exception:
+            self._counters["failed"] += 1
+            raise
+        finally:
+            self._pending -= 1
+
+        self._counters["completed"] += 1
+        self._queue_wait.append(max(0.0, started_at - submitted_at))
+        self._exec_time.append(finished_at - started_at)
+        return result
+
+    async def _run_in_pool(self, fn: Callable, args: tuple, retry: bool = False) -> tuple:
+        """One attempt in the shared pool; raises _PoolBroken if the pool broke under a job of others"""
+        generation = self._generation
+        generation.jobs += 1
+        future = self._pool.submit(_timed_call, fn, args)
+        try:
+            outcome = await self._wait(future, lambda: self._restart(generation, kill=True))
+        except BrokenProcessPool:
+            # Left counted in generation.jobs, so every job the break took down sees the same total
+            self._restart(generation)
+            if generation.jobs == 1 and not generation.killed:
+                raise ExtractionWorkerCrashed("The extraction worker crashed or ran out of memory on this document")
+            if retry:
+                raise ExtractionWorkerCrashed("The extraction worker was lost twice while extracting this document")
+            raise _PoolBroken(generation)
+        except BaseException:
+            generation.jobs -= 1
+            raise
+        generation.jobs -= 1
+        return outcome
+
+    async def _run_isolated(self, fn: Callable, args: tuple) -> tuple:
+        """Retry a job alone in a single-worker pool, so a crash there is its own"""
+        async with self._isolation_lock:
+            if self._isolation_pool is None:
+                self._isolation_pool = self._process_pool(1)
+            future = self._isolation_pool.submit(_timed_call, fn, args)
+            try:
+                return await self._wait(future, self._kill_isolation_pool)
+            except BrokenProcessPool:
+                self._kill_isolation_pool()
+                raise ExtractionWorkerCrashed("The extraction worker crashed or ran out of memory on this document")
+
+    async def _wait(self, future, on_timeout: Callable[[], None]) -> tuple:
+        """Await a pool future, enforcing job_timeout once the job is running"""
+        wrapped = asyncio.wrap_future(future)
+        # An abandoned job's future still fails later; mark that as handled
+        wrapped.add_done_callback(lambda done: done.cancelled() or done.exception())
+        running_since = None
+        try:
+            while True:
+                try:
+                    return await asyncio.wait_for(asyncio.shield(wrapped), WATCHDOG_INTERVAL)
+                except asyncio.TimeoutError:
+                    # Time spent queued doesn't count against the job
+                    if not self.job_timeout or not future.running():
+                        continue
+                    running_since = running_since or time.monotonic()
+                    if time.monotonic() - running_since > self.job_timeout:
+                        logger.error(f"Extraction job exceeded {self.job_timeout:g}s; restarting the pool")
+                        on_timeout()
+                        raise ExtractionTimeout(
+                            f"Document took longer than {self.job_timeout:g}s to extract and was abandoned"
+                        )
+        except asyncio.CancelledError:
+            # Drops the job if it is still queued; a running job finishes in the background
+            future.cancel()
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executor": self.kind,
+            "workers": self.max_workers,
+            "queue_size": self.max_queue,
+            "job_timeout": self.job_timeout,
+            "max_memory_mb": self.max_memory_mb,
+            "pending": self._pending,
+            **self._counters,
+            "queue_wait": summarize_timings(self._queue_wait),
+            "execution_time": summarize_timings(self._exec_time),
+        }
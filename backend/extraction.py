@@ -0,0 +1,443 @@
+"""
+Synchronous document text extraction.
+
+Everything in this module is CPU bound and runs inside the extraction
+executor (see executor.py), never on the event loop. Keep it free of
+FastAPI/Motor imports so worker processes stay cheap to start.
+"""
+import io
+import os
+import logging
+import PyPDF2
+import pdfplumber
+from pdfminer.high_level import extract_text as pdfminer_extract_text
+import fitz  # PyMuPDF
+import re
+import signal
+import zipfile
+import threading
+import unicodedata
+from xml.etree import ElementTree
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever extraction output changes so cached text is not reused
+EXTRACTOR_VERSION = "4"
+
+# PDFs with at least this many pages are split into page ranges that are
+# extracted in parallel worker processes
+PDF_SHARD_PAGE_THRESHOLD = int(os.environ.get('PDF_SHARD_PAGE_THRESHOLD', '20'))
+# Smallest page range worth shipping to its own worker
+PDF_MIN_PAGES_PER_SHARD = int(os.environ.get('PDF_MIN_PAGES_PER_SHARD', '4'))
+# Library used for the page shards: pdfplumber or pymupdf
+PDF_SHARD_EXTRACTOR = os.environ.get('PDF_SHARD_EXTRACTOR', 'pymupdf').lower()
+# Extracted text scoring below this escalates to the next (slower) extractor
+PDF_QUALITY_THRESHOLD = float(os.environ.get('PDF_QUALITY_THRESHOLD', '0.6'))
+
+# Per-document limits, so one pathological file can't monopolise a worker
+EXTRACTOR_TIMEOUT_SECONDS = float(os.environ.get('EXTRACTOR_TIMEOUT_SECONDS', '20'))
+MAX_PDF_PAGES = int(os.environ.get('MAX_PDF_PAGES', '200'))
+MAX_EXTRACTED_CHARS = int(os.environ.get('MAX_EXTRACTED_CHARS', '500000'))
+
+class ExtractionResult(NamedTuple):
+    text: str
+    method: str
+    quality: Optional[float] = None
+
+class PdfShardPlan(NamedTuple):
+    """Returned instead of text for a PDF long enough to extract in page shards"""
+    page_count: int
+
+class ExtractionLimitExceeded(ValueError):
+    """Raised when a document breaks one of the per-document extraction limits"""
+
+class ExtractorTimeout(Exception):
+    """Raised inside a worker when a single extractor runs past its time budget"""
+
+@contextmanager
+def extractor_deadline(seconds: float):
+    """Interrupt the block with ExtractorTimeout after seconds of wall-clock time"""
+    # SIGALRM can only be handled on the main thread, i.e. in process-pool
+    # workers; thread-pool deployments rely on the executor's job timeout
+    if not seconds or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    
+    def on_alarm(signum, frame):
+        raise ExtractorTimeout(f"exceeded {seconds:g}s")
+    
+    previous_handler = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+def check_extracted_size(length: int):
+    """Enforce the extracted-text size cap"""
+    if length > MAX_EXTRACTED_CHARS:
+        raise ExtractionLimitExceeded(
+            f"Document produced more than {MAX_EXTRACTED_CHARS:,} characters of text, "
+            f"which is far beyond a resume"
+        )
+
+def extract_document_text(data: bytes, file_type: str) -> ExtractionResult:
+    """Extract text from an in-memory PDF or DOCX file (executor entry point)"""
+    if file_type == 'pdf':
+        return extract_text_from_pdf(data)
+    elif file_type in ['docx', 'doc']:
+        try:
+            with extractor_deadline(EXTRACTOR_TIMEOUT_SECONDS):
+                return ExtractionResult(extract_text_from_docx(data), "docx-xml")
+        except ExtractorTimeout:
+            raise ExtractionLimitExceeded(f"DOCX took longer than {EXTRACTOR_TIMEOUT_SECONDS:g}s to extract")
+        except MemoryError:
+            raise ExtractionLimitExceeded("DOCX needs more memory to extract than this server allows")
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+# C0/C1 control characters other than \n, \t and \r are dropped, except the
+# ones Python treats as whitespace, which become a space
+_CONTROL_CHAR_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]')
+_CONTROL_SPACE_RE = re.compile(r'[\x0b\x0c\x1c-\x1f\x85]')
+_CONTROL_DROP_RE = re.compile(r'[\x00-\x08\x0e-\x1b\x7f-\x84\x86-\x9f]')
+_BLANK_LINES_RE = re.compile(r'\n\s*\n\s*\n+')
+# Only runs that actually change: a tab, or a space followed by more blanks
+_INLINE_BLANKS_RE = re.compile(r'\t[ \t]*| [ \t]+')
+# Only line breaks with blanks around them
+_LINE_BREAK_BLANKS_RE = re.compile(r'\n[ \t]+|[ \t]+\n[ \t]*')
+
+def clean_extracted_text(text: str) -> str:
+    """Clean and normalize extracted text to handle encoding issues"""
+    if not text:
+        return ""
+    
+    try:
+        # Normalize Unicode characters
+        text = unicodedata.normalize('NFKD', text)
+        
+        # Remove control characters; most text has none, so skip the copies
+        if _CONTROL_CHAR_RE.search(text):
+            text = _CONTROL_SPACE_RE.sub(' ', text)
+            text = _CONTROL_DROP_RE.sub('', text)
+        
+        # Clean up extra whitespace and line breaks
+        text = _BLANK_LINES_RE.sub('\n\n', text)  # Multiple blank lines to double
+        text = _INLINE_BLANKS_RE.sub(' ', text)  # Multiple spaces/tabs to single space
+        text = _LINE_BREAK_BLANKS_RE.sub('\n', text)  # Clean line breaks
+        
+        return text.strip()
+        
+    except Exception as e:
+        # If all else fails, try basic ASCII cleanup
+        try:
+            text = text.encode('ascii', 'ignore').decode('ascii')
+            return re.sub(r'\s+', ' ', text).strip()
+        except:
+            return str(text)
+
+class PdfDocument:
+    """An in-memory PDF, parsed once by PyMuPDF and shared by validation and extraction"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.fitz_doc = fitz.open(stream=data, filetype="pdf")
+
+    @property
+    def page_count(self) -> int:
+        return self.fitz_doc.page_count
+
+    def stream(self) -> io.BytesIO:
+        """Fresh file-like view of the bytes for the pure-Python parsers"""
+        return io.BytesIO(self.data)
+
+    def close(self):
+        self.fitz_doc.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def open_pdf(data: bytes) -> PdfDocument:
+    """Validate PDF bytes and open them for extraction"""
+    # Check the buffer has content and a PDF header
+    if not data:
+        raise ValueError("PDF validation failed: PDF file is empty")
+    if not bytes(data[:8]).startswith(b'%PDF'):
+        raise ValueError("PDF validation failed: File is not a valid PDF")
+    
+    # Parsing with PyMuPDF doubles as structural validation
+    try:
+        pdf = PdfDocument(data)
+    except Exception as e:
+        raise ValueError(f"PDF validation failed: PDF structure validation failed: {str(e)}")
+    
+    if pdf.page_count == 0:
+        pdf.close()
+        raise ValueError("PDF validation failed: PDF contains no pages")
+    if pdf.page_count > MAX_PDF_PAGES:
+        page_count = pdf.page_count
+        pdf.close()
+        raise ExtractionLimitExceeded(f"PDF has {page_count} pages; the limit is {MAX_PDF_PAGES}")
+    return pdf
+
+def pdfplumber_page_texts(pdf: PdfDocument, start: int = 0, stop: int = None) -> list:
+    """Extract the text of pages [start, stop) with pdfplumber"""
+    with pdfplumber.open(pdf.stream()) as plumber_pdf:
+        pages = plumber_pdf.pages[start:stop]
+        return [page.extract_text() or "" for page in pages]
+
+def pymupdf_page_texts(pdf: PdfDocument, start: int = 0, stop: int = None) -> list:
+    """Extract the text of pages [start, stop) with PyMuPDF"""
+    doc = pdf.fitz_doc
+    stop = doc.page_count if stop is None else min(stop, doc.page_count)
+    # Keep text running past the page edge, as the other extractors do
+    flags = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_MEDIABOX_CLIP
+    return [
+        doc.load_page(page_num).get_text(flags=flags, clip=fitz.INFINITE_RECT()) or ""
+        for page_num in range(start, stop)
+    ]
+
+def pdfminer_page_texts(pdf: PdfDocument, start: int = 0, stop: int = None) -> list:
+    """Extract the text of pages [start, stop) with pdfminer"""
+    stop = pdf.page_count if stop is None else min(stop, pdf.page_count)
+    pages = range(start, stop)
+    text = pdfminer_extract_text(pdf.stream(), page_numbers=pages) or ""
+    # pdfminer ends every page with a form feed, so the split leaves an empty piece at the end
+    return text.split("\f")[:len(pages)]
+
+def pypdf2_page_texts(pdf: PdfDocument, start: int = 0, stop: int = None) -> list:
+    """Extract the text of pages [start, stop) with PyPDF2"""
+    pdf_reader = PyPDF2.PdfReader(pdf.stream())
+    return [page.extract_text() or "" for page in pdf_reader.pages[start:stop]]
+
+# Extractors in the order they are tried, fastest first
+PDF_EXTRACTORS = [
+    ("PyMuPDF", pymupdf_page_texts),
+    ("pdfplumber", pdfplumber_page_texts),
+    ("pdfminer", pdfminer_page_texts),
+    ("PyPDF2", pypdf2_page_texts),
+]
+
+_UNPRINTABLE_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f\ufffd]')
+# Double-encoded UTF-8, unmapped glyph ids and private-use ligature glyphs
+_MOJIBAKE_RE = re.compile(r'Ã[\x80-\xbf]|Â[\x80-\xbf ]|â€|\(cid:\d+\)|[\ue000-\uf8ff]')
+_WORD_RE = re.compile(r'[^\W\d_]+')
+
+def score_page_texts(page_texts: list) -> float:
+    """Cheap 0-1 quality score for extracted PDF text"""
+    text = "".join(page_texts)
+    if len(text.strip()) <= 10:
+        return 0.0
+    
+    # Share of characters that are printable
+    printable = 1 - len(_UNPRINTABLE_RE.findall(text)) / len(text)
+    
+    # Share of pages that produced any text
+    coverage = sum(1 for page_text in page_texts if page_text and page_text.strip()) / len(page_texts)
+    
+    # Letter-spaced ("S k i l l s") or run-together words skew the word lengths
+    words = _WORD_RE.findall(text)
+    if not words:
+        return 0.0
+    single = sum(1 for word in words if len(word) == 1) / len(words)
+    overlong = sum(1 for word in words if len(word) > 25) / len(words)
+    word_shape = max(0.0, 1 - max(0.0, single - 0.15) * 2 - overlong * 5)
+    
+    # Encoding damage
+    markers = len(_MOJIBAKE_RE.findall(text)) / len(words)
+    encoding = max(0.0, 1 - markers * 10)
+    
+    return printable * coverage * word_shape * encoding
+
+def join_page_texts(page_texts: list) -> str:
+    """Join per-page text in page order, skipping empty pages"""
+    return "".join(page_text + "\n" for page_text in page_texts if page_text)
+
+def extract_pdf_or_plan_shards(data: bytes, shard_page_threshold: int = None):
+    """Parse the PDF once: extract it here, or return a PdfShardPlan when it is long enough to shard"""
+    with open_pdf(data) as pdf:
+        if shard_page_threshold is not None and pdf.page_count >= shard_page_threshold:
+            return PdfShardPlan(pdf.page_count)
+        return _extract_best_pdf_text(pdf)
+
+def plan_pdf_shards(page_count: int, workers: int) -> list:
+    """Split [0, page_count) into contiguous page ranges, one per shard"""
+    shard_count = max(1, min(workers, page_count // PDF_MIN_PAGES_PER_SHARD))
+    size, extra = divmod(page_count, shard_count)
+    ranges = []
+    start = 0
+    for shard in range(shard_count):
+        stop = start + size + (1 if shard < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+def pdf_shard_method() -> str:
+    """Name of the extractor used for page shards, as used in PDF_EXTRACTORS"""
+    return "pdfplumber" if PDF_SHARD_EXTRACTOR == 'pdfplumber' else "PyMuPDF"
+
+def extract_pdf_page_range(data: bytes, start: int, stop: int) -> list:
+    """Extract one page shard; each worker parses its own copy of the document"""
+    with PdfDocument(data) as pdf:
+        if PDF_SHARD_EXTRACTOR == 'pdfplumber':
+            return pdfplumber_page_texts(pdf, start, stop)
+        return pymupdf_page_texts(pdf, start, stop)
+
+def extract_text_from_pdf(data: bytes, first_attempt: tuple = None) -> ExtractionResult:
+    """Quality-scored PDF text extraction: PyMuPDF first, escalating only on poor text"""
+    
+    # First validate the PDF; the parsed document is reused by PyMuPDF below
+    with open_pdf(data) as pdf:
+        return _extract_best_pdf_text(pdf, first_attempt)
+
+def _extract_best_pdf_text(pdf: PdfDocument, first_attempt: tuple = None) -> ExtractionResult:
+    """Try extractors in order until one scores well, keeping the best text seen"""
+    best = None
+    candidates = [first_attempt] if first_attempt else []
+    
+    for method, page_extractor in PDF_EXTRACTORS:
+        if first_attempt and method == first_attempt[0]:
+            continue
+        candidates.append((method, page_extractor))
+    
+    timed_out = []
+    for method, source in candidates:
+        try:
+            # A candidate is either already-extracted page text or an extractor to run
+            if isinstance(source, list):
+                page_texts = source
+            else:
+                with extractor_deadline(EXTRACTOR_TIMEOUT_SECONDS):
+                    page_texts = source(pdf)
+        except ExtractorTimeout as e:
+            logger.warning(f"{method} extraction {e}")
+            timed_out.append(method)
+            continue
+        except MemoryError:
+            raise ExtractionLimitExceeded("PDF needs more memory to extract than this server allows")
+        except Exception as e:
+            logger.warning(f"{method} extraction failed: {e}")
+            continue
+        
+        score = score_page_texts(page_texts)
+        logger.info(f"PDF extraction with {method}: quality score {score:.2f}")
+        if best is None or score > best[2]:
+            best = (method, page_texts, score)
+        if score >= PDF_QUALITY_THRESHOLD:
+            break
+    
+    if best is not None and best[2] > 0:
+        method, page_texts, score = best
+        text = join_page_texts(page_texts)
+        check_extracted_size(len(text))
+        logger.info(f"PDF extraction successful with {method}: {len(text)} characters")
+        return ExtractionResult(clean_extracted_text(text), method, round(score, 3))
+    
+    if timed_out:
+        raise ExtractionLimitExceeded(
+            f"PDF took too long to extract ({', '.join(timed_out)} each ran past "
+            f"{EXTRACTOR_TIMEOUT_SECONDS:g}s); it may be malformed or unusually complex"
+        )
+    
+    # If all methods fail, provide detailed error message
+    error_msg = f"""PDF text extraction failed with all methods (PyMuPDF, pdfplumber, pdfminer, PyPDF2).
+
+Possible causes:
+1. PDF contains only scanned images (no extractable text)
+2. PDF is password protected
+3. PDF has unusual encoding or format
+4. PDF is corrupted
+
+Recommendations:
+1. Try converting your resume to DOCX or TXT format
+2. If it's a scanned PDF, use OCR software first
+3. Recreate the PDF from the original document
+4. Ensure the PDF contains selectable text (not just images)"""
+    
+    raise ValueError(error_msg)
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+_DOCX_HEADER_RE = re.compile(r'word/header(\d*)\.xml$')
+_DOCX_FOOTER_RE = re.compile(r'word/footer(\d*)\.xml$')
+# Run content that python-docx also renders as text
+_DOCX_RUN_TEXT = {_W + 'tab': '\t', _W + 'br': '\n', _W + 'cr': '\n', _W + 'noBreakHyphen': '-'}
+
+def docx_part_paragraphs(stream) -> Iterator[str]:
+    """Stream paragraph text from one WordprocessingML part in document order"""
+    # Paragraphs inside text boxes nest inside their anchoring paragraph,
+    # so keep a stack of open paragraph buffers
+    buffers = []
+    # Elements whose descendants are not document text: paragraph/run
+    # properties (tab stops are w:tab too) and the VML fallback copy of text boxes
+    skip_depth = 0
+    skip_tags = (_W + 'pPr', _W + 'rPr', _MC_FALLBACK)
+    
+    for event, elem in ElementTree.iterparse(stream, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            if tag in skip_tags:
+                skip_depth += 1
+            elif tag == _W + 'p' and not skip_depth:
+                buffers.append([])
+            continue
+        
+        if tag in skip_tags:
+            skip_depth -= 1
+        elif skip_depth or not buffers:
+            pass
+        elif tag == _W + 't':
+            buffers[-1].append(elem.text or "")
+        elif tag in _DOCX_RUN_TEXT:
+            buffers[-1].append(_DOCX_RUN_TEXT[tag])
+        elif tag == _W + 'p':
+            yield "".join(buffers.pop())
+        
+        # Drop finished paragraphs and tables so memory stays flat
+        if tag in (_W + 'p', _W + 'tbl'):
+            elem.clear()
+
+def _docx_part_names(names: list, pattern: re.Pattern) -> list:
+    """Header/footer part names in numeric order"""
+    parts = [(int(match.group(1) or 0), name) for name in names if (match := pattern.match(name))]
+    return [name for _, name in sorted(parts)]
+
+def extract_text_from_docx(data: bytes) -> str:
+    """Extract text from DOCX file: headers, body (including tables and text boxes), footers"""
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile:
+        raise ValueError("File is not a valid DOCX document")
+    
+    with archive:
+        names = archive.namelist()
+        if 'word/document.xml' not in names:
+            raise ValueError("File is not a valid DOCX document: word/document.xml is missing")
+        
+        lines = []
+        extracted_chars = 0
+        seen_parts = set()
+        parts = _docx_part_names(names, _DOCX_HEADER_RE) + ['word/document.xml'] + _docx_part_names(names, _DOCX_FOOTER_RE)
+        for part in parts:
+            paragraphs = []
+            with archive.open(part) as stream:
+                for paragraph in docx_part_paragraphs(stream):
+                    # Stop early on decompression bombs rather than inflating everything
+                    extracted_chars += len(paragraph) + 1
+                    check_extracted_size(extracted_chars)
+                    paragraphs.append(paragraph)
+            # First-page/even-page variants often repeat the default header
+            if part != 'word/document.xml':
+                key = tuple(paragraphs)
+                if key in seen_parts or not any(paragraph.strip() for paragraph in paragraphs):
+                    continue
+                seen_parts.add(key)
+            lines.extend(paragraphs)
+    
+    return "\n".join(lines).strip()
@@ -0,0 +1,169 @@
+"""
+Streaming upload ingest.
+
+Reads an UploadFile into memory in chunks without blocking the event loop,
+enforcing the size limit as bytes arrive, checking the first chunk's magic
+bytes against the declared file type and hashing the content on the fly.
+Zip archives from batch uploads are listed up front and their entries
+read one at a time, under the same checks per entry and a cap on the
+total expanded size. Batch uploads are copied to temporary files first,
+since they are read after the request (and its UploadFiles) has closed.
+"""
+import io
+import codecs
+import asyncio
+import hashlib
+import zipfile
+import tempfile
+import threading
+import posixpath
+from typing import List, NamedTuple
+from fastapi import UploadFile
+
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Batch uploads: a zip archive may hold many resumes, each within MAX_UPLOAD_BYTES
+MAX_ARCHIVE_BYTES = 200 * 1024 * 1024
+MAX_ARCHIVE_EXPANDED_BYTES = 500 * 1024 * 1024
+
+ZIP_MAGIC = b'PK\x03\x04'
+OLE_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+# Accepted leading bytes per file type; TXT is checked separately
+MAGIC_BYTES = {
+    'pdf': (b'%PDF',),
+    'docx': (ZIP_MAGIC,),
+    'doc': (ZIP_MAGIC, OLE_MAGIC),
+    'zip': (ZIP_MAGIC,),
+}
+
+class UploadRejected(ValueError):
+    """Raised when an upload fails the size or content-type checks"""
+
+class UploadTooLarge(UploadRejected):
+    """Raised when an upload is over its size limit"""
+
+class IngestedUpload(NamedTuple):
+    data: bytes
+    size: int
+    content_hash: str
+
+def sniff_file_type(first_chunk: bytes, file_type: str) -> bool:
+    """Check that the first chunk of an upload looks like file_type"""
+    if file_type == 'txt':
+        if b'\x00' in first_chunk:
+            return False
+        try:
+            # The chunk may end mid-character, so decode incrementally
+            codecs.getincrementaldecoder('utf-8')().decode(first_chunk, final=False)
+        except UnicodeDecodeError:
+            return False
+        return True
+    return first_chunk.startswith(MAGIC_BYTES.get(file_type, ()))
+
+async def ingest_upload(file: UploadFile, file_type: str, max_bytes: int = MAX_UPLOAD_BYTES) -> IngestedUpload:
+    """Read an upload into memory, enforcing size and type as it arrives"""
+    sha256 = hashlib.sha256()
+    chunks = []
+    size = 0
+
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        if size == 0 and not sniff_file_type(chunk, file_type):
+            raise UploadRejected(f"File content does not match the .{file_type} extension")
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(f"File size exceeds {max_bytes // (1024 * 1024)}MB limit")
+        sha256.update(chunk)
+        chunks.append(chunk)
+
+    if size == 0:
+        raise UploadRejected("Uploaded file is empty")
+    return IngestedUpload(b"".join(chunks), size, sha256.hexdigest())
+
+def ingest_bytes(data: bytes, file_type: str) -> IngestedUpload:
+    """ingest_upload for content that is already in memory"""
+    if not data:
+        raise UploadRejected("Uploaded file is empty")
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise UploadTooLarge("File size exceeds 10MB limit")
+    if not sniff_file_type(data[:UPLOAD_CHUNK_SIZE], file_type):
+        raise UploadRejected(f"File content does not match the .{file_type} extension")
+    return IngestedUpload(data, len(data), hashlib.sha256(data).hexdigest())
+
+class ZipArchiveReader:
+    """An uploaded zip of resumes, listed up front and read one entry at a time on demand"""
+
+    def __init__(self, fileobj):
+        try:
+            self.archive = zipfile.ZipFile(fileobj)
+        except zipfile.BadZipFile:
+            raise UploadRejected("Archive is not a valid zip file")
+        self.expanded = 0
+        # Entries are read from several threads at once
+        self._expanded_lock = threading.Lock()
+
+    def entries(self, allowed_types: List[str], max_entries: int) -> List[tuple]:
+        """(filename, file_type, ZipInfo or UploadRejected) per resume in the archive, reading no content"""
+        items = []
+        for info in self.archive.infolist():
+            filename = posixpath.basename(info.filename)
+            # Skip folders and the metadata macOS adds to archives
+            if info.is_dir() or not filename or filename.startswith('.') or info.filename.startswith('__MACOSX/'):
+                continue
+            if len(items) >= max_entries:
+                raise UploadRejected(f"Archive holds more than {max_entries} files")
+
+            file_type = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+            if file_type not in allowed_types:
+                items.append((filename, file_type, UploadRejected("Unsupported file type")))
+            elif info.file_size > MAX_UPLOAD_BYTES:
+                items.append((filename, file_type, UploadTooLarge("File size exceeds 10MB limit")))
+            else:
+                items.append((filename, file_type, info))
+        return items
+
+    def read(self, info: zipfile.ZipInfo, file_type: str) -> IngestedUpload:
+        """Decompress one entry under the same checks as a single upload"""
+        # The declared size can lie; never read more than the limit allows
+        with self.archive.open(info) as entry:
+            content = entry.read(MAX_UPLOAD_BYTES + 1)
+        with self._expanded_lock:
+            self.expanded += len(content)
+            expanded = self.expanded
+        if expanded > MAX_ARCHIVE_EXPANDED_BYTES:
+            raise UploadTooLarge("Archive expands beyond the allowed size")
+        return ingest_bytes(content, file_type)
+
+    def close(self):
+        self.archive.close()
+
+async def spool_upload(file: UploadFile, max_bytes: int) -> UploadFile:
+    """Copy an upload to a temporary file that outlives the request"""
+    def copy() -> tuple:
+        spooled = tempfile.TemporaryFile()
+        file.file.seek(0)
+        size = 0
+        # Anything past the limit is rejected when the copy is read; stop copying there
+        while size <= max_bytes and (chunk := file.file.read(UPLOAD_CHUNK_SIZE)):
+            spooled.write(chunk)
+            size += len(chunk)
+        spooled.seek(0)
+        return spooled, size
+
+    spooled, size = await asyncio.to_thread(copy)
+    return UploadFile(spooled, size=size, filename=file.filename)
+
+async def open_zip_upload(file: UploadFile, max_bytes: int = MAX_ARCHIVE_BYTES) -> ZipArchiveReader:
+    """Open an uploaded archive where the server spooled it, without reading it into memory"""
+    size = file.size
+    if size is None:
+        size = await asyncio.to_thread(file.file.seek, 0, io.SEEK_END)
+    if size > max_bytes:
+        raise UploadTooLarge(f"File size exceeds {max_bytes // (1024 * 1024)}MB limit")
+    await file.seek(0)
+    if not sniff_file_type(await file.read(len(ZIP_MAGIC)), 'zip'):
+        raise UploadRejected("File content does not match the .zip extension")
+    await file.seek(0)
+    # Reading the central directory seeks around the file; keep it off the event loop
+    return await asyncio.to_thread(ZipArchiveReader, file.file)
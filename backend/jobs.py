@@ -0,0 +1,226 @@
+"""
+Resume processing jobs.
+
+POST /api/process-resume only records a job; a pool of in-process workers
+drains the MongoDB-backed queue, so HTTP handlers never wait on the LLM.
+A worker claims a job atomically with find_one_and_update and holds a lease
+it renews while the job runs. If the worker dies the lease expires and
+another worker picks the job up. Failed jobs are retried with backoff up to
+max_attempts; on_failure then hears about every job that fails for good,
+including one abandoned before its handler could run. Any number of API
+processes can share the same collection.
+"""
+import uuid
+import socket
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# queued -> running -> completed, or back to queued on a retryable failure, or failed
+JOB_STATUSES = ('queued', 'running', 'completed', 'failed')
+
+# (keys, options) for create_index
+JOB_INDEXES = (
+    ([("id", 1)], {"unique": True}),
+    ([("status", 1), ("available_at", 1)], {}),
+    ([("status", 1), ("lease_expires_at", 1)], {}),
+)
+# Claim order: oldest available job first
+CLAIM_SORT = [("available_at", 1)]
+
+def job_filter(job_id: str) -> Dict[str, Any]:
+    return {"id": job_id}
+
+def claimable_filter(now: datetime) -> Dict[str, Any]:
+    """Jobs that are due, or running on a lease that has expired"""
+    return {"$or": [
+        {"status": "queued", "available_at": {"$lte": now}},
+        {"status": "running", "lease_expires_at": {"$lt": now}},
+    ]}
+
+def leased_filter(job: Dict[str, Any]) -> Dict[str, Any]:
+    """The job, only while the worker that claimed it still holds its lease"""
+    return {"id": job["id"], "worker_id": job["worker_id"], "status": "running"}
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying the job cannot help"""
+
+class JobQueue:
+    """MongoDB-backed job queue with leases, retries and an in-process worker pool"""
+
+    def __init__(self, collection, handler: Callable[[Dict[str, Any], Callable], Awaitable[Any]],
+                 workers: int = 2, lease_seconds: float = 120, max_attempts: int = 3,
+                 retry_delay: float = 5, poll_interval: float = 2,
+                 on_failure: Callable[[Dict[str, Any], str], Awaitable[Any]] = None):
+        self.collection = collection
+        self.handler = handler
+        self.on_failure = on_failure
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.worker_prefix = f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+        self._counters = {"enqueued": 0, "completed": 0, "retried": 0, "failed": 0, "lease_lost": 0}
+
+    async def ensure_indexes(self):
+        try:
+            for keys, options in JOB_INDEXES:
+                await self.collection.create_index(keys, **options)
+        except Exception as e:
+            logger.warning(f"Could not create job indexes: {e}")
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._work(f"{self.worker_prefix}-{n}")) for n in range(self.workers)]
+        logger.info(f"Job queue started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, file_id: str, params: Dict[str, Any] = None, job_id: str = None) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        job = {
+            "id": job_id or str(uuid.uuid4()),
+            "file_id": file_id,
+            "params": params or {},
+            "status": "queued",
+            "attempts": 0,
+            "max_attempts": self.max_attempts,
+            "progress": {"completed": 0, "total": 0},
+            "error": None,
+            "result": None,
+            "created_at": now,
+            "updated_at": now,
+            "available_at": now,
+            "lease_expires_at": None,
+            "worker_id": None,
+        }
+        await self.collection.insert_one(dict(job))
+        self._counters["enqueued"] += 1
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one(job_filter(job_id), {"_id": 0})
+
+    async def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Take the oldest available job, or a running one whose lease has expired"""
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            claimable_filter(now),
+            {
+                "$set": {
+                    "status": "running",
+                    "worker_id": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=CLAIM_SORT,
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _update_owned(self, job: Dict[str, Any], fields: Dict[str, Any]) -> bool:
+        """Update a job only while this worker still holds its lease"""
+        fields["updated_at"] = datetime.now(timezone.utc)
+        result = await self.collection.update_one(
+            leased_filter(job), {"$set": fields}
+        )
+        if result.matched_count == 0:
+            self._counters["lease_lost"] += 1
+            logger.warning(f"Job {job['id']} was taken over by another worker")
+            return False
+        return True
+
+    async def _renew_lease(self, job: Dict[str, Any]):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            lease_expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+            if not await self._update_owned(job, {"lease_expires_at": lease_expires_at}):
+                return
+
+    async def _fail(self, job: Dict[str, Any], error: str):
+        if not await self._update_owned(job, {"status": "failed", "error": error}):
+            return
+        self._counters["failed"] += 1
+        if self.on_failure:
+            await self.on_failure(job, error)
+
+    async def _run(self, job: Dict[str, Any]):
+        async def report_progress(completed: int, total: int):
+            await self._update_owned(job, {"progress": {"completed": completed, "total": total}})
+
+        if job["attempts"] > job["max_attempts"]:
+            # Reclaimed after its worker died on every attempt
+            await self._fail(job, "Job abandoned by its workers")
+            return
+
+        heartbeat = asyncio.create_task(self._renew_lease(job))
+        try:
+            result = await self.handler(job, report_progress)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = getattr(e, 'detail', None) or str(e)
+            if job["attempts"] < job["max_attempts"] and not isinstance(e, PermanentJobError):
+                # Back off linearly; the job stays invisible until then
+                available_at = datetime.now(timezone.utc) + timedelta(seconds=self.retry_delay * job["attempts"])
+                if await self._update_owned(job, {"status": "queued", "available_at": available_at, "error": error}):
+                    self._counters["retried"] += 1
+                logger.warning(f"Job {job['id']} attempt {job['attempts']} failed, will retry: {error}")
+            else:
+                await self._fail(job, error)
+                logger.error(f"Job {job['id']} failed after {job['attempts']} attempts: {error}")
+            return
+        finally:
+            heartbeat.cancel()
+
+        if await self._update_owned(job, {"status": "completed", "result": result, "error": None}):
+            self._counters["completed"] += 1
+
+    async def _work(self, worker_id: str):
+        while True:
+            # Cleared before claiming, so an enqueue during the claim still wakes us
+            self._wakeup.clear()
+            try:
+                job = await self.claim(worker_id)
+            except Exception as e:
+                logger.warning(f"Job claim failed: {e}")
+                job = None
+            if job is None:
+                # Sleep until a local enqueue or the next poll (other processes may enqueue)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Bookkeeping failed (e.g. MongoDB unavailable); the lease expiry recovers the job
+                logger.error(f"Job {job['id']} could not be recorded: {e}")
+
+    async def stats(self) -> Dict[str, Any]:
+        counts = {status: 0 for status in JOB_STATUSES}
+        try:
+            async for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+                counts[row["_id"]] = row["count"]
+        except Exception as e:
+            logger.warning(f"Could not count jobs: {e}")
+        return {"workers": self.workers, "lease_seconds": self.lease_seconds, "jobs": counts, **self._counters}
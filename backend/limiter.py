@@ -0,0 +1,193 @@
+"""
+Adaptive concurrency limiter for outbound LLM calls.
+
+Every call to the provider goes through one process-wide AdaptiveLimiter.
+Its concurrency limit follows AIMD: each successful call nudges the limit
+up by 1/limit (about +1 per round of calls), and a 429 or a call slower
+than the latency target halves it. Only calls started after the last
+decrease count, so one overloaded round halves the limit once and its
+stragglers don't push it straight back up. Calls also draw estimated
+tokens from a tokens-per-minute bucket.
+
+Waiters are queued per caller (caller_key, e.g. the resume being cleaned)
+and served round-robin, so one long resume split into many sections cannot
+starve the others.
+"""
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from executor import summarize_timings, METRICS_WINDOW
+
+logger = logging.getLogger(__name__)
+
+# Who the current LLM call is made for; tasks started from a request inherit it
+caller_key: ContextVar[Optional[str]] = ContextVar('llm_caller_key', default=None)
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Best-effort check for a provider 429, whichever client library raised it"""
+    for attribute in ('status_code', 'status', 'http_status'):
+        if getattr(error, attribute, None) == 429:
+            return True
+    message = f"{type(error).__name__} {error}".lower()
+    return 'ratelimit' in message or 'rate limit' in message or '429' in message
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit plus tokens-per-minute budget, with a fair waiting queue"""
+
+    def __init__(self, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 16,
+                 tokens_per_minute: int = None, latency_target: float = None,
+                 decrease_factor: float = 0.5):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.tokens_per_minute = tokens_per_minute
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._tokens = float(tokens_per_minute or 0)
+        self._refilled_at = time.monotonic()
+        self._last_decrease = float('-inf')
+        self._waiters = OrderedDict()  # caller key -> deque of (future, tokens)
+        self._waiting = 0
+        self._timer = None
+        self._queue_wait = deque(maxlen=METRICS_WINDOW)
+        self._latency = deque(maxlen=METRICS_WINDOW)
+        self._counters = {"calls": 0, "succeeded": 0, "failed": 0, "rate_limited": 0, "slow": 0, "decreases": 0}
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.tokens_per_minute:
+            self._tokens = min(
+                float(self.tokens_per_minute),
+                self._tokens + (now - self._refilled_at) * self.tokens_per_minute / 60
+            )
+        self._refilled_at = now
+
+    def _dispatch(self):
+        """Grant free slots to waiters, one caller at a time in rotation"""
+        while self._waiters and self.in_flight < int(self.limit):
+            key, queue = next(iter(self._waiters.items()))
+            future, tokens = queue[0]
+            if future.done():
+                # Cancelled while queued; its task has not woken up to remove it yet
+                self._pop_waiter(key, queue)
+                continue
+            if self.tokens_per_minute:
+                self._refill()
+                # A call bigger than the whole budget waits for a full bucket
+                needed = min(tokens, self.tokens_per_minute)
+                if self._tokens < needed:
+                    if self._timer is None:
+                        delay = (needed - self._tokens) * 60 / self.tokens_per_minute
+                        self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+                    return
+                self._tokens -= tokens
+
+            self._pop_waiter(key, queue)
+            if key in self._waiters:
+                self._waiters.move_to_end(key)
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _pop_waiter(self, key: Any, queue: deque):
+        queue.popleft()
+        self._waiting -= 1
+        if not queue:
+            del self._waiters[key]
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    async def acquire(self, tokens: int = 0):
+        key = caller_key.get()
+        waiter = (asyncio.get_running_loop().create_future(), tokens)
+        self._waiters.setdefault(key, deque()).append(waiter)
+        self._waiting += 1
+        queued_at = time.monotonic()
+        self._dispatch()
+        try:
+            await waiter[0]
+        except asyncio.CancelledError:
+            queue = self._waiters.get(key)
+            if queue is not None and waiter in queue:
+                queue.remove(waiter)
+                self._waiting -= 1
+                if not queue:
+                    del self._waiters[key]
+            elif not waiter[0].cancelled():
+                # Granted just as we were cancelled; hand the slot back
+                self._release()
+            raise
+        self._queue_wait.append(time.monotonic() - queued_at)
+
+    def _release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _decrease(self, reason: str):
+        self._last_decrease = time.monotonic()
+        self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+        self._counters["decreases"] += 1
+        logger.warning(f"LLM concurrency limit lowered to {int(self.limit)} ({reason})")
+
+    def _record(self, started: float, error: Optional[BaseException]):
+        latency = time.monotonic() - started
+        # Calls from before the last decrease describe the old limit
+        current_round = started > self._last_decrease
+        self._counters["calls"] += 1
+        if error is None:
+            self._counters["succeeded"] += 1
+            self._latency.append(latency)
+            if self.latency_target and latency > self.latency_target:
+                self._counters["slow"] += 1
+                if current_round:
+                    self._decrease(f"call took {latency:.1f}s")
+            elif current_round:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        elif is_rate_limit_error(error):
+            self._counters["rate_limited"] += 1
+            if current_round:
+                self._decrease("rate limited")
+        else:
+            self._counters["failed"] += 1
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0):
+        """Hold one concurrency slot (and `tokens` of budget) for the duration of an LLM call"""
+        await self.acquire(tokens)
+        started = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            # Says nothing about the provider; leave the limit alone
+            self._release()
+            raise
+        except Exception as e:
+            self._record(started, e)
+            self._release()
+            raise
+        self._record(started, None)
+        self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "limit": int(self.limit),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "waiting": self._waiting,
+            "waiting_callers": len(self._waiters),
+            "tokens_per_minute": self.tokens_per_minute,
+            "tokens_available": int(self._tokens) if self.tokens_per_minute else None,
+            "latency_target": self.latency_target,
+            **self._counters,
+            "queue_wait": summarize_timings(self._queue_wait),
+            "latency": summarize_timings(self._latency),
+        }
@@ -0,0 +1,94 @@
+"""
+Pool of reusable LLM chat clients.
+
+Building an LlmChat per call repeats its configuration and session setup
+and throws away whatever HTTP client state it holds. The pool keeps up to
+`size` configured clients and hands them out one call at a time. Before
+reuse a client's conversation history is reset to its initial state (just
+the system prompt), so calls never see each other's messages; a client
+whose history cannot be reset, or whose call failed, is discarded and
+replaced with a fresh one. Clients with no history list the pool knows are
+never reused; the first such client logs a warning, since the pool is
+then only a pass-through.
+"""
+import time
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict
+
+from executor import summarize_timings, METRICS_WINDOW
+
+logger = logging.getLogger(__name__)
+
+# Where chat clients keep the running conversation
+HISTORY_ATTRIBUTES = ('messages', 'history', '_messages')
+
+class LLMClientPool:
+    """Reusable chat clients with history reset and reuse/setup-time metrics"""
+
+    def __init__(self, factory: Callable[[int], Any], size: int = 16):
+        self.factory = factory
+        self.size = size
+        self._idle = deque()
+        self._in_use = 0
+        self._created = 0
+        self._setup_time = deque(maxlen=METRICS_WINDOW)
+        self._counters = {"acquired": 0, "reused": 0, "discarded": 0, "reset_unsupported": 0}
+
+    def _new_client(self) -> tuple:
+        client = self.factory(self._created)
+        self._created += 1
+        # Snapshot the pristine history so reuse can restore it
+        for attribute in HISTORY_ATTRIBUTES:
+            history = getattr(client, attribute, None)
+            if isinstance(history, list):
+                return client, attribute, list(history)
+        return client, None, None
+
+    def _checkout(self) -> tuple:
+        if self._idle:
+            client, attribute, initial = self._idle.pop()
+            setattr(client, attribute, list(initial))
+            self._counters["reused"] += 1
+            return client, attribute, initial
+        return self._new_client()
+
+    @asynccontextmanager
+    async def client(self):
+        """Borrow a client with a clean history for one call"""
+        started = time.perf_counter()
+        entry = self._checkout()
+        self._setup_time.append(time.perf_counter() - started)
+        self._counters["acquired"] += 1
+        self._in_use += 1
+        healthy = False
+        try:
+            yield entry[0]
+            healthy = True
+        finally:
+            self._in_use -= 1
+            if entry[1] is None:
+                # No history we know how to reset; never share this client
+                if not self._counters["reset_unsupported"]:
+                    logger.warning(
+                        f"{type(entry[0]).__name__} has none of {', '.join(HISTORY_ATTRIBUTES)}; "
+                        f"its clients cannot be reset and will not be reused"
+                    )
+                self._counters["reset_unsupported"] += 1
+            elif healthy and len(self._idle) < self.size:
+                self._idle.append(entry)
+            else:
+                self._counters["discarded"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        acquired = self._counters["acquired"]
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "created": self._created,
+            **self._counters,
+            "reuse_rate": round(self._counters["reused"] / acquired, 4) if acquired else 0.0,
+            "setup_time": summarize_timings(self._setup_time),
+        }
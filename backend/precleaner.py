@@ -0,0 +1,159 @@
+"""
+Deterministic pre-cleaning.
+
+Fixes the mechanical problems the LLM would otherwise spend tokens on:
+runs of spaces, a space before punctuation, a missing space after a comma
+or semicolon, doubled punctuation, mixed bullet characters and a lone
+lowercase "i". Every fix is an Edit on the original text; the LLM then
+sees the pre-cleaned text, and PrecleanResult.to_original maps positions
+in it back onto the original so its changes line up with these edits.
+
+has_prose tells apart sections worth sending to the LLM from contact
+blocks, skill lists, date lines and headings. Those are recognised by
+their patterns; anything else, however short, counts as prose.
+"""
+import re
+from bisect import bisect_right
+from collections import Counter
+from typing import List, NamedTuple
+
+BULLET_CHARS = '•●▪◦‣∙·*–-'
+
+_MECHANICAL_RE = re.compile(
+    r"(?P<space_before>(?<=[A-Za-z)]) +(?=[,;:!?]|\.(?:\s|$)))"
+    r"|(?P<doubled>(?P<mark>[,;:!?])(?P=mark)+|(?<!\.)\.\.(?!\.))"
+    r"|(?P<tight>(?<=[A-Za-z ])[,;](?=[A-Za-z]))"
+    r"|(?P<spaces>(?<=\S) {2,}(?=\S))"
+    r"|(?P<lone_i>(?<![\w.@/'’-])i(?=['’](?:m|ve|d|ll)\b|[\s,;:!?]|\.(?!\w)|$))",
+    re.MULTILINE
+)
+_BULLET_RE = re.compile(rf"^[ \t]*(?P<bullet>[{re.escape(BULLET_CHARS)}])(?=[ \t])", re.MULTILINE)
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z'’-]*")
+
+class Edit(NamedTuple):
+    start: int  # span in the original text
+    end: int
+    original: str
+    suggested: str
+    pre_start: int  # span of `suggested` in the pre-cleaned text
+    pre_end: int
+
+class PrecleanResult(NamedTuple):
+    text: str
+    edits: List[Edit]
+
+    def to_original(self, position: int, is_end: bool = False) -> int:
+        """Map a position in the pre-cleaned text to the original text"""
+        index = bisect_right([edit.pre_start for edit in self.edits], position) - 1
+        if index < 0:
+            return position
+        edit = self.edits[index]
+        if position >= edit.pre_end:
+            return edit.end + (position - edit.pre_end)
+        # Inside a replaced span: snap outward to the whole edit
+        return edit.end if is_end and position > edit.pre_start else edit.start
+
+def _raw_edits(text: str) -> List[tuple]:
+    edits = []
+    for match in _MECHANICAL_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == 'space_before':
+            replacement = ''
+        elif kind == 'doubled':
+            replacement = match.group()[0]
+            # ",,next" also lacks the space after the comma
+            if replacement in ',;' and _WORD_RE.match(text, match.end()):
+                replacement += ' '
+        elif kind == 'tight':
+            replacement = match.group() + ' '
+        elif kind == 'spaces':
+            replacement = ' '
+        else:
+            replacement = 'I'
+        edits.append((match.start(), match.end(), replacement))
+
+    # Use the document's most common bullet everywhere
+    bullets = [(match.start('bullet'), match.group('bullet')) for match in _BULLET_RE.finditer(text)]
+    if bullets:
+        dominant = Counter(bullet for _, bullet in bullets).most_common(1)[0][0]
+        edits.extend((position, position + 1, dominant) for position, bullet in bullets if bullet != dominant)
+    return sorted(edits)
+
+def _word_bounds(text: str, start: int, end: int) -> tuple:
+    """Widen a span to the whole words it touches, so the change reads as words"""
+    while start > 0 and not text[start - 1].isspace():
+        start -= 1
+    while end < len(text) and not text[end].isspace():
+        end += 1
+    return start, end
+
+def preclean(text: str) -> PrecleanResult:
+    """Apply the mechanical fixes; returns the pre-cleaned text and one Edit per changed word group"""
+    raw_edits = _raw_edits(text)
+
+    # Group raw edits whose word spans touch, so each group becomes one change
+    groups = []
+    for start, end, replacement in raw_edits:
+        span_start, span_end = _word_bounds(text, start, end)
+        if groups and span_start <= groups[-1][1]:
+            groups[-1][1] = max(groups[-1][1], span_end)
+            groups[-1][2].append((start, end, replacement))
+        else:
+            groups.append([span_start, span_end, [(start, end, replacement)]])
+
+    parts, edits = [], []
+    position, shift = 0, 0
+    for span_start, span_end, group in groups:
+        suggested, cursor = [], span_start
+        for start, end, replacement in group:
+            suggested.append(text[cursor:start])
+            suggested.append(replacement)
+            cursor = end
+        suggested.append(text[cursor:span_end])
+        suggested = ''.join(suggested)
+
+        parts.append(text[position:span_start])
+        parts.append(suggested)
+        position = span_end
+        pre_start = span_start + shift
+        edits.append(Edit(span_start, span_end, text[span_start:span_end], suggested,
+                          pre_start, pre_start + len(suggested)))
+        shift += len(suggested) - (span_end - span_start)
+    parts.append(text[position:])
+    return PrecleanResult(''.join(parts), edits)
+
+_CONTACT_OR_DATE_RE = re.compile(
+    r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"  # email
+    r"|(?:https?://|www\.)\S+|\b(?:linkedin|github)\.com/\S*"  # url
+    r"|\+?\(?\d[\d ().-]{6,}\d"  # phone
+    r"|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?,? +\d{4}\b"  # month year
+    r"|\b\d{1,2}/\d{2,4}\b|\b(?:19|20)\d{2}\b|\b(?:present|current|now)\b",  # numeric date, year
+    re.IGNORECASE
+)
+# List items are separated by commas, pipes, semicolons, middle dots or a spaced dash/slash
+_LIST_SEPARATOR_RE = re.compile(r"[,|;•·]|\s[-–—/]\s")
+_LABEL_RE = re.compile(r"^[A-Za-z][\w &/]{0,30}:\s*")
+
+def _is_prose_line(line: str) -> bool:
+    """False for contact details, dates, lists and headings; any other line reads as prose"""
+    bullet = line[:1] in BULLET_CHARS
+    line = line.lstrip(BULLET_CHARS).strip()
+    if not line:
+        return False
+    if not bullet and (line.endswith(':') or (line.isupper() and len(line.split()) <= 4)):
+        # Section heading
+        return False
+    remainder, contact_or_date = _CONTACT_OR_DATE_RE.subn(' ', _LABEL_RE.sub('', line))
+    items = [item for item in _LIST_SEPARATOR_RE.split(remainder) if re.search(r"[^\W\d_]", item)]
+    short_items = all(len(item.split()) <= 3 for item in items)
+    if not items or (short_items and (contact_or_date or len(items) >= 3)):
+        return False
+    if bullet or len(items) > 1:
+        return True
+    # A name or job title on a line of its own
+    words = items[0].split()
+    return len(words) > 3 or not all(word[:1].isupper() for word in words)
+
+def has_prose(text: str) -> bool:
+    """True if any line reads like a sentence or bullet rather than contact details, dates, a list or a heading"""
+    return any(_is_prose_line(line.strip()) for line in text.splitlines())
@@ -0,0 +1,189 @@
+"""
+LLM providers.
+
+The server talks to the model only through an LLMProvider: it builds the
+chat clients that LLMClientPool hands out, and sends one message on one of
+them. EmergentProvider is the real backend (emergentintegrations'
+LlmChat). MockProvider answers locally, with a configurable latency
+distribution, error rate and deterministic edits, so throughput benchmarks
+and CI run without network and without spending tokens.
+
+LLM_BACKEND selects the provider (emergent by default, or mock); see
+provider_from_env for the mock's settings.
+"""
+import os
+import re
+import json
+import math
+import uuid
+import random
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Callable
+
+class LLMProvider(ABC):
+    """Builds chat clients and sends messages on them"""
+
+    # Cache key component: a cached response is only reused for the same provider and model
+    name = "base"
+    # False when the backend is missing credentials
+    configured = True
+
+    @abstractmethod
+    def create_chat(self, index: int, system_message: str) -> Any:
+        """A new chat client"""
+
+    @abstractmethod
+    async def send(self, chat: Any, text: str) -> str:
+        """Send one message on a chat client and return the response text"""
+
+    async def stream(self, chat: Any, text: str) -> AsyncIterator[str]:
+        """Response chunks as they arrive; backends without streaming yield the whole response"""
+        yield await self.send(chat, text)
+
+class EmergentProvider(LLMProvider):
+    """emergentintegrations' LlmChat against a hosted model"""
+
+    def __init__(self, api_key: str, provider: str = 'openai', model: str = 'gpt-4o'):
+        self.api_key = api_key
+        self.provider = provider
+        self.model = model
+        self.name = f"{provider}/{model}"
+        self.configured = bool(api_key)
+
+    def create_chat(self, index: int, system_message: str) -> Any:
+        # Imported here so the mock backend runs where emergentintegrations is not installed
+        from emergentintegrations.llm.chat import LlmChat
+        return LlmChat(
+            api_key=self.api_key,
+            session_id=f"resume-cleaning-{index}-{uuid.uuid4()}",
+            system_message=system_message
+        ).with_model(self.provider, self.model)
+
+    async def send(self, chat: Any, text: str) -> str:
+        from emergentintegrations.llm.chat import UserMessage
+        return await chat.send_message(UserMessage(text=text))
+
+class MockProviderError(Exception):
+    """A simulated provider failure; status_code 429 for rate limits, 500 otherwise"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Mock provider error {status_code}")
+        self.status_code = status_code
+
+class MockChat:
+    """Stands in for LlmChat; keeps a history so the client pool can reset it"""
+
+    def __init__(self, system_message: str):
+        self.system_message = system_message
+        self.messages = [{"role": "system", "content": system_message}]
+
+# Deterministic "fixes" the mock applies, with the category it reports them as
+MOCK_REPLACEMENTS = {
+    "teh": ("the", "grammar"),
+    "recieve": ("receive", "grammar"),
+    "recieved": ("received", "grammar"),
+    "seperate": ("separate", "grammar"),
+    "managment": ("management", "grammar"),
+    "occured": ("occurred", "grammar"),
+    "acheive": ("achieve", "grammar"),
+    "acheived": ("achieved", "grammar"),
+    "responsable": ("responsible", "grammar"),
+    "alot": ("a lot", "grammar"),
+    "utilized": ("used", "style"),
+    "utilize": ("use", "style"),
+}
+_MOCK_WORD_RE = re.compile(r"\b(" + "|".join(MOCK_REPLACEMENTS) + r")\b", re.IGNORECASE)
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Latency sampler from "constant:S", "uniform:LOW,HIGH" or "lognormal:MEDIAN,SIGMA" (seconds)"""
+    kind, _, arguments = spec.partition(':')
+    values = [float(value) for value in arguments.split(',') if value.strip()]
+    kind = kind.strip().lower()
+    if kind == 'constant' and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == 'uniform' and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'lognormal' and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unsupported mock latency '{spec}', expected constant:S, uniform:LOW,HIGH or lognormal:MEDIAN,SIGMA")
+
+def _mock_fix(word: str) -> tuple:
+    replacement, category = MOCK_REPLACEMENTS[word.lower()]
+    if word[0].isupper():
+        replacement = replacement[0].upper() + replacement[1:]
+    return replacement, category
+
+def mock_edits(text: str) -> list:
+    """The edits the mock makes to text, in edit-list form"""
+    edits = []
+    for match in _MOCK_WORD_RE.finditer(text):
+        replacement, category = _mock_fix(match.group())
+        edits.append({"find": match.group(), "replace": replacement, "category": category, "offset": match.start()})
+    return edits
+
+class MockProvider(LLMProvider):
+    """Local stand-in for a hosted model: simulated latency, failures and deterministic edits"""
+
+    name = "mock/mock"
+
+    def __init__(self, latency: str = 'lognormal:0.8,0.4', seconds_per_token: float = 0.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, seed: int = None):
+        self.sample_latency = parse_latency(latency)
+        self.seconds_per_token = seconds_per_token
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._random = random.Random(seed)
+
+    def create_chat(self, index: int, system_message: str) -> MockChat:
+        return MockChat(system_message)
+
+    def respond(self, chat: MockChat, text: str) -> str:
+        """The deterministic response to a message: the rewritten text, or an edit list when asked for one"""
+        # Messages are "<instruction>:\n\n<resume text>"
+        _, _, resume_text = text.partition("\n\n")
+        if '"edits"' in chat.system_message:
+            return json.dumps({"edits": mock_edits(resume_text)})
+        return _MOCK_WORD_RE.sub(lambda match: _mock_fix(match.group())[0], resume_text)
+
+    def _check_failure(self):
+        roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            raise MockProviderError(429)
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise MockProviderError(500)
+
+    async def stream(self, chat: MockChat, text: str) -> AsyncIterator[str]:
+        chat.messages.append({"role": "user", "content": text})
+        # Time to first token, then the output at seconds_per_token (about 4 characters per token)
+        await asyncio.sleep(self.sample_latency(self._random))
+        self._check_failure()
+        response = self.respond(chat, text)
+        chunks = [response[start:start + 16] for start in range(0, len(response), 16)] or [""]
+        for chunk in chunks:
+            if self.seconds_per_token:
+                await asyncio.sleep(self.seconds_per_token * len(chunk) / 4)
+            yield chunk
+        chat.messages.append({"role": "assistant", "content": response})
+
+    async def send(self, chat: MockChat, text: str) -> str:
+        return "".join([chunk async for chunk in self.stream(chat, text)])
+
+def provider_from_env() -> LLMProvider:
+    backend = os.environ.get('LLM_BACKEND', 'emergent').lower()
+    if backend == 'mock':
+        seed = os.environ.get('MOCK_LLM_SEED')
+        return MockProvider(
+            latency=os.environ.get('MOCK_LLM_LATENCY', 'lognormal:0.8,0.4'),
+            seconds_per_token=float(os.environ.get('MOCK_LLM_SECONDS_PER_TOKEN', '0')),
+            error_rate=float(os.environ.get('MOCK_LLM_ERROR_RATE', '0')),
+            rate_limit_rate=float(os.environ.get('MOCK_LLM_RATE_LIMIT_RATE', '0')),
+            seed=int(seed) if seed else None
+        )
+    if backend != 'emergent':
+        raise ValueError(f"Unsupported LLM_BACKEND '{backend}', expected emergent or mock")
+    return EmergentProvider(
+        api_key=os.environ.get('EMERGENT_LLM_KEY'),
+        provider=os.environ.get('LLM_PROVIDER', 'openai'),
+        model=os.environ.get('LLM_MODEL', 'gpt-4o')
+    )
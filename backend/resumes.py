@@ -0,0 +1,200 @@
+"""
+Resume documents in MongoDB.
+
+Every lookup goes through an index (the unique `id` one for single
+resumes, `batch_id` for batches), and every read names the fields it
+needs: a resume carries its original and cleaned text plus the change
+list, which is most of its size, and most endpoints need only part of it.
+The filters are built here, next to the indexes that serve them, so the
+index test checks the queries the server actually sends. Batch records
+(a batch's items, by upload order) are kept here too.
+
+Changes are stored column-wise in `change_columns`, in id order (ids are
+0..n-1): offsets and type codes as packed binary, the suggestions as one
+string, and `accepted` as a bitset of int64 words so a toggle is a single
+$bit update. `original` and `context` are not stored; they are slices of
+original_text. resume_changes turns either this or a legacy `changes`
+list of dicts back into the API's change dicts.
+"""
+import struct
+import logging
+from typing import Any, Dict, List, Optional
+
+from bson.int64 import Int64
+
+logger = logging.getLogger(__name__)
+
+# (keys, options) for create_index
+RESUME_INDEXES = (
+    ([("id", 1)], {"unique": True}),
+    ([("batch_id", 1)], {"sparse": True}),
+    # Resumes by status, newest first (stuck or failed processing)
+    ([("processing_status", 1), ("upload_timestamp", -1)], {}),
+)
+BATCH_INDEXES = (
+    ([("id", 1)], {"unique": True}),
+)
+
+# Projections, by what the caller reads; `changes` is there for legacy documents
+CLAIM_STATE: Dict[str, Any] = {"_id": 0, "processing_status": 1, "job_id": 1, "queued_at": 1}
+PROCESSING_INPUT: Dict[str, Any] = {"_id": 0, "original_text": 1}
+FINAL_TEXT_INPUT: Dict[str, Any] = {"_id": 0, "original_text": 1, "change_columns": 1, "changes": 1}
+PROCESSING_RESULT: Dict[str, Any] = {
+    "_id": 0, "original_text": 1, "cleaned_text": 1, "change_columns": 1, "changes": 1
+}
+RESUME_VIEW: Dict[str, Any] = {
+    "_id": 0, "filename": 1, "file_type": 1, "processing_status": 1,
+    "original_text": 1, "cleaned_text": 1, "change_columns": 1, "changes": 1, "upload_timestamp": 1
+}
+CHANGE_COUNT: Dict[str, Any] = {"change_columns.count": 1, "changes.id": 1}
+CHANGE_SELECTION: Dict[str, Any] = {
+    "_id": 0, "change_columns.count": 1, "change_columns.starts": 1,
+    "change_columns.ends": 1, "change_columns.types": 1
+}
+
+# Stored as the index into this tuple
+CHANGE_TYPES = ('grammar', 'punctuation', 'style', 'mechanical')
+ACCEPTED_WORD_BITS = 64
+# Characters of original text on each side of a change in its context
+CONTEXT_CHARS = 50
+
+async def _ensure_indexes(collection, indexes: tuple, what: str):
+    try:
+        for keys, options in indexes:
+            await collection.create_index(keys, **options)
+    except Exception as e:
+        logger.warning(f"Could not create {what} indexes: {e}")
+
+async def ensure_resume_indexes(collection):
+    await _ensure_indexes(collection, RESUME_INDEXES, "resume")
+
+async def ensure_batch_indexes(collection):
+    await _ensure_indexes(collection, BATCH_INDEXES, "batch")
+
+def resume_filter(file_id: str) -> Dict[str, Any]:
+    return {"id": file_id}
+
+def owned_filter(file_id: str, claim_id: str) -> Dict[str, Any]:
+    """The resume, only while the job or stream `claim_id` owns it"""
+    return {"id": file_id, "job_id": claim_id}
+
+def claim_filter(file_id: str, claim_state: Dict[str, Any]) -> Dict[str, Any]:
+    """The resume, only while it is still in the CLAIM_STATE read (compare-and-swap)"""
+    return {"id": file_id, "processing_status": claim_state["processing_status"], "job_id": claim_state.get("job_id")}
+
+def stored_change_filter(file_id: str, index: int) -> Dict[str, Any]:
+    """The resume, if its stored changes include the one at `index`"""
+    return {"id": file_id, "change_columns.count": {"$gt": index}}
+
+def same_changes_filter(file_id: str, count: int) -> Dict[str, Any]:
+    """The resume, if its change list was not replaced since it held `count` changes"""
+    return {"id": file_id, "change_columns.count": count}
+
+def legacy_change_filter(file_id: str, change_id: str) -> Dict[str, Any]:
+    return {"id": file_id, "changes.id": change_id}
+
+def legacy_changes_filter(file_id: str) -> Dict[str, Any]:
+    """The resume, if it has a legacy change list (array updates fail on others)"""
+    return {"id": file_id, "changes": {"$type": "array"}}
+
+def batch_resumes_filter(batch_id: str) -> Dict[str, Any]:
+    return {"batch_id": batch_id}
+
+def batch_filter(batch_id: str) -> Dict[str, Any]:
+    """A batch record, in the batches collection"""
+    return {"id": batch_id}
+
+def _pack_uint32(values: List[int]) -> bytes:
+    return struct.pack(f"<{len(values)}I", *values)
+
+def _unpack_uint32(data: bytes) -> List[int]:
+    return list(struct.unpack(f"<{len(data) // 4}I", data))
+
+def _signed_word(value: int) -> Int64:
+    """A 64-bit pattern as the signed value BSON stores"""
+    return Int64(value - (1 << 64) if value >= 1 << 63 else value)
+
+def pack_changes(changes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Column-wise storage for change dicts whose ids are 0..n-1"""
+    changes = sorted(changes, key=lambda change: int(change["id"]))
+    if [int(change["id"]) for change in changes] != list(range(len(changes))):
+        raise ValueError("Change ids must be 0..n-1")
+    suggested = [change["suggested"] for change in changes]
+    words = [0] * -(-len(changes) // ACCEPTED_WORD_BITS)
+    for index, change in enumerate(changes):
+        if change.get("accepted"):
+            words[index // ACCEPTED_WORD_BITS] |= 1 << (index % ACCEPTED_WORD_BITS)
+    return {
+        "count": len(changes),
+        "starts": _pack_uint32([change["start_pos"] for change in changes]),
+        "ends": _pack_uint32([change["end_pos"] for change in changes]),
+        "types": bytes(CHANGE_TYPES.index(change["change_type"]) for change in changes),
+        "suggested": "".join(suggested),
+        "suggested_lengths": _pack_uint32([len(text) for text in suggested]),
+        "accepted": [_signed_word(word) for word in words]
+    }
+
+def unpack_changes(columns: Dict[str, Any], original_text: str) -> List[Dict[str, Any]]:
+    """The API's change dicts, in text order, from stored columns"""
+    starts, ends = _unpack_uint32(columns["starts"]), _unpack_uint32(columns["ends"])
+    words = columns["accepted"]
+    changes, cursor = [], 0
+    for index, length in enumerate(_unpack_uint32(columns["suggested_lengths"])):
+        start, end = starts[index], ends[index]
+        changes.append({
+            "id": str(index),
+            "original": original_text[start:end],
+            "suggested": columns["suggested"][cursor:cursor + length],
+            "start_pos": start,
+            "end_pos": end,
+            "change_type": CHANGE_TYPES[columns["types"][index]],
+            "accepted": bool(words[index // ACCEPTED_WORD_BITS] >> (index % ACCEPTED_WORD_BITS) & 1),
+            "context": original_text[max(0, start - CONTEXT_CHARS):end + CONTEXT_CHARS]
+        })
+        cursor += length
+    changes.sort(key=lambda change: (change["start_pos"], change["end_pos"]))
+    return changes
+
+def resume_changes(resume_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """A resume's changes as API dicts, from either storage format"""
+    columns = resume_data.get("change_columns")
+    if columns:
+        return unpack_changes(columns, resume_data.get("original_text") or "")
+    return resume_data.get("changes") or []
+
+def change_count(resume_data: Dict[str, Any]) -> int:
+    columns = resume_data.get("change_columns")
+    if columns:
+        return columns["count"]
+    return len(resume_data.get("changes") or [])
+
+def matching_changes(columns: Dict[str, Any], change_ids: Optional[List[str]] = None,
+                     change_type: Optional[str] = None, start_pos: Optional[int] = None,
+                     end_pos: Optional[int] = None) -> List[int]:
+    """Indexes of the stored changes that match every given selector"""
+    indexes = range(columns["count"])
+    if change_ids is not None:
+        ids = {int(change_id) for change_id in change_ids if change_id.isdigit()}
+        indexes = [index for index in indexes if index in ids]
+    if change_type is not None:
+        code = CHANGE_TYPES.index(change_type) if change_type in CHANGE_TYPES else -1
+        indexes = [index for index in indexes if columns["types"][index] == code]
+    if start_pos is not None:
+        starts = _unpack_uint32(columns["starts"])
+        indexes = [index for index in indexes if starts[index] >= start_pos]
+    if end_pos is not None:
+        ends = _unpack_uint32(columns["ends"])
+        indexes = [index for index in indexes if ends[index] <= end_pos]
+    return list(indexes)
+
+def accepted_update(indexes: List[int], accepted: bool) -> Dict[str, Any]:
+    """$bit update setting or clearing the accepted bits of the changes at these indexes"""
+    masks = {}
+    for index in indexes:
+        word = index // ACCEPTED_WORD_BITS
+        masks[word] = masks.get(word, 0) | 1 << (index % ACCEPTED_WORD_BITS)
+    return {"$bit": {
+        f"change_columns.accepted.{word}": {"or": _signed_word(mask)} if accepted
+        else {"and": _signed_word(~mask & (1 << 64) - 1)}
+        for word, mask in masks.items()
+    }}
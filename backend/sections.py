@@ -0,0 +1,121 @@
+"""
+Resume segmentation.
+
+Splits resume text into sections (Summary, Experience, Education, Skills...)
+small enough to clean independently. Segments are exact slices of the
+input: concatenating their text gives back the original, and each carries
+its start offset so per-section results map back onto the full document.
+"""
+import re
+from typing import List, NamedTuple
+
+# Rough token estimate for English prose
+CHARS_PER_TOKEN = 4
+
+KNOWN_HEADINGS = {
+    "summary", "professional summary", "profile", "objective", "about me", "contact",
+    "contact information", "experience", "work experience", "professional experience",
+    "employment history", "education", "skills", "technical skills", "core competencies",
+    "projects", "certifications", "awards", "publications", "languages", "interests",
+    "volunteer experience", "references", "achievements", "training", "activities",
+}
+
+_BLANK_LINE_RE = re.compile(r'\n[ \t]*\n')
+_LINE_BREAK_RE = re.compile(r'\n')
+
+class Section(NamedTuple):
+    title: str
+    start: int
+    text: str
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.text)
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def is_heading(line: str) -> bool:
+    """Heuristic: a known heading, a short line ending in ':', or a short all-caps line"""
+    stripped = line.strip()
+    if not stripped or len(stripped) > 40:
+        return False
+    bare = stripped.rstrip(':').strip().lower()
+    if bare in KNOWN_HEADINGS:
+        return True
+    words = stripped.split()
+    if stripped.endswith(':') and len(words) <= 4:
+        return True
+    return stripped.isupper() and len(words) <= 4 and any(char.isalpha() for char in stripped)
+
+def _split_at_headings(text: str) -> List[Section]:
+    sections = []
+    title, start, offset = "", 0, 0
+    for line in text.splitlines(keepends=True):
+        if is_heading(line) and offset > start:
+            sections.append(Section(title, start, text[start:offset]))
+            start = offset
+        if is_heading(line):
+            title = line.strip().rstrip(':')
+        offset += len(line)
+    if offset > start:
+        sections.append(Section(title, start, text[start:offset]))
+    return sections
+
+def _split_oversized(section: Section, max_tokens: int) -> List[Section]:
+    """Split a section over budget at blank lines, then at line breaks"""
+    if estimate_tokens(section.text) <= max_tokens:
+        return [section]
+
+    for boundary in (_BLANK_LINE_RE, _LINE_BREAK_RE):
+        cuts = [match.end() for match in boundary.finditer(section.text) if match.end() < len(section.text)]
+        pieces, piece_start, last_cut = [], 0, 0
+        for cut in cuts + [len(section.text)]:
+            if estimate_tokens(section.text[piece_start:cut]) > max_tokens and last_cut > piece_start:
+                pieces.append((piece_start, last_cut))
+                piece_start = last_cut
+            last_cut = cut
+        pieces.append((piece_start, len(section.text)))
+        if len(pieces) > 1:
+            break
+    else:
+        return [section]  # One enormous line; nothing sensible to split on
+
+    result = []
+    for piece_start, piece_end in pieces:
+        piece = Section(section.title, section.start + piece_start, section.text[piece_start:piece_end])
+        # A paragraph can still be over budget; split it at line breaks
+        result.extend(_split_oversized(piece, max_tokens))
+    return result
+
+def _merge_small(sections: List[Section], min_tokens: int, max_tokens: int) -> List[Section]:
+    """Fold sections that are too small to be worth their own request into the next one"""
+    merged = []
+    pending = None
+    for section in sections:
+        if pending is not None:
+            combined = Section(pending.title, pending.start, pending.text + section.text)
+            if estimate_tokens(combined.text) <= max_tokens:
+                section = combined
+            else:
+                merged.append(pending)
+            pending = None
+        if estimate_tokens(section.text) < min_tokens:
+            pending = section
+        else:
+            merged.append(section)
+    if pending is not None:
+        if merged and estimate_tokens(merged[-1].text + pending.text) <= max_tokens:
+            last = merged.pop()
+            pending = Section(last.title, last.start, last.text + pending.text)
+        merged.append(pending)
+    return merged
+
+def split_sections(text: str, max_tokens: int = 600, min_tokens: int = 80) -> List[Section]:
+    """Split text into ordered sections of at most ~max_tokens, covering it exactly"""
+    if not text:
+        return []
+    sections = []
+    for section in _split_at_headings(text):
+        sections.extend(_split_oversized(section, max_tokens))
+    return _merge_small(sections, min_tokens, max_tokens)
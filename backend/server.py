@@ -1,5 +1,5 @@
-from fastapi import FastAPI, APIRouter, File, UploadFile, HTTPException, Form
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, APIRouter, File, UploadFile, HTTPException, Form, BackgroundTasks
+from fastapi.responses import FileResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -9,20 +9,41 @@ from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 import json
-import aiofiles
-import tempfile
-import shutil
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-import PyPDF2
-import pdfplumber
-from pdfminer.high_level import extract_text as pdfminer_extract_text
-import fitz  # PyMuPDF
-import docx
-import difflib
+import asyncio
+import hashlib
+from extraction import (
+    ExtractionResult, extract_document_text, extract_text_from_pdf as extract_pdf_serial,
+    extract_pdf_or_plan_shards, PdfShardPlan, plan_pdf_shards, extract_pdf_page_range, pdf_shard_method,
+    join_page_texts, score_page_texts, clean_extracted_text, check_extracted_size,
+    ExtractionLimitExceeded,
+    PDF_SHARD_PAGE_THRESHOLD, PDF_QUALITY_THRESHOLD
+)
+from executor import ExtractionExecutor, ExtractionQueueFull, ExtractionTimeout, ExtractionWorkerCrashed
+from cache import ExtractionCache, LLMResponseCache, SingleFlight
+from ingest import (
+    ingest_upload, open_zip_upload, spool_upload, UploadRejected, UploadTooLarge, IngestedUpload, MAX_UPLOAD_BYTES, MAX_ARCHIVE_BYTES
+)
+from sections import Section, split_sections, estimate_tokens
+from diff_engine import (
+    token_offsets, plan_document_diff, region_blocks, shard_regions, document_opcodes
+)
+from edits import EditListError, parse_edit_list, locate_edits, apply_edits
+from precleaner import PrecleanResult, preclean, has_prose
+from resumes import (
+    ensure_resume_indexes, ensure_batch_indexes, pack_changes, CLAIM_STATE, resume_changes, change_count,
+    matching_changes, accepted_update, PROCESSING_INPUT, FINAL_TEXT_INPUT, PROCESSING_RESULT, RESUME_VIEW,
+    CHANGE_COUNT, CHANGE_SELECTION, resume_filter, owned_filter, claim_filter, stored_change_filter,
+    same_changes_filter, legacy_change_filter, legacy_changes_filter, batch_resumes_filter, batch_filter
+)
+from jobs import JobQueue, PermanentJobError
+from limiter import AdaptiveLimiter, caller_key, is_rate_limit_error
+from llm_client import LLMClientPool
+from providers import LLMProvider, provider_from_env
 import re
-import unicodedata
+import io
+import zipfile
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -38,8 +59,108 @@ app = FastAPI()
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
-# AI Configuration
-EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY')
+# Extraction executor (process pool by default, see executor.py)
+extraction_executor = ExtractionExecutor.from_env()
+
+# Extracted text keyed by upload hash, so duplicate uploads skip extraction
+extraction_cache = ExtractionCache(
+    db.extraction_cache,
+    max_bytes=int(os.environ.get('EXTRACTION_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+    enabled=os.environ.get('EXTRACTION_CACHE_ENABLED', 'true').lower() == 'true',
+    ttl_seconds=float(os.environ.get('EXTRACTION_CACHE_TTL_SECONDS', str(7 * 24 * 3600))),
+    max_entries=int(os.environ.get('EXTRACTION_CACHE_MAX_ENTRIES', '100000'))
+)
+
+# AI Configuration: LLM_BACKEND picks the hosted model or the local mock (see providers.py)
+llm_provider: LLMProvider = provider_from_env()
+
+# Bump whenever RESUME_CLEANING_PROMPT changes so cached responses are not reused
+RESUME_CLEANING_PROMPT_VERSION = "1"
+RESUME_CLEANING_PROMPT = """You are an expert resume editor and professional writing assistant. Your task is to improve resume text by:
+
+1. Correcting grammar errors (subject-verb agreement, tense consistency, sentence structure)
+2. Fixing punctuation mistakes (commas, periods, apostrophes, quotation marks)
+3. Enhancing word choice and professional language
+4. Maintaining the original structure, formatting, and meaning
+5. Preserving all dates, names, contact information, and technical terms exactly as provided
+6. Keeping the professional tone appropriate for resumes
+
+IMPORTANT: Return ONLY the cleaned text without any explanations, comments, or additional formatting. Do not add introductory phrases like "Here's the cleaned version" or any other commentary."""
+
+RESUME_CLEANING_USER_TEMPLATE = "Please clean and improve this resume text:\n\n{text}"
+RESUME_CLEANING_PROMPT_TOKENS = estimate_tokens(RESUME_CLEANING_PROMPT)
+
+# The 'edits' mode asks for a JSON list of edits instead of the whole rewritten text (see edits.py);
+# its own prompt version keeps its cached responses apart from rewrites
+EDIT_LIST_PROMPT_VERSION = "edits-1"
+EDIT_LIST_PROMPT = """You are an expert resume editor and professional writing assistant. Find the problems in resume text:
+
+1. Grammar errors (subject-verb agreement, tense consistency, sentence structure)
+2. Punctuation mistakes (commas, periods, apostrophes, quotation marks)
+3. Weak word choice and unprofessional language
+
+Keep the original structure, formatting and meaning, and leave dates, names, contact information and technical terms exactly as provided.
+
+IMPORTANT: Do NOT rewrite the text. Return ONLY a JSON object listing your edits in the order they appear, with no explanations or other formatting:
+{"edits": [{"find": "exact text to replace", "replace": "replacement text", "category": "grammar", "offset": 0}]}
+
+"find" must be copied exactly from the text, just long enough to be unambiguous (usually one to four words). "category" is one of grammar, punctuation or style. "offset" is the character position where "find" starts. Return {"edits": []} if nothing needs changing."""
+
+EDIT_LIST_USER_TEMPLATE = "List the edits for this resume text:\n\n{text}"
+EDIT_LIST_PROMPT_TOKENS = estimate_tokens(EDIT_LIST_PROMPT)
+
+def create_llm_chat(index: int, system_message: str = RESUME_CLEANING_PROMPT) -> Any:
+    """A chat client configured for resume cleaning; pooled and reused across requests"""
+    return llm_provider.create_chat(index, system_message)
+
+LLM_CLIENT_POOL_SIZE = int(os.environ.get('LLM_CLIENT_POOL_SIZE', os.environ.get('LLM_MAX_IN_FLIGHT', '16')))
+llm_client_pool = LLMClientPool(create_llm_chat, size=LLM_CLIENT_POOL_SIZE)
+edit_list_client_pool = LLMClientPool(
+    lambda index: create_llm_chat(index, system_message=EDIT_LIST_PROMPT),
+    size=LLM_CLIENT_POOL_SIZE
+)
+
+# Cleaned text keyed by input text, model and prompt version
+llm_cache = LLMResponseCache(
+    db.llm_cache,
+    enabled=os.environ.get('LLM_CACHE_ENABLED', 'true').lower() == 'true',
+    ttl_seconds=float(os.environ.get('LLM_CACHE_TTL_SECONDS', str(7 * 24 * 3600))),
+    max_entries=int(os.environ.get('LLM_CACHE_MAX_ENTRIES', '100000'))
+)
+
+LLM_CACHE_MODEL = llm_provider.name
+
+# Concurrent identical LLM calls, and identical whole-resume runs, share one result
+llm_flights = SingleFlight()
+resume_flights = SingleFlight()
+
+# Process-wide adaptive cap on concurrent LLM calls (see limiter.py)
+llm_limiter = AdaptiveLimiter(
+    initial_limit=int(os.environ.get('LLM_INITIAL_CONCURRENCY', '4')),
+    max_limit=int(os.environ.get('LLM_MAX_IN_FLIGHT', '16')),
+    tokens_per_minute=int(os.environ.get('LLM_TOKENS_PER_MINUTE', '0')) or None,
+    latency_target=float(os.environ.get('LLM_LATENCY_TARGET_SECONDS', '60')) or None
+)
+LLM_RATE_LIMIT_RETRIES = int(os.environ.get('LLM_RATE_LIMIT_RETRIES', '3'))
+
+# Long resumes are split into sections and cleaned concurrently (see sections.py);
+# resumes under LLM_SECTIONED_MIN_TOKENS still go to the model in one call.
+# 'edits' splits the same way but asks the model for an edit list per section
+CLEANING_MODES = ('full', 'sectioned', 'edits')
+LLM_CLEANING_MODE = os.environ.get('LLM_CLEANING_MODE', 'sectioned').lower()
+LLM_SECTIONED_MIN_TOKENS = int(os.environ.get('LLM_SECTIONED_MIN_TOKENS', '1000'))
+LLM_SECTION_MAX_TOKENS = int(os.environ.get('LLM_SECTION_MAX_TOKENS', '600'))
+LLM_SECTION_CONCURRENCY = int(os.environ.get('LLM_SECTION_CONCURRENCY', '4'))
+
+# Changed-region size (tokens, both sides) above which change detection diffs regions in parallel.
+# Sections are diffed one at a time and stay far below this, so only 'full' mode reaches it
+DIFF_PARALLEL_MIN_TOKENS = int(os.environ.get('DIFF_PARALLEL_MIN_TOKENS', '20000'))
+
+ALLOWED_FILE_TYPES = ['pdf', 'docx', 'doc', 'txt']
+
+# Batch uploads: files per batch, and how many extractions a batch runs at once
+BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES', '500'))
+BATCH_EXTRACTION_CONCURRENCY = max(1, extraction_executor.max_workers * 2)
 
 # Define Models
 class ResumeUpload(BaseModel):
@@ -48,282 +169,542 @@ class ResumeUpload(BaseModel):
     file_type: str
     file_size: int
     upload_timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    processing_status: str = "uploaded"  # uploaded, processing, completed, error
+    processing_status: str = "uploaded"  # uploaded, queued, processing, completed, error
+    job_id: Optional[str] = None
+    batch_id: Optional[str] = None
+    content_hash: Optional[str] = None
     original_text: Optional[str] = None
+    extraction_method: Optional[str] = None
     cleaned_text: Optional[str] = None
-    changes: Optional[List[Dict[str, Any]]] = None
+    change_columns: Optional[Dict[str, Any]] = None  # see resumes.py; legacy documents have `changes` instead
+
+class ResumeBatch(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    created_timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    mode: str
+    items: List[Dict[str, Any]] = []  # filename, file_id (None if rejected), error
+    ingesting: bool = True  # items are still being listed, extracted and queued
+    error: Optional[str] = None  # why the whole upload was rejected
 
 class ResumeProcessingRequest(BaseModel):
     file_id: str
+    bypass_cache: bool = False  # force a fresh LLM call (the result still refreshes the cache)
+    mode: Optional[str] = None  # full, sectioned, edits; defaults to LLM_CLEANING_MODE
 
 class ChangeAction(BaseModel):
     file_id: str
     change_id: str
     action: str  # accept, reject
 
+class BulkChangeAction(BaseModel):
+    file_id: str
+    action: str  # accept, reject
+    # Selectors; a change must match all given ones, and with none given every change is updated
+    change_ids: Optional[List[str]] = None
+    change_type: Optional[str] = None
+    start_pos: Optional[int] = None  # changes lying within [start_pos, end_pos] of the original text
+    end_pos: Optional[int] = None
+
+CHANGE_ACTIONS = ('accept', 'reject')
+
 class WordChange(BaseModel):
     id: str
     original: str
     suggested: str
     start_pos: int
     end_pos: int
-    change_type: str  # grammar, punctuation, style
+    change_type: str  # grammar, punctuation, style, mechanical (pre-cleaner)
     accepted: bool = False
     context: str = ""
 
 # Utility Functions
-async def extract_text_from_file(file_path: str, file_type: str) -> str:
+async def extract_text_from_file(data: bytes, file_type: str) -> ExtractionResult:
     """Extract text from uploaded file based on type"""
     try:
+        # TXT is cheap enough to decode inline; everything else goes to the executor
+        if file_type.lower() == 'txt':
+            return ExtractionResult(extract_text_from_txt(data), "text")
         if file_type.lower() == 'pdf':
-            return await extract_text_from_pdf(file_path)
-        elif file_type.lower() in ['docx', 'doc']:
-            return await extract_text_from_docx(file_path)
-        elif file_type.lower() == 'txt':
-            return await extract_text_from_txt(file_path)
-        else:
-            raise ValueError(f"Unsupported file type: {file_type}")
+            return await extract_text_from_pdf(data)
+        return await extraction_executor.run(extract_document_text, data, file_type.lower())
+    except ExtractionQueueFull:
+        raise HTTPException(status_code=503, detail="Server is busy extracting other documents, please retry shortly")
+    except (ExtractionLimitExceeded, ExtractionTimeout, ExtractionWorkerCrashed) as e:
+        raise HTTPException(status_code=422, detail=f"Document rejected: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error extracting text: {str(e)}")
 
-def clean_extracted_text(text: str) -> str:
-    """Clean and normalize extracted text to handle encoding issues"""
-    if not text:
-        return ""
+async def extract_text_from_pdf(data: bytes) -> ExtractionResult:
+    """Extract PDF text, splitting large documents into page shards across workers"""
+    # One worker parses the PDF and extracts it, unless it is long enough to shard;
+    # thread pools share the GIL, so sharding there would not help
+    threshold = PDF_SHARD_PAGE_THRESHOLD if extraction_executor.kind == "process" else None
+    result = await extraction_executor.run(extract_pdf_or_plan_shards, data, threshold)
+    if not isinstance(result, PdfShardPlan):
+        return result
+    page_count = result.page_count
     
+    shards = [
+        asyncio.ensure_future(extraction_executor.run(extract_pdf_page_range, data, start, stop))
+        for start, stop in plan_pdf_shards(page_count, extraction_executor.max_workers)
+    ]
     try:
-        # Normalize Unicode characters
-        text = unicodedata.normalize('NFKD', text)
-        
-        # Remove control characters and fix common encoding issues
-        # Keep basic punctuation and alphanumeric characters
-        cleaned_chars = []
-        for char in text:
-            # Keep printable ASCII characters and common Unicode characters
-            if (ord(char) >= 32 and ord(char) <= 126) or char in '\n\t\r' or ord(char) >= 160:
-                cleaned_chars.append(char)
-            elif char.isspace():
-                cleaned_chars.append(' ')
-        
-        text = ''.join(cleaned_chars)
-        
-        # Clean up extra whitespace and line breaks
-        text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)  # Multiple blank lines to double
-        text = re.sub(r'[ \t]+', ' ', text)  # Multiple spaces/tabs to single space
-        text = re.sub(r'[ \t]*\n[ \t]*', '\n', text)  # Clean line breaks
-        
-        return text.strip()
-        
-    except Exception as e:
-        # If all else fails, try basic ASCII cleanup
-        try:
-            text = text.encode('ascii', 'ignore').decode('ascii')
-            return re.sub(r'\s+', ' ', text).strip()
-        except:
-            return str(text)
+        shard_pages = await asyncio.gather(*shards)
+    except BaseException:
+        for shard in shards:
+            shard.cancel()
+        raise
+    
+    page_texts = [page_text for pages in shard_pages for page_text in pages]
+    score = score_page_texts(page_texts)
+    if score >= PDF_QUALITY_THRESHOLD:
+        text = join_page_texts(page_texts)
+        check_extracted_size(len(text))
+        logger.info(f"PDF extraction successful with {len(shards)} page shards: {len(text)} characters")
+        return ExtractionResult(clean_extracted_text(text), pdf_shard_method(), round(score, 3))
+    
+    # Poor text from the shards; escalate through the remaining extractors
+    return await extraction_executor.run(extract_pdf_serial, data, (pdf_shard_method(), page_texts))
 
-def validate_pdf_file(file_path: str) -> tuple[bool, str]:
-    """Validate PDF file before processing"""
-    try:
-        # Check if file exists and has content
-        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
-            return False, "PDF file is empty or doesn't exist"
-        
-        # Check PDF header
-        with open(file_path, 'rb') as f:
-            header = f.read(8)
-            if not header.startswith(b'%PDF'):
-                return False, "File is not a valid PDF"
-        
-        # Try to open with PyMuPDF for basic validation
+def extract_text_from_txt(data: bytes) -> str:
+    """Extract text from TXT file"""
+    text = data.decode('utf-8')
+    # Same newline handling as reading the file in text mode
+    return text.replace('\r\n', '\n').replace('\r', '\n').strip()
+
+async def send_llm_message(pool: LLMClientPool, text: str, tokens: int) -> str:
+    """Send one message through the limiter on a pooled client, retrying when rate limited"""
+    for attempt in range(LLM_RATE_LIMIT_RETRIES + 1):
         try:
-            doc = fitz.open(file_path)
-            page_count = doc.page_count
-            doc.close()
-            
-            if page_count == 0:
-                return False, "PDF contains no pages"
-                
-            return True, f"PDF is valid with {page_count} pages"
+            async with llm_limiter.slot(tokens), pool.client() as chat:
+                response = await llm_provider.send(chat, text)
+            return response.strip()
             
         except Exception as e:
-            return False, f"PDF structure validation failed: {str(e)}"
-        
-    except Exception as e:
-        return False, f"PDF validation error: {str(e)}"
+            if not is_rate_limit_error(e):
+                raise HTTPException(status_code=500, detail=f"AI processing error: {str(e)}")
+            if attempt == LLM_RATE_LIMIT_RETRIES:
+                raise HTTPException(status_code=503, detail=f"AI provider is rate limiting requests: {str(e)}")
+            # The limiter has already lowered concurrency; back off before retrying
+            await asyncio.sleep(2 ** attempt)
+
+async def clean_text_with_ai(text: str) -> str:
+    """Use AI to clean and improve resume text"""
+    # Prompt plus a response about as long as the input
+    tokens = RESUME_CLEANING_PROMPT_TOKENS + 2 * estimate_tokens(text)
+    return await send_llm_message(llm_client_pool, RESUME_CLEANING_USER_TEMPLATE.format(text=text), tokens)
+
+async def list_edits_with_ai(text: str) -> str:
+    """Ask the model for an edit list for resume text; returns the validated edits as JSON"""
+    # Prompt plus the input; the edit list is a small fraction of the input
+    tokens = EDIT_LIST_PROMPT_TOKENS + estimate_tokens(text) + estimate_tokens(text) // 4
+    response = await send_llm_message(edit_list_client_pool, EDIT_LIST_USER_TEMPLATE.format(text=text), tokens)
+    return json.dumps(parse_edit_list(response))
+
+async def call_and_cache(call, text: str, prompt_version: str) -> str:
+    response = await call(text)
+    await llm_cache.put(text, LLM_CACHE_MODEL, prompt_version, response)
+    return response
+
+async def cached_llm_call(call, text: str, prompt_version: str, bypass_cache: bool = False) -> str:
+    """call(text), reusing an earlier response for the same text, model and prompt"""
+    if not bypass_cache:
+        response = await llm_cache.get(text, LLM_CACHE_MODEL, prompt_version)
+        if response is not None:
+            return response
+    
+    # The same text may already be on its way to the model (another request, file or section)
+    key = llm_cache.key(text, LLM_CACHE_MODEL, prompt_version)
+    return await llm_flights.do(key, call_and_cache, call, text, prompt_version)
+
+async def clean_text_cached(text: str, bypass_cache: bool = False) -> str:
+    """clean_text_with_ai through the LLM response cache"""
+    return await cached_llm_call(clean_text_with_ai, text, RESUME_CLEANING_PROMPT_VERSION, bypass_cache)
+
+async def list_edits_cached(text: str, bypass_cache: bool = False) -> str:
+    """list_edits_with_ai through the LLM response cache"""
+    return await cached_llm_call(list_edits_with_ai, text, EDIT_LIST_PROMPT_VERSION, bypass_cache)
 
-async def extract_text_from_pdf(file_path: str) -> str:
-    """Multi-method PDF text extraction with fallback strategies"""
+async def diff_texts(original: str, cleaned: str) -> tuple:
+    """Line-then-word diff; returns (original tokens, cleaned tokens, opcodes)"""
+    diff = plan_document_diff(original, cleaned)
+    changed_tokens = sum(len(a_ids) + len(b_ids) for a_ids, b_ids, _, _ in diff.regions)
     
-    # First validate the PDF
-    is_valid, validation_msg = validate_pdf_file(file_path)
-    if not is_valid:
-        raise ValueError(f"PDF validation failed: {validation_msg}")
+    blocks = None
+    if changed_tokens >= DIFF_PARALLEL_MIN_TOKENS and len(diff.regions) > 1 and extraction_executor.kind == "process":
+        # Changed regions are independent; diff them in parallel on the extraction workers
+        shards = shard_regions(diff.regions, extraction_executor.max_workers)
+        try:
+            shard_blocks = await asyncio.gather(*(extraction_executor.run(region_blocks, shard) for shard in shards))
+            blocks = [block for shard in shard_blocks for block in shard]
+        except ExtractionQueueFull:
+            logger.info("Extraction workers busy, diffing inline")
+        except (ExtractionTimeout, ExtractionWorkerCrashed) as e:
+            logger.warning(f"Parallel diff failed, diffing inline: {e}")
+    if blocks is None:
+        blocks = region_blocks(diff.regions)
+    return diff.a_tokens, diff.b_tokens, document_opcodes(diff, blocks)
+
+async def detect_word_changes(original: str, cleaned: str) -> List[WordChange]:
+    """Detect word-level changes between original and cleaned text"""
+    changes = []
     
-    text = ""
-    extraction_method = "none"
+    # Split text into words while preserving positions
+    original_words, cleaned_words, operations = await diff_texts(original, cleaned)
+    offsets = token_offsets(original_words)
     
-    # Method 1: Try pdfplumber first (best for formatted text)
-    try:
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
+    change_id = 0
+    for tag, i1, i2, j1, j2 in operations:
+        if tag == 'equal':
+            continue
+        start_pos = offsets[i1]
+        end_pos = offsets[i2]
+        original_segment = ''.join(original_words[i1:i2])
+        cleaned_segment = ''.join(cleaned_words[j1:j2])
+        if original_segment.strip() == cleaned_segment.strip():
+            # Whitespace-only differences are not worth a suggestion
+            continue
         
-        if text.strip() and len(text.strip()) > 10:
-            extraction_method = "pdfplumber"
-            logger.info(f"PDF extraction successful with pdfplumber: {len(text)} characters")
-            return clean_extracted_text(text)
-    except Exception as e:
-        logger.warning(f"pdfplumber extraction failed: {e}")
-    
-    # Method 2: Try PyMuPDF (handles complex PDFs better)
-    try:
-        doc = fitz.open(file_path)
-        text = ""
-        for page_num in range(doc.page_count):
-            page = doc.load_page(page_num)
-            page_text = page.get_text()
-            if page_text:
-                text += page_text + "\n"
-        doc.close()
+        if original_segment.strip() and cleaned_segment.strip():
+            # Narrow a replacement to the words themselves
+            start_pos += len(original_segment) - len(original_segment.lstrip())
+            end_pos -= len(original_segment) - len(original_segment.rstrip())
+            original_segment = original_segment.strip()
+            cleaned_segment = cleaned_segment.strip()
+        # Insertions and deletions keep their whitespace, so applying them leaves single spaces
         
-        if text.strip() and len(text.strip()) > 10:
-            extraction_method = "PyMuPDF"
-            logger.info(f"PDF extraction successful with PyMuPDF: {len(text)} characters")
-            return clean_extracted_text(text)
-    except Exception as e:
-        logger.warning(f"PyMuPDF extraction failed: {e}")
+        # Determine change type based on content
+        change_type = "grammar"
+        if re.search(r'[.,;:!?]', original_segment) or re.search(r'[.,;:!?]', cleaned_segment):
+            change_type = "punctuation"
+        
+        # Get context (50 chars before and after)
+        context_start = max(0, start_pos - 50)
+        context_end = min(len(original), end_pos + 50)
+        context = original[context_start:context_end]
+        
+        change = WordChange(
+            id=str(change_id),
+            original=original_segment,
+            suggested=cleaned_segment,
+            start_pos=start_pos,
+            end_pos=end_pos,
+            change_type=change_type,
+            context=context
+        )
+        changes.append(change)
+        change_id += 1
+    
+    return changes
+
+def section_changes(original_text: str, pre: PrecleanResult, result: tuple, first_id: int = 0) -> List[WordChange]:
+    """Changes for one cleaned section on original-text positions: mechanical fixes plus the LLM's edits"""
+    offset, core, _, llm_changes = result
+    section_end = offset + len(core)
+    mechanical = [edit for edit in pre.edits if offset <= edit.pre_start and edit.pre_end <= section_end]
+    
+    # The LLM saw the pre-cleaned text, so a mechanical fix it overlaps becomes part of its change
+    spans = []
+    for change in llm_changes:
+        inner_start, inner_end = offset + change.start_pos, offset + change.end_pos
+        overlapping = [edit for edit in mechanical if edit.pre_start < inner_end and inner_start < edit.pre_end]
+        span_start = min([inner_start] + [edit.pre_start for edit in overlapping])
+        span_end = max([inner_end] + [edit.pre_end for edit in overlapping])
+        spans.append((span_start, span_end, inner_start, inner_end, change))
     
-    # Method 3: Try pdfminer as fallback
+    # Changes that now overlap (two of them touching one fix) must become one, or accepting both corrupts the text
+    groups = []
+    for span_start, span_end, inner_start, inner_end, change in sorted(spans, key=lambda span: span[:4]):
+        if groups and span_start < groups[-1][1]:
+            groups[-1][1] = max(groups[-1][1], span_end)
+            groups[-1][2].append((inner_start, inner_end, change))
+        else:
+            groups.append([span_start, span_end, [(inner_start, inner_end, change)]])
+    
+    changes = []
+    for span_start, span_end, members in groups:
+        mechanical = [edit for edit in mechanical if not (edit.pre_start < span_end and span_start < edit.pre_end)]
+        suggested, cursor = [], span_start
+        for inner_start, inner_end, change in members:
+            suggested.append(pre.text[cursor:inner_start])
+            suggested.append(change.suggested)
+            cursor = inner_end
+        suggested.append(pre.text[cursor:span_end])
+        start_pos = pre.to_original(span_start)
+        end_pos = pre.to_original(span_end, is_end=True)
+        changes.append(members[0][2].copy(update={
+            "original": original_text[start_pos:end_pos],
+            "suggested": ''.join(suggested),
+            "start_pos": start_pos,
+            "end_pos": end_pos
+        }))
+    
+    for edit in mechanical:
+        changes.append(WordChange(
+            id="",
+            original=edit.original,
+            suggested=edit.suggested,
+            start_pos=edit.start,
+            end_pos=edit.end,
+            change_type="mechanical"
+        ))
+    
+    # An insertion sorts before a change starting at the same position
+    changes.sort(key=lambda change: (change.start_pos, change.end_pos))
+    for index, change in enumerate(changes):
+        change.id = str(first_id + index)
+        change.context = original_text[max(0, change.start_pos - 50):change.end_pos + 50]
+    return changes
+
+async def clean_section(section: Section, semaphore: asyncio.Semaphore, bypass_cache: bool,
+                        mode: str = 'sectioned') -> tuple:
+    """Clean one section, keeping its surrounding whitespace; returns (offset, core, cleaned core, changes)"""
+    # changes are the LLM's, on positions within the core
+    core = section.text.strip()
+    if not core:
+        return section.start, "", "", []
+    offset = section.start + len(section.text) - len(section.text.lstrip())
+    if not has_prose(core):
+        # Contact details, skill lists, dates: the pre-cleaner's fixes are enough
+        return offset, core, core, []
+    async with semaphore:
+        if mode == 'edits':
+            try:
+                edits = locate_edits(core, json.loads(await list_edits_cached(core, bypass_cache)))
+                # The model listed its edits itself, categories included
+                changes = [
+                    WordChange(id=str(index), original=edit.original, suggested=edit.suggested,
+                               start_pos=edit.start, end_pos=edit.end, change_type=edit.category)
+                    for index, edit in enumerate(edits)
+                ]
+                return offset, core, apply_edits(core, edits), changes
+            except EditListError as e:
+                # Not worth failing the resume over; have the model rewrite this section instead
+                logger.warning(f"Unusable edit list, falling back to a rewrite: {e}")
+        cleaned_core = await clean_text_cached(core, bypass_cache)
+    return offset, core, cleaned_core, await detect_word_changes(core, cleaned_core)
+
+def plan_sections(text: str, mode: str, min_tokens: int = LLM_SECTIONED_MIN_TOKENS) -> List[Section]:
+    """Sections to clean separately: the whole text in full mode or when it is short"""
+    if mode == 'full' or estimate_tokens(text) < min_tokens:
+        return [Section("", 0, text)]
+    return split_sections(text, max_tokens=LLM_SECTION_MAX_TOKENS)
+
+async def iter_cleaned_sections(sections: List[Section], bypass_cache: bool = False, mode: str = 'sectioned'):
+    """Clean sections concurrently, yielding (offset, core, cleaned core, edits) as each one finishes"""
+    semaphore = asyncio.Semaphore(LLM_SECTION_CONCURRENCY)
+    tasks = [asyncio.ensure_future(clean_section(section, semaphore, bypass_cache, mode)) for section in sections]
     try:
-        text = pdfminer_extract_text(file_path)
-        if text and text.strip() and len(text.strip()) > 10:
-            extraction_method = "pdfminer"
-            logger.info(f"PDF extraction successful with pdfminer: {len(text)} characters")
-            return clean_extracted_text(text)
-    except Exception as e:
-        logger.warning(f"pdfminer extraction failed: {e}")
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The consumer stopped early (error or client disconnect)
+        for task in tasks:
+            task.cancel()
+
+def stitch_sections(text: str, results: List[tuple]) -> str:
+    """Replace each section's core with its cleaned version; whitespace between cores stays as it was"""
+    cleaned_parts, position = [], 0
+    for offset, core, cleaned_core, _ in sorted(results, key=lambda result: result[0]):
+        cleaned_parts.append(text[position:offset])
+        cleaned_parts.append(cleaned_core)
+        position = offset + len(core)
+    cleaned_parts.append(text[position:])
+    return "".join(cleaned_parts)
+
+async def clean_resume_text(text: str, mode: str, bypass_cache: bool = False, report_progress=None) -> tuple:
+    """Pre-clean, then clean text with AI and detect changes; returns (cleaned_text, changes)"""
+    pre = preclean(text)
+    sections = plan_sections(pre.text, mode)
+    results = []
+    async for result in iter_cleaned_sections(sections, bypass_cache, mode):
+        results.append(result)
+        if report_progress:
+            await report_progress(len(results), len(sections))
+    results.sort(key=lambda result: result[0])
+    
+    changes = []
+    for result in results:
+        changes.extend(section_changes(text, pre, result, len(changes)))
+    return stitch_sections(pre.text, results), changes
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def run_processing_job(job: Dict[str, Any], report_progress) -> Dict[str, Any]:
+    """Job handler: clean a resume with AI and store the text and changes on it"""
+    file_id = job["file_id"]
+    caller_key.set(file_id)
+    
+    # Every write is conditional on the resume still belonging to this job
+    owned = owned_filter(file_id, job["id"])
+    
+    # Mark it processing and read the text in one round trip
+    resume_data = await db.resumes.find_one_and_update(
+        owned, {"$set": {"processing_status": "processing"}}, projection=PROCESSING_INPUT
+    )
+    if not resume_data:
+        if await db.resumes.count_documents(resume_filter(file_id), limit=1):
+            raise PermanentJobError("Resume was handed to a newer job")
+        raise PermanentJobError("Resume not found")
     
-    # Method 4: Try PyPDF2 as final fallback
     try:
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
+        # Clean text with AI (or reuse cached responses) and detect changes;
+        # a resume with the same text and settings already in progress is shared
+        original_text = resume_data['original_text']
+        mode = job["params"].get("mode", LLM_CLEANING_MODE)
+        bypass_cache = job["params"].get("bypass_cache", False)
+        # Keyed on the exact text, not the normalized LLM cache key: the changes carry offsets into it
+        text_hash = hashlib.sha256(original_text.encode('utf-8')).hexdigest()
+        key = f"{text_hash}:{LLM_CACHE_MODEL}:{RESUME_CLEANING_PROMPT_VERSION}:{EDIT_LIST_PROMPT_VERSION}:{mode}:{bypass_cache}"
+        cleaned_text, changes = await resume_flights.do(
+            key, clean_resume_text, original_text, mode, bypass_cache, report_progress=report_progress
+        )
+    except Exception:
+        # Retries go back to the queue; only the last attempt marks the resume as failed
+        final = job["attempts"] >= job["max_attempts"]
+        await db.resumes.update_one(owned, {"$set": {"processing_status": "error" if final else "queued"}})
+        raise
+    
+    result = await db.resumes.update_one(
+        owned,
+        {"$set": {
+            "processing_status": "completed",
+            "cleaned_text": cleaned_text,
+            "change_columns": pack_changes([change.dict() for change in changes])
+        }, "$unset": {"changes": ""}}
+    )
+    if result.matched_count == 0:
+        raise PermanentJobError("Resume was handed to a newer job")
+    return {"total_changes": len(changes)}
+
+async def store_resume(filename: str, file_type: str, upload: IngestedUpload, batch_id: str = None) -> ResumeUpload:
+    """Extract an ingested upload (or reuse the cached extraction) and save the resume record"""
+    resume = ResumeUpload(
+        filename=filename,
+        file_type=file_type,
+        file_size=upload.size,
+        content_hash=upload.content_hash,
+        batch_id=batch_id
+    )
+    
+    # Extract text, unless this exact file was extracted before
+    extraction = await extraction_cache.get(resume.content_hash, file_type)
+    if extraction is None:
+        extraction = await extract_text_from_file(upload.data, file_type)
+        await extraction_cache.put(resume.content_hash, file_type, extraction)
+    resume.original_text = extraction.text
+    resume.extraction_method = extraction.method
+    
+    # Save to database
+    await db.resumes.insert_one(resume.dict())
+    return resume
+
+def apply_accepted_changes(original_text: str, changes: List[Dict[str, Any]]) -> tuple:
+    """Apply accepted changes to the original text; returns (final_text, applied count)"""
+    final_text = original_text
+    
+    # Sort changes by position (descending to avoid position shifts)
+    sorted_changes = sorted(
+        [change for change in changes if change.get('accepted', False)],
+        key=lambda x: (x['start_pos'], x['end_pos']),
+        reverse=True
+    )
+    
+    for change in sorted_changes:
+        start_pos = change['start_pos']
+        end_pos = change['end_pos']
+        suggested = change['suggested']
         
-        if text.strip() and len(text.strip()) > 10:
-            extraction_method = "PyPDF2"
-            logger.info(f"PDF extraction successful with PyPDF2: {len(text)} characters")
-            return clean_extracted_text(text)
-    except Exception as e:
-        logger.warning(f"PyPDF2 extraction failed: {e}")
-    
-    # If all methods fail, provide detailed error message
-    error_msg = f"""PDF text extraction failed with all methods (pdfplumber, PyMuPDF, pdfminer, PyPDF2).
-
-Possible causes:
-1. PDF contains only scanned images (no extractable text)
-2. PDF is password protected
-3. PDF has unusual encoding or format
-4. PDF is corrupted
-
-Recommendations:
-1. Try converting your resume to DOCX or TXT format
-2. If it's a scanned PDF, use OCR software first
-3. Recreate the PDF from the original document
-4. Ensure the PDF contains selectable text (not just images)"""
-    
-    raise ValueError(error_msg)
-
-async def extract_text_from_docx(file_path: str) -> str:
-    """Extract text from DOCX file"""
-    doc = docx.Document(file_path)
-    text = ""
-    for paragraph in doc.paragraphs:
-        text += paragraph.text + "\n"
-    return text.strip()
-
-async def extract_text_from_txt(file_path: str) -> str:
-    """Extract text from TXT file"""
-    async with aiofiles.open(file_path, 'r', encoding='utf-8') as file:
-        content = await file.read()
-    return content.strip()
+        final_text = final_text[:start_pos] + suggested + final_text[end_pos:]
+    
+    return final_text, len(sorted_changes)
 
-async def clean_text_with_ai(text: str) -> str:
-    """Use AI to clean and improve resume text"""
-    try:
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"resume-cleaning-{uuid.uuid4()}",
-            system_message="""You are an expert resume editor and professional writing assistant. Your task is to improve resume text by:
+def job_accepted_response(job: Dict[str, Any], coalesced: bool = False) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "job_id": job["id"],
+        "file_id": job["file_id"],
+        "status": job["status"],
+        "status_url": f"/api/jobs/{job['id']}",
+        "coalesced": coalesced
+    }
 
-1. Correcting grammar errors (subject-verb agreement, tense consistency, sentence structure)
-2. Fixing punctuation mistakes (commas, periods, apostrophes, quotation marks)
-3. Enhancing word choice and professional language
-4. Maintaining the original structure, formatting, and meaning
-5. Preserving all dates, names, contact information, and technical terms exactly as provided
-6. Keeping the professional tone appropriate for resumes
+# Processing jobs are drained by in-process workers (see jobs.py)
+async def fail_processing_job(job: Dict[str, Any], error: str):
+    """A job failed for good (possibly without its handler running): fail its resume, unless a newer job owns it"""
+    await db.resumes.update_one(owned_filter(job["file_id"], job["id"]), {"$set": {"processing_status": "error"}})
 
-IMPORTANT: Return ONLY the cleaned text without any explanations, comments, or additional formatting. Do not add introductory phrases like "Here's the cleaned version" or any other commentary."""
-        ).with_model("openai", "gpt-4o")
+job_queue = JobQueue(
+    db.jobs,
+    run_processing_job,
+    workers=int(os.environ.get('JOB_WORKERS', '2')),
+    lease_seconds=float(os.environ.get('JOB_LEASE_SECONDS', '120')),
+    max_attempts=int(os.environ.get('JOB_MAX_ATTEMPTS', '3')),
+    on_failure=fail_processing_job
+)
+# How long a freshly claimed resume may go without its job document (or a stream's heartbeat)
+JOB_CLAIM_GRACE_SECONDS = 60
+# Streaming runs claim a resume like jobs do, under ids with this prefix
+STREAM_CLAIM_PREFIX = "stream-"
+
+async def current_claim(file_id: str, resume_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The job (or stream) still processing a resume, or None if it may be claimed"""
+    current_job_id = resume_data.get('job_id')
+    if resume_data['processing_status'] not in ('queued', 'processing') or not current_job_id:
+        return None
+    job = await job_queue.get(current_job_id)
+    if job and job["status"] in ('queued', 'running'):
+        return job
+    if job is None:
+        queued_at = resume_data.get('queued_at') or datetime.min
+        if queued_at.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc) - timedelta(seconds=JOB_CLAIM_GRACE_SECONDS):
+            # Claimed a moment ago (its job document is still being written), or a live stream
+            return {"id": current_job_id, "file_id": file_id, "status": "queued"}
+    return None
+
+async def renew_stream_claim(owned: Dict[str, Any]):
+    """Keep a stream's claim fresh for as long as it runs; returns once the claim is lost"""
+    while True:
+        await asyncio.sleep(JOB_CLAIM_GRACE_SECONDS / 3)
+        heartbeat = await db.resumes.update_one(owned, {"$set": {"queued_at": datetime.now(timezone.utc)}})
+        if heartbeat.matched_count == 0:
+            return
+
+async def claim_resume(file_id: str, claim_id: str, status: str, projection: Dict[str, Any]) -> tuple:
+    """Move a resume to a new job or stream; returns (the claimed resume, None) or (None, the current claim)"""
+    for _ in range(3):
+        resume_data = await db.resumes.find_one(resume_filter(file_id), CLAIM_STATE)
+        if not resume_data:
+            raise HTTPException(status_code=404, detail="Resume not found")
         
-        user_message = UserMessage(text=f"Please clean and improve this resume text:\n\n{text}")
-        response = await chat.send_message(user_message)
-        return response.strip()
+        claim = await current_claim(file_id, resume_data)
+        if claim:
+            return None, claim
         
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"AI processing error: {str(e)}")
+        # Compare-and-swap: only one request (in any process) moves the resume to a new job
+        claimed = await db.resumes.find_one_and_update(
+            claim_filter(file_id, resume_data),
+            {"$set": {"processing_status": status, "job_id": claim_id, "queued_at": datetime.now(timezone.utc)}},
+            projection=projection
+        )
+        if claimed:
+            return claimed, None
+    raise HTTPException(status_code=409, detail="Resume is being updated concurrently, please retry")
 
-def detect_word_changes(original: str, cleaned: str) -> List[WordChange]:
-    """Detect word-level changes between original and cleaned text"""
-    changes = []
-    
-    # Split text into words while preserving positions
-    original_words = re.findall(r'\S+|\s+', original)
-    cleaned_words = re.findall(r'\S+|\s+', cleaned)
-    
-    # Use difflib to find differences
-    diff = difflib.SequenceMatcher(None, original_words, cleaned_words)
+async def schedule_processing(file_id: str, mode: str, bypass_cache: bool = False) -> Dict[str, Any]:
+    """Queue a processing job for a resume, or return the one already running for it"""
+    job_id = str(uuid.uuid4())
+    _, claim = await claim_resume(file_id, job_id, "queued", {"_id": 1})
+    if claim:
+        if claim["id"].startswith(STREAM_CLAIM_PREFIX):
+            raise HTTPException(status_code=409, detail="Resume is being processed by a streaming request")
+        # Already being processed (double click, client retry): share that job
+        return job_accepted_response(claim, coalesced=True)
     
-    change_id = 0
-    for tag, i1, i2, j1, j2 in diff.get_opcodes():
-        if tag == 'replace':
-            # Calculate positions
-            start_pos = len(''.join(original_words[:i1]))
-            end_pos = len(''.join(original_words[:i2]))
-            
-            original_segment = ''.join(original_words[i1:i2]).strip()
-            cleaned_segment = ''.join(cleaned_words[j1:j2]).strip()
-            
-            if original_segment and cleaned_segment and original_segment != cleaned_segment:
-                # Determine change type based on content
-                change_type = "grammar"
-                if re.search(r'[.,;:!?]', original_segment) or re.search(r'[.,;:!?]', cleaned_segment):
-                    change_type = "punctuation"
-                
-                # Get context (50 chars before and after)
-                context_start = max(0, start_pos - 50)
-                context_end = min(len(original), end_pos + 50)
-                context = original[context_start:context_end]
-                
-                change = WordChange(
-                    id=str(change_id),
-                    original=original_segment,
-                    suggested=cleaned_segment,
-                    start_pos=start_pos,
-                    end_pos=end_pos,
-                    change_type=change_type,
-                    context=context
-                )
-                changes.append(change)
-                change_id += 1
-    
-    return changes
+    job = await job_queue.enqueue(file_id, {"mode": mode, "bypass_cache": bypass_cache}, job_id=job_id)
+    return job_accepted_response(job)
 
 # API Routes
 @api_router.post("/upload-resume", response_model=Dict[str, Any])
@@ -331,136 +712,249 @@ async def upload_resume(file: UploadFile = File(...)):
     """Upload and process resume file"""
     
     # Validate file type
-    allowed_types = ['pdf', 'docx', 'doc', 'txt']
     file_ext = file.filename.split('.')[-1].lower() if '.' in file.filename else ''
     
-    if file_ext not in allowed_types:
+    if file_ext not in ALLOWED_FILE_TYPES:
         raise HTTPException(
             status_code=400, 
-            detail=f"Unsupported file type. Allowed types: {', '.join(allowed_types)}"
+            detail=f"Unsupported file type. Allowed types: {', '.join(ALLOWED_FILE_TYPES)}"
         )
     
-    # Validate file size (10MB limit)
-    if file.size and file.size > 10 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="File size exceeds 10MB limit")
-    
-    # Create resume record
-    resume = ResumeUpload(
-        filename=file.filename,
-        file_type=file_ext,
-        file_size=file.size or 0
-    )
+    # Reject early when the client declared the size (enforced again while streaming)
+    if file.size and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="File size exceeds 10MB limit")
     
     try:
-        # Save file temporarily
-        temp_dir = tempfile.mkdtemp()
-        file_path = os.path.join(temp_dir, file.filename)
-        
-        with open(file_path, 'wb') as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Extract text
-        original_text = await extract_text_from_file(file_path, file_ext)
-        resume.original_text = original_text
-        
-        # Save to database
-        await db.resumes.insert_one(resume.dict())
+        # Read the upload into memory, checking size/type and hashing as it arrives
+        try:
+            upload = await ingest_upload(file, file_ext)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except UploadRejected as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Clean up temp file
-        shutil.rmtree(temp_dir)
+        resume = await store_resume(file.filename, file_ext, upload)
+        original_text = resume.original_text
         
         return {
             "success": True,
             "file_id": resume.id,
             "filename": resume.filename,
             "file_type": resume.file_type,
+            "extraction_method": resume.extraction_method,
             "original_text": original_text[:500] + "..." if len(original_text) > 500 else original_text
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        # Clean up temp directory if it exists
-        if 'temp_dir' in locals():
-            shutil.rmtree(temp_dir, ignore_errors=True)
         raise HTTPException(status_code=500, detail=f"Upload processing failed: {str(e)}")
 
-@api_router.post("/process-resume")
+def check_cleaning_mode(mode: Optional[str]) -> str:
+    """The requested cleaning mode, or the configured default"""
+    mode = (mode or LLM_CLEANING_MODE).lower()
+    if mode not in CLEANING_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported cleaning mode. Allowed modes: {', '.join(CLEANING_MODES)}")
+    return mode
+
+@api_router.post("/process-resume", status_code=202)
 async def process_resume(request: ResumeProcessingRequest):
-    """Process uploaded resume with AI cleaning"""
+    """Queue a resume for AI cleaning; poll /api/jobs/{job_id} for the result"""
     
-    # Get resume from database
-    resume_data = await db.resumes.find_one({"id": request.file_id})
-    if not resume_data:
-        raise HTTPException(status_code=404, detail="Resume not found")
+    mode = check_cleaning_mode(request.mode)
     
-    try:
-        # Update status to processing
-        await db.resumes.update_one(
-            {"id": request.file_id},
-            {"$set": {"processing_status": "processing"}}
-        )
-        
-        # Clean text with AI
-        cleaned_text = await clean_text_with_ai(resume_data['original_text'])
-        
-        # Detect changes
-        changes = detect_word_changes(resume_data['original_text'], cleaned_text)
-        
-        # Update database with results
-        await db.resumes.update_one(
-            {"id": request.file_id},
-            {"$set": {
-                "processing_status": "completed",
+    return await schedule_processing(request.file_id, mode, request.bypass_cache)
+
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status and progress; includes the processing result once completed"""
+    
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    response = {
+        "job_id": job["id"],
+        "file_id": job["file_id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "progress": job["progress"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+    
+    if job["status"] == "completed":
+        resume_data = await db.resumes.find_one(resume_filter(job["file_id"]), PROCESSING_RESULT)
+        if resume_data:
+            changes = resume_changes(resume_data)
+            response["result"] = {
+                "success": True,
+                "file_id": job["file_id"],
+                "original_text": resume_data.get('original_text'),
+                "cleaned_text": resume_data.get('cleaned_text'),
+                "changes": changes,
+                "total_changes": len(changes)
+            }
+    
+    return response
+
+@api_router.get("/process-resume/{file_id}/stream")
+async def process_resume_stream(file_id: str, bypass_cache: bool = False, mode: Optional[str] = None):
+    """Process a resume, streaming each section's cleaned text and changes as server-sent events"""
+    
+    mode = check_cleaning_mode(mode)
+    
+    # Claim the resume as a job would, so a stream never runs alongside a job or another stream
+    stream_id = f"{STREAM_CLAIM_PREFIX}{uuid.uuid4()}"
+    resume_data, claim = await claim_resume(file_id, stream_id, "processing", PROCESSING_INPUT)
+    if claim:
+        raise HTTPException(status_code=409, detail="Resume is already being processed; poll its job instead")
+    owned = owned_filter(file_id, stream_id)
+    
+    original_text = resume_data['original_text']
+    pre = preclean(original_text)
+    # Always split when streaming, so the first suggestions arrive after one section
+    sections = plan_sections(pre.text, mode, min_tokens=0)
+    
+    async def events():
+        caller_key.set(file_id)
+        results, changes = [], []
+        renewal = asyncio.create_task(renew_stream_claim(owned))
+        try:
+            yield sse_event("start", {"file_id": file_id, "original_text": original_text, "sections": len(sections)})
+            
+            async for result in iter_cleaned_sections(sections, bypass_cache, mode):
+                offset, core, cleaned_core, _ = result
+                results.append(result)
+                # The renewal stops once the resume was handed to a job (or its write failed)
+                if renewal.done():
+                    renewal.result()
+                    raise HTTPException(status_code=409, detail="Resume was handed to a newer job")
+                # Ids follow arrival order so streamed ids match the stored ones
+                new_changes = section_changes(original_text, pre, result, len(changes))
+                changes.extend(new_changes)
+                yield sse_event("section", {
+                    "start_pos": pre.to_original(offset),
+                    "end_pos": pre.to_original(offset + len(core), is_end=True),
+                    "cleaned_text": cleaned_core,
+                    "completed": len(results),
+                    "sections": len(sections)
+                })
+                for change in new_changes:
+                    yield sse_event("change", change.dict())
+            
+            cleaned_text = stitch_sections(pre.text, results)
+            changes.sort(key=lambda change: (change.start_pos, change.end_pos))
+            stored = await db.resumes.update_one(
+                owned,
+                {"$set": {
+                    "processing_status": "completed",
+                    "cleaned_text": cleaned_text,
+                    "change_columns": pack_changes([change.dict() for change in changes])
+                }, "$unset": {"changes": ""}}
+            )
+            if stored.matched_count == 0:
+                raise HTTPException(status_code=409, detail="Resume was handed to a newer job")
+            yield sse_event("done", {
+                "success": True,
+                "file_id": file_id,
+                "original_text": original_text,
                 "cleaned_text": cleaned_text,
-                "changes": [change.dict() for change in changes]
-            }}
-        )
-        
-        return {
-            "success": True,
-            "file_id": request.file_id,
-            "original_text": resume_data['original_text'],
-            "cleaned_text": cleaned_text,
-            "changes": [change.dict() for change in changes],
-            "total_changes": len(changes)
-        }
-        
-    except Exception as e:
-        # Update status to error
-        await db.resumes.update_one(
-            {"id": request.file_id},
-            {"$set": {"processing_status": "error"}}
-        )
-        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+                "changes": [change.dict() for change in changes],
+                "total_changes": len(changes)
+            })
+        except Exception as e:
+            await db.resumes.update_one(owned, {"$set": {"processing_status": "error"}})
+            yield sse_event("error", {"detail": f"Processing failed: {getattr(e, 'detail', str(e))}"})
+        finally:
+            renewal.cancel()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def check_change_action(action: str):
+    if action not in CHANGE_ACTIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported action. Allowed actions: {', '.join(CHANGE_ACTIONS)}")
 
 @api_router.post("/toggle-change")
 async def toggle_change(request: ChangeAction):
     """Accept or reject a specific change"""
+    check_change_action(request.action)
+    accepted = request.action == 'accept'
+    
+    # Flip just that change's bit in place: one write, and concurrent toggles don't overwrite each other
+    result = None
+    if request.change_id.isdigit():
+        index = int(request.change_id)
+        result = await db.resumes.update_one(
+            stored_change_filter(request.file_id, index), accepted_update([index], accepted)
+        )
+    if result is None or result.matched_count == 0:
+        # Resumes processed before columnar storage keep a list of change dicts
+        result = await db.resumes.update_one(
+            legacy_change_filter(request.file_id, request.change_id),
+            {"$set": {"changes.$[change].accepted": accepted}},
+            array_filters=[{"change.id": request.change_id}]
+        )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Change not found")
+    
+    return {"success": True, "message": f"Change {request.action}ed successfully"}
+
+@api_router.post("/changes/bulk")
+async def bulk_change_action(request: BulkChangeAction):
+    """Accept or reject many changes at once: by id, by type, by position range, or all of them"""
+    check_change_action(request.action)
+    accepted = request.action == 'accept'
     
-    # Get resume from database
-    resume_data = await db.resumes.find_one({"id": request.file_id})
+    resume_data = await db.resumes.find_one(resume_filter(request.file_id), CHANGE_SELECTION)
     if not resume_data:
         raise HTTPException(status_code=404, detail="Resume not found")
+    columns = resume_data.get("change_columns")
+    if columns:
+        indexes = matching_changes(
+            columns, request.change_ids, request.change_type, request.start_pos, request.end_pos
+        )
+        if indexes:
+            # Only if the change list was not replaced (reprocessed) since it was read
+            await db.resumes.update_one(
+                same_changes_filter(request.file_id, columns["count"]), accepted_update(indexes, accepted)
+            )
+        return {"success": True, "message": f"{len(indexes)} changes {request.action}ed successfully"}
     
-    # Update the specific change
-    changes = resume_data.get('changes', [])
-    for change in changes:
-        if change['id'] == request.change_id:
-            change['accepted'] = (request.action == 'accept')
-            break
-    
-    # Update database
-    await db.resumes.update_one(
-        {"id": request.file_id},
-        {"$set": {"changes": changes}}
-    )
+    # Resumes processed before columnar storage keep a list of change dicts
+    selector = {}
+    if request.change_ids is not None:
+        selector["change.id"] = {"$in": request.change_ids}
+    if request.change_type is not None:
+        selector["change.change_type"] = request.change_type
+    if request.start_pos is not None:
+        selector["change.start_pos"] = {"$gte": request.start_pos}
+    if request.end_pos is not None:
+        selector["change.end_pos"] = {"$lte": request.end_pos}
     
-    return {"success": True, "message": f"Change {request.action}ed successfully"}
+    query = legacy_changes_filter(request.file_id)
+    if selector:
+        result = await db.resumes.update_one(
+            query, {"$set": {"changes.$[change].accepted": accepted}}, array_filters=[selector]
+        )
+    else:
+        result = await db.resumes.update_one(query, {"$set": {"changes.$[].accepted": accepted}})
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Resume not found or not processed yet")
+    
+    return {"success": True, "message": f"Changes {request.action}ed successfully"}
 
 @api_router.get("/resume/{file_id}")
 async def get_resume(file_id: str):
     """Get resume processing results"""
     
-    resume_data = await db.resumes.find_one({"id": file_id})
+    resume_data = await db.resumes.find_one(resume_filter(file_id), RESUME_VIEW)
     if not resume_data:
         raise HTTPException(status_code=404, detail="Resume not found")
     
@@ -471,42 +965,233 @@ async def get_resume(file_id: str):
         "processing_status": resume_data['processing_status'],
         "original_text": resume_data.get('original_text'),
         "cleaned_text": resume_data.get('cleaned_text'),
-        "changes": resume_data.get('changes', []),
+        "changes": resume_changes(resume_data),
         "upload_timestamp": resume_data['upload_timestamp']
     }
 
+async def plan_batch_items(files: List[UploadFile]) -> tuple:
+    """List batch uploads, expanding zip archives, without reading any content yet
+
+    Returns (items, archives): items are (filename, file_type, source), where the source is the
+    UploadFile, an (archive, ZipInfo) entry or the UploadRejected error.
+    """
+    items, archives = [], []
+    for file in files:
+        file_ext = file.filename.split('.')[-1].lower() if '.' in file.filename else ''
+        try:
+            if file_ext == 'zip':
+                archive = await open_zip_upload(file, max_bytes=MAX_ARCHIVE_BYTES)
+                archives.append(archive)
+                for filename, file_type, entry in archive.entries(ALLOWED_FILE_TYPES, BATCH_MAX_FILES - len(items)):
+                    source = entry if isinstance(entry, UploadRejected) else (archive, entry)
+                    items.append((filename, file_type, source))
+            elif file_ext in ALLOWED_FILE_TYPES:
+                items.append((file.filename, file_ext, file))
+            else:
+                items.append((file.filename, file_ext, UploadRejected("Unsupported file type")))
+        except UploadRejected as e:
+            items.append((file.filename, file_ext, e))
+        if len(items) > BATCH_MAX_FILES:
+            for archive in archives:
+                archive.close()
+            raise HTTPException(status_code=400, detail=f"A batch may hold at most {BATCH_MAX_FILES} files")
+    return items, archives
+
+async def read_batch_item(file_type: str, source) -> IngestedUpload:
+    """Read one planned batch item into memory"""
+    if isinstance(source, UploadFile):
+        return await ingest_upload(source, file_type)
+    archive, info = source
+    # Decompression is CPU-bound; keep it off the event loop
+    return await asyncio.to_thread(archive.read, info, file_type)
+
+async def ingest_batch(batch: ResumeBatch, uploads: List[UploadFile], bypass_cache: bool):
+    """List, extract and queue a batch's uploads, recording each item on the batch record"""
+    archives = []
+    try:
+        try:
+            items, archives = await plan_batch_items(uploads)
+            if not items:
+                raise HTTPException(status_code=400, detail="No resumes found in the upload")
+        except HTTPException as e:
+            await db.batches.update_one(batch_filter(batch.id), {"$set": {"ingesting": False, "error": e.detail}})
+            return
+        
+        await db.batches.update_one(batch_filter(batch.id), {"$set": {"items": [
+            {"filename": filename, "file_id": None, "error": None} for filename, _, _ in items
+        ]}})
+        semaphore = asyncio.Semaphore(BATCH_EXTRACTION_CONCURRENCY)
+        
+        async def add_item(index: int, filename: str, file_type: str, source):
+            try:
+                if isinstance(source, UploadRejected):
+                    raise source
+                # Only BATCH_EXTRACTION_CONCURRENCY uploads are in memory at a time
+                async with semaphore:
+                    resume = await store_resume(filename, file_type, await read_batch_item(file_type, source), batch_id=batch.id)
+                # LLM concurrency is bounded by the job workers and the LLM limiter
+                await schedule_processing(resume.id, batch.mode, bypass_cache)
+                item = {"filename": filename, "file_id": resume.id, "error": None}
+            except UploadRejected as e:
+                item = {"filename": filename, "file_id": None, "error": str(e)}
+            except HTTPException as e:
+                item = {"filename": filename, "file_id": None, "error": e.detail}
+            except Exception as e:
+                item = {"filename": filename, "file_id": None, "error": f"Upload processing failed: {str(e)}"}
+            await db.batches.update_one(batch_filter(batch.id), {"$set": {f"items.{index}": item}})
+        
+        # Extract in parallel; item order follows the upload
+        await asyncio.gather(*(add_item(index, *item) for index, item in enumerate(items)))
+        await db.batches.update_one(batch_filter(batch.id), {"$set": {"ingesting": False}})
+    except Exception as e:
+        logger.error(f"Ingesting batch {batch.id} failed: {str(e)}")
+        await db.batches.update_one(
+            batch_filter(batch.id), {"$set": {"ingesting": False, "error": f"Batch processing failed: {str(e)}"}}
+        )
+    finally:
+        for archive in archives:
+            archive.close()
+        for upload in uploads:
+            await upload.close()
+
+@api_router.post("/batches", status_code=202)
+async def create_batch(background_tasks: BackgroundTasks, files: List[UploadFile] = File(...),
+                       mode: Optional[str] = Form(None), bypass_cache: bool = Form(False)):
+    """Upload many resumes (files and/or zip archives); they are extracted and queued for cleaning in the background"""
+    
+    mode = check_cleaning_mode(mode)
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"A batch may hold at most {BATCH_MAX_FILES} files")
+    
+    # The request's UploadFiles are closed once the response is sent
+    uploads = []
+    for file in files:
+        is_archive = file.filename.lower().endswith('.zip')
+        uploads.append(await spool_upload(file, MAX_ARCHIVE_BYTES if is_archive else MAX_UPLOAD_BYTES))
+    
+    # Record the batch up front; clients poll it while the items are extracted
+    batch = ResumeBatch(mode=mode)
+    await db.batches.insert_one(batch.dict())
+    background_tasks.add_task(ingest_batch, batch, uploads, bypass_cache)
+    
+    return {
+        "success": True,
+        "batch_id": batch.id,
+        "status_url": f"/api/batches/{batch.id}"
+    }
+
+async def load_batch(batch_id: str, projection: Dict[str, Any]) -> tuple:
+    """The batch record and its resumes keyed by file_id"""
+    batch = await db.batches.find_one(batch_filter(batch_id), {"_id": 0})
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    resumes = {}
+    async for resume_data in db.resumes.find(batch_resumes_filter(batch_id), {"_id": 0, "id": 1, **projection}):
+        resumes[resume_data["id"]] = resume_data
+    return batch, resumes
+
+def batch_item_status(item: Dict[str, Any]) -> str:
+    """Status of a batch item that has no resume (yet)"""
+    return "pending" if item["file_id"] is None and item["error"] is None else "error"
+
+@api_router.get("/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    """Per-item status and aggregate progress of a batch"""
+    
+    batch, resumes = await load_batch(batch_id, {"processing_status": 1, "job_id": 1, **CHANGE_COUNT})
+    
+    items = []
+    counts = {"pending": 0, "uploaded": 0, "queued": 0, "processing": 0, "completed": 0, "error": 0}
+    for item in batch["items"]:
+        resume_data = resumes.get(item["file_id"]) if item["file_id"] else None
+        status = resume_data["processing_status"] if resume_data else batch_item_status(item)
+        counts[status] = counts.get(status, 0) + 1
+        items.append({
+            **item,
+            "status": status,
+            "job_id": resume_data.get("job_id") if resume_data else None,
+            "total_changes": change_count(resume_data) if resume_data else 0
+        })
+    
+    finished = counts["completed"] + counts["error"]
+    # Batches recorded before background ingest have no ingesting flag
+    ingesting = batch.get("ingesting", False)
+    return {
+        "batch_id": batch_id,
+        "created_timestamp": batch["created_timestamp"],
+        "mode": batch["mode"],
+        "ingesting": ingesting,
+        "error": batch.get("error"),
+        "total_items": len(items),
+        "status_counts": counts,
+        "progress": round(finished / len(items), 4) if items else float(not ingesting),
+        "done": not ingesting and finished == len(items),
+        "items": items
+    }
+
+@api_router.get("/batches/{batch_id}/export")
+async def export_batch(batch_id: str, format: str = "json"):
+    """All results of a batch, as JSON or as a zip of final texts plus a JSON manifest"""
+    
+    if format not in ("json", "zip"):
+        raise HTTPException(status_code=400, detail="Unsupported export format. Allowed formats: json, zip")
+    
+    batch, resumes = await load_batch(
+        batch_id, {"processing_status": 1, "original_text": 1, "cleaned_text": 1, "change_columns": 1, "changes": 1}
+    )
+    
+    results = []
+    for item in batch["items"]:
+        resume_data = resumes.get(item["file_id"]) if item["file_id"] else None
+        if not resume_data:
+            results.append({**item, "status": batch_item_status(item)})
+            continue
+        changes = resume_changes(resume_data)
+        final_text, applied_changes = apply_accepted_changes(resume_data.get("original_text") or "", changes)
+        results.append({
+            **item,
+            "status": resume_data["processing_status"],
+            "cleaned_text": resume_data.get("cleaned_text"),
+            "final_text": final_text,
+            "applied_changes": applied_changes,
+            "changes": changes
+        })
+    
+    if format == "json":
+        return {"batch_id": batch_id, "results": results}
+    
+    # Zip: one cleaned_<name>.txt per completed resume, plus everything in manifest.json
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for result in results:
+            if result["status"] == "completed":
+                name = result["filename"].rsplit(".", 1)[0]
+                archive.writestr(f"cleaned_{name}_{result['file_id'][:8]}.txt", result["cleaned_text"])
+        archive.writestr("manifest.json", json.dumps({"batch_id": batch_id, "results": results}, default=str, indent=2))
+    buffer.seek(0)
+    return StreamingResponse(
+        buffer,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="batch_{batch_id}.zip"'}
+    )
+
 @api_router.get("/generate-final-text/{file_id}")
 async def generate_final_text(file_id: str):
     """Generate final text with accepted changes applied"""
     
-    resume_data = await db.resumes.find_one({"id": file_id})
+    resume_data = await db.resumes.find_one(resume_filter(file_id), FINAL_TEXT_INPUT)
     if not resume_data:
         raise HTTPException(status_code=404, detail="Resume not found")
     
-    original_text = resume_data.get('original_text', '')
-    changes = resume_data.get('changes', [])
-    
     # Apply accepted changes
-    final_text = original_text
-    
-    # Sort changes by position (descending to avoid position shifts)
-    sorted_changes = sorted(
-        [change for change in changes if change.get('accepted', False)],
-        key=lambda x: x['start_pos'],
-        reverse=True
+    final_text, applied_changes = apply_accepted_changes(
+        resume_data.get('original_text', ''), resume_changes(resume_data)
     )
     
-    for change in sorted_changes:
-        start_pos = change['start_pos']
-        end_pos = change['end_pos']
-        suggested = change['suggested']
-        
-        final_text = final_text[:start_pos] + suggested + final_text[end_pos:]
-    
     return {
         "success": True,
         "final_text": final_text,
-        "applied_changes": len(sorted_changes)
+        "applied_changes": applied_changes
     }
 
 # Health check endpoints
@@ -518,7 +1203,29 @@ async def root():
 async def health_check():
     return {
         "status": "healthy",
-        "ai_integration": "connected" if EMERGENT_LLM_KEY else "not configured"
+        "llm_backend": llm_provider.name,
+        "ai_integration": "connected" if llm_provider.configured else "not configured"
+    }
+
+@api_router.get("/metrics/extraction")
+async def extraction_metrics():
+    """Extraction executor queue/timing and cache metrics"""
+    return {**extraction_executor.stats(), "cache": extraction_cache.stats()}
+
+@api_router.get("/metrics/jobs")
+async def job_metrics():
+    """Job queue counts and worker counters"""
+    return await job_queue.stats()
+
+@api_router.get("/metrics/llm")
+async def llm_metrics():
+    """LLM response cache, concurrency limiter and client pool metrics"""
+    return {
+        "cache": llm_cache.stats(),
+        "limiter": llm_limiter.stats(),
+        "clients": llm_client_pool.stats(),
+        "edit_list_clients": edit_list_client_pool.stats(),
+        "single_flight": {"llm_calls": llm_flights.stats(), "resumes": resume_flights.stats()}
     }
 
 # Include the router in the main app
@@ -539,6 +1246,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def start_extraction_executor():
+    extraction_executor.start()
+
+@app.on_event("startup")
+async def create_cache_indexes():
+    await extraction_cache.ensure_indexes()
+    await llm_cache.ensure_indexes()
+
+@app.on_event("startup")
+async def start_job_queue():
+    await job_queue.ensure_indexes()
+    job_queue.start()
+
+@app.on_event("startup")
+async def create_resume_indexes():
+    await ensure_resume_indexes(db.resumes)
+
+@app.on_event("startup")
+async def create_batch_indexes():
+    await ensure_batch_indexes(db.batches)
+
+@app.on_event("shutdown")
+async def shutdown_extraction_executor():
+    extraction_executor.shutdown()
+
+@app.on_event("shutdown")
+async def shutdown_job_queue():
+    await job_queue.stop()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
\ No newline at end of file
@@ -14,6 +14,7 @@ from pathlib import Path
 # Configuration
 BACKEND_URL = "https://cv-refiner.preview.emergentagent.com/api"
 TEST_TIMEOUT = 30
+JOB_TIMEOUT = 120
 
 # Test data - realistic resume text with intentional errors
 SAMPLE_RESUME_TEXT = """John Smith
@@ -46,6 +47,20 @@ Skills:
 - Tools: Git, Docker, AWS, Jenkins
 """
 
+def wait_for_job(session, base_url, response):
+    """Poll a queued processing job (202 from /process-resume) until it finishes"""
+    if response.status_code != 202:
+        return response
+    job_url = f"{base_url}/jobs/{response.json()['job_id']}"
+    deadline = time.time() + JOB_TIMEOUT
+    while True:
+        response = session.get(job_url, timeout=TEST_TIMEOUT)
+        if response.status_code != 200 or response.json().get('status') in ('completed', 'failed'):
+            return response
+        if time.time() > deadline:
+            return response
+        time.sleep(1)
+
 class BackendTester:
     def __init__(self):
         self.base_url = BACKEND_URL
@@ -202,9 +217,11 @@ class BackendTester:
                 json=payload, 
                 timeout=TEST_TIMEOUT
             )
+            response = wait_for_job(self.session, self.base_url, response)
             
             if response.status_code == 200:
-                data = response.json()
+                # A completed job carries the processing result
+                data = response.json().get('result') or response.json()
                 if (data.get('success') and 
                     data.get('cleaned_text') and 
                     data.get('changes') is not None):
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for clean_extracted_text against the original character loop.
+
+Run from the repository root:
+    python benchmarks/clean_text_benchmark.py
+"""
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'backend'))
+sys.path.insert(0, str(ROOT))
+
+from extraction import clean_extracted_text
+from tests.test_clean_extracted_text import legacy_clean_extracted_text
+
+# Extracted-PDF-like page: accents, bullets, ligatures, some ragged whitespace
+SAMPLE = (
+    "María José González\n"
+    "Senior Developer - Café Solutions Inc (2021-2024)\n"
+    "• Developed applications handling UTF-8, UTF-16, and ASCII encodings\n"
+    "• Worked with efﬁcient teams in São Paulo on résumé parsing  \n"
+    "• Led a team of five engineers and improved throughput by 40%\n\n\n\n"
+    "Skills:\tPython, JavaScript, React, MongoDB, Docker, AWS\n"
+) * 8 + "\x0c"
+
+SIZES = [10 * 1024, 100 * 1024, 1024 * 1024]
+
+def best_of(fn, text: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    print(f"{'size':>8}  {'legacy MB/s':>12}  {'current MB/s':>12}  {'speedup':>8}")
+    for size in SIZES:
+        text = (SAMPLE * (size // len(SAMPLE) + 1))[:size]
+        assert clean_extracted_text(text) == legacy_clean_extracted_text(text)
+
+        repeat = max(3, (1024 * 1024) // size)
+        legacy = best_of(legacy_clean_extracted_text, text, repeat)
+        current = best_of(clean_extracted_text, text, repeat)
+        megabytes = len(text.encode('utf-8')) / (1024 * 1024)
+        print(f"{size // 1024:>6}KB  {megabytes / legacy:>12.1f}  {megabytes / current:>12.1f}  {legacy / current:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
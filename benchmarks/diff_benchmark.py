@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the diff behind detect_word_changes: the original difflib
+version (SequenceMatcher plus re-joined offsets), a flat word-level diff
+and the line-then-word diff the server uses.
+
+Run from the repository root:
+    python benchmarks/diff_benchmark.py
+"""
+import re
+import sys
+import time
+import difflib
+import random
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'backend'))
+
+from diff_engine import tokenize, token_offsets, opcodes, plan_document_diff, region_blocks, document_opcodes
+
+TOKEN_COUNTS = [1000, 10000, 100000]
+# The original is quadratic; past this it takes minutes
+LEGACY_MAX_TOKENS = 20000
+
+# Resume-like lines: bullets, commas and common words repeat a lot. In
+# "varied" documents the numbers differ, so most lines are unique, as in a
+# real resume; in "repetitive" ones the same five lines repeat.
+LINES = [
+    "• Led a team of {n} engineers building payment services in Python and Go,",
+    "• Reduced API latency by {n}% by introducing caching, batching and connection pooling.",
+    "• Mentored {n} junior developers, ran code reviews and owned the release process.",
+    "Senior Software Engineer, Acme Corp ({n} - Present)",
+    "Skills: Python, Go, MongoDB, Docker, Kubernetes, AWS",
+]
+TYPOS = {"team": "teem", "the": "teh", "and": "adn", "by": "bye", "of": "off"}
+
+def make_documents(token_count: int, varied: bool, rng: random.Random) -> tuple:
+    """An original with typos in about 2% of its words, its 'cleaned' copy and the typo count"""
+    lines, tokens = [], 0
+    while tokens < token_count:
+        line = rng.choice(LINES).format(n=rng.randint(2, 100000) if varied else 5)
+        lines.append(line)
+        tokens += len(tokenize(line)) + 1
+    cleaned = "\n".join(lines)
+    words = re.split(r'(\s+)', cleaned)
+    typos = 0
+    for index in range(0, len(words), 2):
+        if words[index] in TYPOS and rng.random() < 0.3:
+            words[index] = TYPOS[words[index]]
+            typos += 1
+    return "".join(words), cleaned, typos
+
+def legacy_changes(original: str, cleaned: str) -> int:
+    original_words = re.findall(r'\S+|\s+', original)
+    cleaned_words = re.findall(r'\S+|\s+', cleaned)
+    spans = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, original_words, cleaned_words).get_opcodes():
+        if tag == 'replace':
+            spans.append((len(''.join(original_words[:i1])), len(''.join(original_words[:i2]))))
+    return len(spans)
+
+def flat_changes(original: str, cleaned: str) -> int:
+    original_words, cleaned_words = tokenize(original), tokenize(cleaned)
+    offsets = token_offsets(original_words)
+    spans = [(offsets[i1], offsets[i2]) for tag, i1, i2, _, _ in opcodes(original_words, cleaned_words) if tag != 'equal']
+    return len(spans)
+
+def hierarchical_changes(original: str, cleaned: str) -> int:
+    diff = plan_document_diff(original, cleaned)
+    offsets = token_offsets(diff.a_tokens)
+    operations = document_opcodes(diff, region_blocks(diff.regions))
+    spans = [(offsets[i1], offsets[i2]) for tag, i1, i2, _, _ in operations if tag != 'equal']
+    return len(spans)
+
+def timed(fn, *args) -> tuple:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+def main():
+    rng = random.Random(20240611)
+    print(f"{'tokens':>8}  {'document':>10}  {'legacy s':>9}  {'flat s':>8}  {'lines+words s':>13}"
+          f"  {'changes (typos/legacy/flat/lines+words)':>40}")
+    for token_count in TOKEN_COUNTS:
+        for varied in (True, False):
+            original, cleaned, typos = make_documents(token_count, varied, rng)
+            flat, flat_count = timed(flat_changes, original, cleaned)
+            hierarchical, hierarchical_count = timed(hierarchical_changes, original, cleaned)
+            legacy, legacy_count = '-', '-'
+            if token_count <= LEGACY_MAX_TOKENS:
+                legacy, legacy_count = timed(legacy_changes, original, cleaned)
+                legacy = f"{legacy:.3f}"
+            counts = f"{typos}/{legacy_count}/{flat_count}/{hierarchical_count}"
+            print(f"{token_count:>8}  {'varied' if varied else 'repetitive':>10}  {legacy:>9}  {flat:>8.3f}"
+                  f"  {hierarchical:>13.3f}  {counts:>40}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,31 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import './App.css';
 import axios from 'axios';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+const JOB_POLL_INTERVAL_MS = 1000;
+
+// Preview of the cleaned text while sections are still streaming in
+const applySections = (originalText, sections) => {
+  let text = originalText;
+  [...sections]
+    .sort((a, b) => b.start_pos - a.start_pos)
+    .forEach((section) => {
+      text = text.slice(0, section.start_pos) + section.cleaned_text + text.slice(section.end_pos);
+    });
+  return text;
+};
+
+const getTypeIcon = (type) => {
+  switch (type) {
+    case 'grammar': return '📝';
+    case 'punctuation': return '✏️';
+    case 'style': return '🎨';
+    case 'mechanical': return '🧹';
+    default: return '📋';
+  }
+};
 
 // Component for individual word changes with soothing colors
 const WordChange = ({ change, onToggle }) => {
@@ -15,20 +37,13 @@ const WordChange = ({ change, onToggle }) => {
         return 'change-type-badge punctuation';
       case 'style': 
         return 'change-type-badge style';
+      case 'mechanical': 
+        return 'change-type-badge mechanical';
       default: 
         return 'change-type-badge grammar';
     }
   };
 
-  const getTypeIcon = (type) => {
-    switch (type) {
-      case 'grammar': return '📝';
-      case 'punctuation': return '✏️';
-      case 'style': return '🎨';
-      default: return '📋';
-    }
-  };
-
   return (
     <div className="word-change-card change-item">
       <div className="flex justify-between items-start">
@@ -244,6 +259,7 @@ function App() {
   const [progress, setProgress] = useState(0);
   const [resumeData, setResumeData] = useState(null);
   const [error, setError] = useState(null);
+  const streamedAccepts = useRef(new Set());
 
   const handleFileUpload = async (file) => {
     setError(null);
@@ -275,20 +291,34 @@ function App() {
     }
   };
 
-  const processResume = async (fileId) => {
-    setProcessingStatus('processing');
-    setProgress(40);
-
+  // Fallback when the browser or a proxy can't do server-sent events:
+  // queue a processing job and poll it until it finishes
+  const processResumeBlocking = async (fileId) => {
     try {
       const response = await axios.post(`${API}/process-resume`, {
         file_id: fileId
       });
-
-      if (response.data.success) {
-        setResumeData(response.data);
-        setProgress(100);
-        setProcessingStatus('completed');
-        setCurrentStep('results');
+      const jobId = response.data.job_id;
+
+      for (;;) {
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        const { data: job } = await axios.get(`${API}/jobs/${jobId}`);
+
+        if (job.status === 'completed') {
+          setResumeData(job.result);
+          setProgress(100);
+          setProcessingStatus('completed');
+          setCurrentStep('results');
+          return;
+        }
+        if (job.status === 'failed') {
+          setError(job.error || 'Processing failed');
+          setProcessingStatus('error');
+          return;
+        }
+        if (job.progress.total > 0) {
+          setProgress(40 + Math.round((60 * job.progress.completed) / job.progress.total));
+        }
       }
     } catch (error) {
       console.error('Processing error:', error);
@@ -297,13 +327,104 @@ function App() {
     }
   };
 
+  // Stream suggestions section by section so they show up as soon as each is ready
+  const processResume = async (fileId) => {
+    setProcessingStatus('processing');
+    setProgress(40);
+    streamedAccepts.current = new Set();
+
+    if (typeof EventSource === 'undefined') {
+      return processResumeBlocking(fileId);
+    }
+
+    return new Promise((resolve) => {
+      const source = new EventSource(`${API}/process-resume/${fileId}/stream`);
+      let started = false;
+
+      source.addEventListener('start', (event) => {
+        const data = JSON.parse(event.data);
+        started = true;
+        setResumeData({
+          file_id: fileId,
+          original_text: data.original_text,
+          cleaned_text: data.original_text,
+          sections: [],
+          changes: []
+        });
+        setCurrentStep('results');
+      });
+
+      source.addEventListener('section', (event) => {
+        const section = JSON.parse(event.data);
+        setProgress(40 + Math.round((60 * section.completed) / section.sections));
+        setResumeData(prev => {
+          const sections = [...prev.sections, section];
+          return { ...prev, sections, cleaned_text: applySections(prev.original_text, sections) };
+        });
+      });
+
+      source.addEventListener('change', (event) => {
+        const change = JSON.parse(event.data);
+        setResumeData(prev => ({
+          ...prev,
+          changes: [...prev.changes, change].sort((a, b) => a.start_pos - b.start_pos)
+        }));
+      });
+
+      source.addEventListener('done', async (event) => {
+        source.close();
+        const result = JSON.parse(event.data);
+        // Changes accepted while streaming were only recorded locally; save them now
+        const accepted = streamedAccepts.current;
+        result.changes = result.changes.map(change => ({ ...change, accepted: accepted.has(change.id) }));
+        setResumeData(result);
+        setProgress(100);
+        setProcessingStatus('completed');
+        if (accepted.size > 0) {
+          await axios.post(`${API}/changes/bulk`, {
+            file_id: fileId,
+            action: 'accept',
+            change_ids: [...accepted]
+          }).catch(error => console.error('Toggle change error:', error));
+        }
+        resolve();
+      });
+
+      source.addEventListener('error', (event) => {
+        source.close();
+        if (event.data) {
+          // Error reported by the server
+          setError(JSON.parse(event.data).detail);
+          setProcessingStatus('error');
+          resolve();
+        } else if (!started) {
+          // Could not open the stream at all
+          processResumeBlocking(fileId).then(resolve);
+        } else {
+          setError('Connection lost while processing');
+          setProcessingStatus('error');
+          resolve();
+        }
+      });
+    });
+  };
+
   const handleChangeToggle = async (changeId, action) => {
     try {
-      await axios.post(`${API}/toggle-change`, {
-        file_id: fileData.file_id,
-        change_id: changeId,
-        action: action
-      });
+      if (processingStatus === 'processing') {
+        // Changes are saved when the stream finishes
+        if (action === 'accept') {
+          streamedAccepts.current.add(changeId);
+        } else {
+          streamedAccepts.current.delete(changeId);
+        }
+      } else {
+        await axios.post(`${API}/toggle-change`, {
+          file_id: fileData.file_id,
+          change_id: changeId,
+          action: action
+        });
+      }
 
       // Update local state
       setResumeData(prev => ({
@@ -320,6 +441,44 @@ function App() {
     }
   };
 
+  // Accept or reject every change matching the selector (change_ids, change_type, start_pos/end_pos; none means all)
+  const handleBulkToggle = async (action, selector = {}) => {
+    const matches = (change) =>
+      (!selector.change_ids || selector.change_ids.includes(change.id)) &&
+      (!selector.change_type || change.change_type === selector.change_type) &&
+      (selector.start_pos == null || change.start_pos >= selector.start_pos) &&
+      (selector.end_pos == null || change.end_pos <= selector.end_pos);
+
+    try {
+      if (processingStatus === 'processing') {
+        // Changes are saved when the stream finishes
+        resumeData.changes.filter(matches).forEach(change => {
+          if (action === 'accept') {
+            streamedAccepts.current.add(change.id);
+          } else {
+            streamedAccepts.current.delete(change.id);
+          }
+        });
+      } else {
+        await axios.post(`${API}/changes/bulk`, {
+          file_id: fileData.file_id,
+          action: action,
+          ...selector
+        });
+      }
+
+      setResumeData(prev => ({
+        ...prev,
+        changes: prev.changes.map(change =>
+          matches(change) ? { ...change, accepted: action === 'accept' } : change
+        )
+      }));
+    } catch (error) {
+      console.error('Bulk change error:', error);
+      setError('Failed to update changes');
+    }
+  };
+
   const generateFinalText = async () => {
     try {
       const response = await axios.get(`${API}/generate-final-text/${fileData.file_id}`);
@@ -499,6 +658,33 @@ function App() {
                       </div>
                     </h3>
                   </div>
+                  <div className="px-6 pt-4 flex gap-2">
+                    <button
+                      onClick={() => handleBulkToggle('accept')}
+                      className="px-4 py-2 rounded-lg text-sm font-semibold transition-all duration-200"
+                      style={{ border: '2px solid var(--success-text)', color: 'var(--success-text)' }}
+                    >
+                      Apply All
+                    </button>
+                    <button
+                      onClick={() => handleBulkToggle('reject')}
+                      className="px-4 py-2 rounded-lg text-sm font-semibold transition-all duration-200"
+                      style={{ border: '2px solid var(--error-text)', color: 'var(--error-text)' }}
+                    >
+                      Ignore All
+                    </button>
+                    {['grammar', 'punctuation', 'style', 'mechanical']
+                      .filter(type => resumeData.changes.some(change => change.change_type === type))
+                      .map(type => (
+                        <button
+                          key={type}
+                          onClick={() => handleBulkToggle('accept', { change_type: type })}
+                          className="px-3 py-2 rounded-lg text-sm font-medium text-gray-700 bg-gray-100 hover:bg-gray-200 transition-all duration-200"
+                        >
+                          {getTypeIcon(type)} Apply all {type}
+                        </button>
+                      ))}
+                  </div>
                   <div className="p-6 max-h-96 overflow-y-auto custom-scrollbar">
                     {resumeData.changes.map((change) => (
                       <WordChange
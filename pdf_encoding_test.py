@@ -15,6 +15,9 @@ from reportlab.lib.pagesizes import letter
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
+# The job polling helper is shared with the main backend test
+from backend_test import wait_for_job
+
 # Configuration
 BACKEND_URL = "https://cv-refiner.preview.emergentagent.com/api"
 TEST_TIMEOUT = 30
@@ -206,9 +209,11 @@ class PDFEncodingTester:
                 json=payload, 
                 timeout=TEST_TIMEOUT
             )
+            response = wait_for_job(self.session, self.base_url, response)
             
             if response.status_code == 200:
-                data = response.json()
+                # A completed job carries the processing result
+                data = response.json().get('result') or response.json()
                 if (data.get('success') and 
                     data.get('cleaned_text') and 
                     data.get('changes') is not None):
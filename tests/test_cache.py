@@ -0,0 +1,213 @@
+"""
+The caches: the in-process LRU's size bound, the MongoDB tier behind it
+(against an in-memory collection), and SingleFlight, which shares one call
+among concurrent callers with the same key, progress reports included.
+"""
+import time
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import cache as cache_module
+import pytest
+
+from cache import LRUCache, TwoTierCache, ExtractionCache, LLMResponseCache, SingleFlight, normalize_llm_input
+from extraction import ExtractionResult
+
+class Cursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.documents = sorted(self.documents, key=lambda document: document[field], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    async def __aiter__(self):
+        for document in self.documents:
+            yield document
+
+class CacheCollection:
+    """In-memory stand-in for a cache's MongoDB collection"""
+    name = "cache"
+
+    def __init__(self):
+        self.documents = {}
+
+    async def find_one(self, query):
+        document = self.documents.get(query["_id"])
+        return dict(document) if document else None
+
+    async def replace_one(self, query, document, upsert=False):
+        self.documents[query["_id"]] = {"_id": query["_id"], **document}
+
+    async def estimated_document_count(self):
+        return len(self.documents)
+
+    def find(self, query, projection=None):
+        return Cursor(list(self.documents.values()))
+
+    async def delete_many(self, query):
+        ids = [key for key in query["_id"]["$in"] if key in self.documents]
+        for key in ids:
+            del self.documents[key]
+        return type("DeleteResult", (), {"deleted_count": len(ids)})()
+
+def test_lru_evicts_least_recently_used_to_stay_within_its_byte_bound():
+    cache = LRUCache(max_bytes=10)
+    cache.put("a", "xxxx")
+    cache.put("b", "xxxx")
+    assert cache.get("a") == "xxxx"
+    cache.put("c", "xxxx")
+    # "b" was used least recently
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("xxxx", "xxxx")
+    assert cache.current_bytes == 8
+    # Larger than the whole cache: not stored, nothing evicted
+    cache.put("d", "x" * 11)
+    assert cache.get("d") is None and len(cache) == 2
+
+def test_cache_without_a_document_mapping_cannot_be_created():
+    class TextCache(TwoTierCache):
+        def to_document(self, value):
+            return {"text": value}
+
+    with pytest.raises(TypeError):
+        TextCache(CacheCollection(), max_bytes=100, sizeof=len)
+
+def test_extraction_cache_falls_back_to_mongo():
+    async def scenario():
+        collection = CacheCollection()
+        result = ExtractionResult("Jane Doe\nEngineer", "pdfplumber", 0.9)
+        await ExtractionCache(collection).put("hash", "pdf", result)
+        # A fresh process has an empty memory tier
+        cache = ExtractionCache(collection)
+        found = await cache.get("hash", "pdf"), await cache.get("hash", "pdf"), await cache.get("hash", "docx")
+        return found, cache.stats()
+
+    (from_mongo, from_memory, other_type), stats = asyncio.run(scenario())
+    assert from_mongo == from_memory == ExtractionResult("Jane Doe\nEngineer", "pdfplumber", 0.9)
+    assert other_type is None
+    assert (stats["mongo_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+
+def test_lru_entries_expire_after_their_ttl():
+    cache = LRUCache(max_bytes=100, ttl_seconds=0.05)
+    cache.put("a", "xxxx")
+    assert cache.get("a") == "xxxx"
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.current_bytes == 0
+
+def test_lookup_treats_expired_mongo_entries_as_misses():
+    async def scenario():
+        collection = CacheCollection()
+        await LLMResponseCache(collection, ttl_seconds=3600).store("fresh", "cleaned")
+        await LLMResponseCache(collection, ttl_seconds=3600).store("stale", "cleaned")
+        # The TTL monitor has not removed it yet; Mongo returns naive UTC datetimes
+        collection.documents["stale"]["created_at"] = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=2)
+        cache = LLMResponseCache(collection, ttl_seconds=3600)
+        return await cache.lookup("fresh"), await cache.lookup("stale"), cache.stats()
+
+    fresh, stale, stats = asyncio.run(scenario())
+    assert (fresh, stale) == ("cleaned", None)
+    assert (stats["mongo_hits"], stats["misses"]) == (1, 1)
+
+def test_writes_evict_the_oldest_entries_past_max_entries(monkeypatch):
+    monkeypatch.setattr(cache_module, 'EVICTION_CHECK_INTERVAL', 1)
+
+    async def scenario():
+        collection = CacheCollection()
+        cache = LLMResponseCache(collection, max_entries=3)
+        start = datetime.now(timezone.utc) - timedelta(hours=1)
+        for index in range(5):
+            await cache.store(f"key{index}", "cleaned")
+            collection.documents[f"key{index}"]["created_at"] = start + timedelta(seconds=index)
+        return set(collection.documents), cache.stats()
+
+    keys, stats = asyncio.run(scenario())
+    assert keys == {"key2", "key3", "key4"}
+    assert stats["evicted"] == 2
+
+def test_llm_cache_key_ignores_layout_noise_only():
+    assert normalize_llm_input("  Jane   Doe \r\n\tEngineer\t \n") == "Jane Doe\nEngineer"
+    # Composed and decomposed accents are the same text
+    assert normalize_llm_input("Jos\u0065\u0301") == normalize_llm_input("Jos\u00e9")
+    key = LLMResponseCache.key("Jane  Doe\r\nEngineer", "model-a", "v1")
+    assert key == LLMResponseCache.key("Jane Doe\nEngineer ", "model-a", "v1")
+    assert key != LLMResponseCache.key("Jane Doe\nEngineer", "model-b", "v1")
+    assert key != LLMResponseCache.key("Jane Doe\nEngineer", "model-a", "v2")
+    assert key != LLMResponseCache.key("Jane Doe\n\nEngineer", "model-a", "v1")
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def scenario():
+        flights, release, runs = SingleFlight(), asyncio.Event(), []
+
+        async def work():
+            runs.append(1)
+            await release.wait()
+            return "cleaned"
+
+        first = asyncio.create_task(flights.do("resume", work))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flights.do("resume", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        result = await second
+        return first.cancelled(), result, runs, flights.stats()
+
+    first_cancelled, result, runs, stats = asyncio.run(scenario())
+    assert first_cancelled
+    assert result == "cleaned" and runs == [1]
+    assert stats == {"in_flight": 0, "started": 1, "shared": 1}
+
+def test_failed_call_fails_every_caller_and_is_not_kept():
+    async def scenario():
+        flights, attempts = SingleFlight(), []
+
+        async def work():
+            attempts.append(1)
+            await asyncio.sleep(0.01)
+            raise RuntimeError("LLM unavailable")
+
+        results = await asyncio.gather(flights.do("resume", work), flights.do("resume", work), return_exceptions=True)
+        # A later call starts afresh
+        retried = await asyncio.gather(flights.do("resume", work), return_exceptions=True)
+        return results + retried, attempts
+
+    results, attempts = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert attempts == [1, 1]
+
+def test_shared_call_reports_progress_to_every_caller():
+    async def scenario():
+        flights, seen = SingleFlight(), {"first": [], "late": []}
+
+        async def work(report_progress):
+            for completed in range(1, 4):
+                await asyncio.sleep(0.02)
+                await report_progress(completed, 3)
+            return "cleaned"
+
+        def reporter(name):
+            async def report_progress(completed, total):
+                seen[name].append((completed, total))
+            return report_progress
+
+        async def late_caller():
+            await asyncio.sleep(0.03)
+            return await flights.do("resume", work, report_progress=reporter("late"))
+
+        results = await asyncio.gather(flights.do("resume", work, report_progress=reporter("first")), late_caller())
+        return results, seen, flights.stats()
+
+    results, seen, stats = asyncio.run(scenario())
+    assert results == ["cleaned", "cleaned"]
+    assert seen["first"] == [(1, 3), (2, 3), (3, 3)]
+    # The late caller first gets the latest report, then the rest as they come
+    assert seen["late"] == [(1, 3), (2, 3), (3, 3)]
+    assert stats == {"in_flight": 0, "started": 1, "shared": 1}
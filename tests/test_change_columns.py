@@ -0,0 +1,53 @@
+"""
+Columnar change storage must give back exactly the change dicts the API
+returned before, and the $bit updates must flip only the targeted bits,
+including the sign bit of a word.
+"""
+import bson
+
+from resumes import pack_changes, unpack_changes, resume_changes, matching_changes, accepted_update, CHANGE_TYPES
+
+def make_changes(original_text, count):
+    changes = []
+    for index in range(count):
+        start = index * 3
+        changes.append({
+            "id": str(index),
+            "original": original_text[start:start + 2],
+            "suggested": f"s{index}" if index % 5 else "",
+            "start_pos": start,
+            "end_pos": start + 2,
+            "change_type": CHANGE_TYPES[index % len(CHANGE_TYPES)],
+            "accepted": index % 7 == 0,
+            "context": original_text[max(0, start - 50):start + 2 + 50]
+        })
+    return changes
+
+def apply_bit_update(columns, update):
+    """What MongoDB's $bit does to the stored words"""
+    for field, operation in update["$bit"].items():
+        word = int(field.rsplit(".", 1)[1])
+        (operator, mask), = operation.items()
+        value = columns["accepted"][word]
+        columns["accepted"][word] = bson.int64.Int64(value | mask if operator == "or" else value & mask)
+
+def test_round_trip_through_bson():
+    original_text = "ab " * 200
+    changes = make_changes(original_text, 150)
+    columns = bson.decode(bson.encode({"c": pack_changes(list(reversed(changes)))}))["c"]
+    assert unpack_changes(columns, original_text) == changes
+    assert resume_changes({"original_text": original_text, "change_columns": columns}) == changes
+    assert resume_changes({"changes": changes}) == changes
+
+def test_bit_updates_touch_only_selected_changes():
+    original_text = "ab " * 200
+    changes = make_changes(original_text, 150)
+    columns = pack_changes(changes)
+    selected = matching_changes(columns, change_type="style", end_pos=300)
+    assert selected == [index for index in range(100) if index % 4 == 2]
+    for index in selected + [63, 127]:
+        changes[index]["accepted"] = True
+    apply_bit_update(columns, accepted_update(selected + [63, 127], True))
+    changes[0]["accepted"] = changes[64]["accepted"] = False
+    apply_bit_update(columns, accepted_update([0, 64], False))
+    assert unpack_changes(columns, original_text) == changes
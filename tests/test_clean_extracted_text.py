@@ -0,0 +1,59 @@
+"""
+clean_extracted_text must produce exactly the output of the original
+character-by-character implementation, kept here as the reference.
+"""
+import random
+import re
+import unicodedata
+
+import pytest
+
+from extraction import clean_extracted_text
+
+def legacy_clean_extracted_text(text: str) -> str:
+    """Reference implementation (character loop + three regex passes)"""
+    if not text:
+        return ""
+    text = unicodedata.normalize('NFKD', text)
+    cleaned_chars = []
+    for char in text:
+        if (ord(char) >= 32 and ord(char) <= 126) or char in '\n\t\r' or ord(char) >= 160:
+            cleaned_chars.append(char)
+        elif char.isspace():
+            cleaned_chars.append(' ')
+    text = ''.join(cleaned_chars)
+    text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)
+    text = re.sub(r'[ \t]+', ' ', text)
+    text = re.sub(r'[ \t]*\n[ \t]*', '\n', text)
+    return text.strip()
+
+FIXTURES = [
+    "",
+    "   ",
+    "John Smith\nSoftware Developer",
+    "María José González\nSão Paulo • Café Technologies — résumé, naïve, coöperative",
+    "Ofﬁce manager, ﬂexible, efﬁcient",  # ligatures
+    "Name:\tJane\t\tDoe  \t \nEmail:  jane@example.com   \n\n\n\n\nSkills",
+    "Line one\r\nLine two\r\n\r\n\r\n\r\nLine three\rLine four",
+    "Bell\x07 and\x00 null\x1b escape\x7f del\x85next\x0bvt\x0cff\x1cfs\x9f",
+    "Non\xa0breaking em line para spaces",
+    "Emoji 🚀 and CJK 履歴書 and RTL עברית",
+    "Lone surrogate \ud800 kept",
+    "\n \t \n\t\n  Indented\n\t\tBullets:\n  • One\n  • Two  \n",
+    "(cid:127) Developed applications\n(cid:127) Led teams",
+]
+
+@pytest.mark.parametrize("text", FIXTURES)
+def test_matches_reference_on_fixtures(text):
+    assert clean_extracted_text(text) == legacy_clean_extracted_text(text)
+
+def test_matches_reference_on_random_text():
+    alphabet = (
+        "ab Z.,;\n\n\t\r  "
+        "\x00\x07\x0b\x0c\x1c\x1f\x7f\x85\x9f\xa0  "
+        "é́ﬁ•—"
+    )
+    rng = random.Random(20240517)
+    for _ in range(5000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        assert clean_extracted_text(text) == legacy_clean_extracted_text(text), repr(text)
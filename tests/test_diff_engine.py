@@ -0,0 +1,85 @@
+"""
+The token diff must always turn a into b, find a longest common
+subsequence for small inputs, and stay aligned on repetitive resumes where
+difflib's autojunk heuristic gives up. The line-then-word diff must agree
+with it on the result, however the regions are sharded.
+"""
+import random
+
+from diff_engine import (
+    opcodes, matching_blocks, intern_tokens, tokenize, token_offsets,
+    plan_document_diff, region_blocks, shard_regions, document_opcodes
+)
+
+def apply_opcodes(a, b, operations):
+    result = []
+    for tag, i1, i2, j1, j2 in operations:
+        if tag == 'equal':
+            assert a[i1:i2] == b[j1:j2]
+            result.extend(a[i1:i2])
+        else:
+            result.extend(b[j1:j2])
+    return result
+
+def lcs_length(a, b):
+    previous = [0] * (len(b) + 1)
+    for x in a:
+        current = [0]
+        for j, y in enumerate(b):
+            current.append(previous[j] + 1 if x == y else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+def test_small_diffs_are_minimal():
+    rng = random.Random(20240611)
+    for _ in range(500):
+        a = [rng.choice("abcde") for _ in range(rng.randint(0, 30))]
+        b = [rng.choice("abcde") for _ in range(rng.randint(0, 30))]
+        assert apply_opcodes(a, b, opcodes(a, b)) == b
+        a_ids, b_ids = intern_tokens(a, b)
+        assert sum(size for _, _, size in matching_blocks(a_ids, b_ids)) == lcs_length(a, b)
+
+def test_large_random_edits_round_trip():
+    rng = random.Random(7)
+    vocabulary = ["led", "the", "team", ",", "•", "Python", "and", "built"] + [f"w{n}" for n in range(200)]
+    for _ in range(20):
+        a = [rng.choice(vocabulary) for _ in range(rng.randint(500, 3000))]
+        b = list(a)
+        for _ in range(rng.randint(0, 60)):
+            position = rng.randrange(len(b) + 1)
+            b[position:position + rng.randint(0, 3)] = [rng.choice(vocabulary) for _ in range(rng.randint(0, 3))]
+        assert apply_opcodes(a, b, opcodes(a, b)) == b
+
+def test_repetitive_text_stays_aligned():
+    original = "• Led the team and built the API\n" * 2000
+    cleaned = original[:30000] + original[30000:].replace("built", "shipped", 1)
+    a, b = tokenize(original), tokenize(cleaned)
+    changed = [operation for operation in opcodes(a, b) if operation[0] != 'equal']
+    assert len(changed) == 1
+    tag, i1, i2, _, _ = changed[0]
+    offsets = token_offsets(a)
+    assert tag == 'replace' and original[offsets[i1]:offsets[i2]] == "built"
+    assert offsets[-1] == len(original)
+
+def test_hierarchical_diff_round_trips_across_shards():
+    rng = random.Random(11)
+    lines = [f"• Led {n} engineers and built the API," for n in range(300)] + ["Skills: Python, Go"] * 20
+    rng.shuffle(lines)
+    original = "\n".join(lines)
+    edited = list(lines)
+    for _ in range(40):
+        index = rng.randrange(len(edited))
+        choice = rng.random()
+        if choice < 0.3:
+            del edited[index]
+        elif choice < 0.6:
+            edited.insert(index, "Mentored junior developers")
+        else:
+            edited[index] = edited[index].replace("built", "shipped").replace("the ", "")
+    cleaned = "\n".join(edited)
+    diff = plan_document_diff(original, cleaned)
+    for shards in (1, 3):
+        blocks = [block for shard in shard_regions(diff.regions, shards) for block in region_blocks(shard)]
+        operations = document_opcodes(diff, blocks)
+        assert "".join(apply_opcodes(diff.a_tokens, diff.b_tokens, operations)) == cleaned
+        assert {tag for tag, _, _, _, _ in operations} >= {'insert', 'delete'}
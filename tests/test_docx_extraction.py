@@ -0,0 +1,93 @@
+"""
+The streaming WordprocessingML parser must read a DOCX like python-docx
+renders it: headers, body (tables and text boxes included) and footers,
+each repeated header or footer once, and nothing from formatting markup.
+"""
+import io
+
+import pytest
+from docx import Document
+from docx.oxml import parse_xml
+from docx.shared import Inches
+
+import extraction
+from extraction import ExtractionLimitExceeded, extract_text_from_docx
+
+NAMESPACES = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+    'xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape" '
+    'xmlns:v="urn:schemas-microsoft-com:vml"'
+)
+
+def text_box_run(text):
+    """A run holding a text box as Word writes it: the DrawingML shape, then a VML fallback copy"""
+    content = f'<w:txbxContent><w:p><w:r><w:t>{text}</w:t></w:r></w:p></w:txbxContent>'
+    return parse_xml(
+        f'<w:r {NAMESPACES}><mc:AlternateContent>'
+        f'<mc:Choice Requires="wps"><wps:txbx>{content}</wps:txbx></mc:Choice>'
+        f'<mc:Fallback><v:textbox>{content}</v:textbox></mc:Fallback>'
+        f'</mc:AlternateContent></w:r>'
+    )
+
+def to_bytes(document):
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+@pytest.fixture
+def resume_docx():
+    document = Document()
+    section = document.sections[0]
+    # The first-page header repeats the default one, as Word templates often do
+    section.different_first_page_header_footer = True
+    section.header.paragraphs[0].text = "Jane Doe | jane@example.com"
+    section.first_page_header.paragraphs[0].text = "Jane Doe | jane@example.com"
+    section.footer.paragraphs[0].text = "References available on request"
+    section.first_page_footer.paragraphs[0].text = "Page 1"
+
+    document.add_paragraph("EXPERIENCE")
+    job = document.add_paragraph("Senior Engineer\tAcme Corp")
+    job.paragraph_format.tab_stops.add_tab_stop(Inches(4))
+    table = document.add_table(rows=2, cols=2)
+    for row, cells in enumerate([("Python", "8 years"), ("Go", "3 years")]):
+        for column, text in enumerate(cells):
+            table.cell(row, column).text = text
+    anchor = document.add_paragraph("Anchor")
+    anchor._p.append(text_box_run("Certified Kubernetes Administrator"))
+    return to_bytes(document)
+
+def test_reads_headers_body_tables_and_footers_in_order(resume_docx):
+    lines = extract_text_from_docx(resume_docx).split("\n")
+    assert lines == [
+        "Jane Doe | jane@example.com",
+        "EXPERIENCE",
+        "Senior Engineer\tAcme Corp",
+        "Python", "8 years", "Go", "3 years",
+        # A text box's paragraphs end before the paragraph anchoring it
+        "Certified Kubernetes Administrator",
+        "Anchor",
+        "References available on request",
+        "Page 1",
+    ]
+
+def test_repeated_header_is_read_once(resume_docx):
+    assert extract_text_from_docx(resume_docx).count("Jane Doe") == 1
+
+def test_text_box_fallback_copy_is_skipped(resume_docx):
+    assert extract_text_from_docx(resume_docx).count("Certified Kubernetes Administrator") == 1
+
+def test_tab_stops_are_not_text(resume_docx):
+    # The w:tab in the paragraph's tab stops must not add a second tab
+    assert "Senior Engineer\tAcme Corp" in extract_text_from_docx(resume_docx).split("\n")
+
+def test_stops_at_the_extracted_size_limit(monkeypatch):
+    document = Document()
+    for _ in range(50):
+        document.add_paragraph("x" * 99)
+    data = to_bytes(document)
+    monkeypatch.setattr(extraction, "MAX_EXTRACTED_CHARS", 1000)
+    with pytest.raises(ExtractionLimitExceeded):
+        extract_text_from_docx(data)
+    monkeypatch.setattr(extraction, "MAX_EXTRACTED_CHARS", 5000)
+    assert len(extract_text_from_docx(data)) == 50 * 100 - 1
@@ -0,0 +1,43 @@
+"""
+Edit lists from the model are validated and anchored on the text it saw;
+anything unusable is dropped instead of corrupting the cleaned text.
+"""
+import json
+
+import pytest
+
+from edits import EditListError, parse_edit_list, locate_edits, apply_edits
+
+TEXT = "Led teh team. Fixed teh bug in tehran quickly and well."
+
+def test_parse_validates_and_normalizes():
+    response = "```json\n" + json.dumps({"edits": [
+        {"find": " teh team ", "replace": "the team", "category": "Grammar"},
+        {"find": "", "replace": "x"},
+        {"find": "bug", "replace": 3},
+        {"find": "well", "replace": "well", "category": "spelling", "offset": "7"},
+    ]}) + "\n```"
+    assert parse_edit_list(response) == [
+        {"find": "teh team", "replace": "the team", "category": "grammar", "offset": None},
+        {"find": "well", "replace": "well", "category": "grammar", "offset": None},
+    ]
+    with pytest.raises(EditListError):
+        parse_edit_list("Here is the cleaned text")
+    with pytest.raises(EditListError):
+        parse_edit_list('{"changes": []}')
+
+def test_locate_and_apply():
+    edits = parse_edit_list(json.dumps([
+        {"find": "teh", "replace": "the", "category": "grammar", "offset": 15},
+        {"find": "teh", "replace": "the", "category": "grammar"},
+        {"find": "Fixed teh bug", "replace": "Fixed the bug", "category": "grammar"},
+        {"find": "quickly and", "replace": "", "category": "style"},
+        {"find": "led teh", "replace": "led the"},
+        {"find": "not in the text", "replace": "x"},
+    ]))
+    located = locate_edits(TEXT, edits)
+    # "teh" never matches inside "tehran", "led teh" is not "Led teh", and the later overlapping edit is dropped
+    assert [(edit.original, edit.suggested, edit.category) for edit in located] == [
+        ("teh", "the", "grammar"), ("teh", "the", "grammar"), ("quickly and ", "", "style")
+    ]
+    assert apply_edits(TEXT, located) == "Led the team. Fixed the bug in tehran well."
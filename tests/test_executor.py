@@ -0,0 +1,105 @@
+"""
+A worker process that dies takes the whole process pool down with it; the
+executor must pin the failure on the job that crashed and retry the others.
+Workers run under the default address-space limit, and a job that overruns
+job_timeout is killed along with its pool, which is rebuilt for the next job.
+"""
+import os
+import time
+import asyncio
+
+import pytest
+
+import executor as executor_module
+from executor import ExtractionExecutor, ExtractionTimeout, ExtractionWorkerCrashed
+
+def crash():
+    time.sleep(0.2)
+    os._exit(1)
+
+def slow(value):
+    time.sleep(0.5)
+    return value
+
+def hang():
+    time.sleep(30)
+
+def nap(seconds):
+    time.sleep(seconds)
+    return seconds
+
+async def later(delay, job):
+    await asyncio.sleep(delay)
+    return await job
+
+def address_space_limit():
+    import resource
+    return resource.getrlimit(resource.RLIMIT_AS)[0]
+
+def allocate(size):
+    return len(bytearray(size))
+
+def run(coroutine_fn, **options):
+    executor = ExtractionExecutor(max_workers=3, **{"job_timeout": None, "max_memory_mb": None, **options})
+    try:
+        return asyncio.run(coroutine_fn(executor)), executor.stats()
+    finally:
+        executor.shutdown()
+
+def test_job_that_crashes_alone_is_not_retried():
+    async def scenario(executor):
+        with pytest.raises(ExtractionWorkerCrashed):
+            await executor.run(crash)
+        return await executor.run(slow, "after")
+
+    result, stats = run(scenario)
+    assert result == "after"
+    assert stats["crashed"] == 1 and stats["retried"] == 0 and stats["pool_restarts"] == 1
+
+def test_crash_fails_only_the_culprit():
+    async def scenario(executor):
+        return await asyncio.gather(
+            executor.run(crash), executor.run(slow, 1), executor.run(slow, 2), return_exceptions=True
+        )
+
+    results, stats = run(scenario)
+    assert isinstance(results[0], ExtractionWorkerCrashed)
+    assert results[1:] == [1, 2]
+    # The culprit breaks the shared pool once, then only its own isolated retry
+    assert stats["crashed"] == 1 and stats["pool_restarts"] == 1
+
+def test_workers_run_under_the_default_memory_limit(monkeypatch):
+    monkeypatch.delenv('EXTRACTION_MAX_MEMORY_MB', raising=False)
+    max_memory_mb = ExtractionExecutor.from_env().max_memory_mb
+
+    async def scenario(executor):
+        limit = await executor.run(address_space_limit)
+        with pytest.raises(MemoryError):
+            await executor.run(allocate, 2 * max_memory_mb * 1024 * 1024)
+        return limit, await executor.run(allocate, 1024 * 1024)
+
+    (limit, allocated), stats = run(scenario, max_memory_mb=max_memory_mb)
+    assert limit == max_memory_mb * 1024 * 1024
+    # An allocation over the limit fails the job, not the worker
+    assert allocated == 1024 * 1024
+    assert stats["failed"] == 1 and stats["pool_restarts"] == 0
+
+def test_overdue_job_is_killed_and_the_pool_rebuilt(monkeypatch):
+    monkeypatch.setattr(executor_module, 'WATCHDOG_INTERVAL', 0.1)
+
+    async def scenario(executor):
+        # hang is killed at about 1.1s, while nap is still running
+        results = await asyncio.gather(
+            executor.run(hang), executor.run(slow, "innocent"), later(0.6, executor.run(nap, 0.8)),
+            return_exceptions=True
+        )
+        return results, await executor.run(slow, "after")
+
+    started = time.monotonic()
+    (results, after), stats = run(scenario, job_timeout=1)
+    assert isinstance(results[0], ExtractionTimeout)
+    # One job finished before the kill, one killed with the pool is retried,
+    # and the next one runs in the new pool
+    assert results[1:] == ["innocent", 0.8] and after == "after"
+    assert stats["timed_out"] == 1 and stats["retried"] == 1 and stats["pool_restarts"] == 1
+    assert time.monotonic() - started < 15
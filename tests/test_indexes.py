@@ -0,0 +1,116 @@
+"""
+Every query the server makes must be answered from an index, not a
+collection scan. The filters come from the same functions the endpoints
+use. The static test checks each one leads with an indexed field; the
+explain test runs them against a MongoDB at MONGO_URL (skipped without
+one), in a throwaway database.
+"""
+import os
+import uuid
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from cache import ExtractionCache, LLMResponseCache, CREATED_AT_INDEX, EVICTION_SORT
+from jobs import JobQueue, JOB_INDEXES, CLAIM_SORT, job_filter, claimable_filter, leased_filter
+from resumes import (
+    RESUME_INDEXES, BATCH_INDEXES, ensure_resume_indexes, ensure_batch_indexes, resume_filter, owned_filter,
+    claim_filter, stored_change_filter, same_changes_filter, legacy_change_filter, legacy_changes_filter,
+    batch_resumes_filter, batch_filter
+)
+
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+NOW = datetime.now(timezone.utc)
+
+# Index keys by collection; _id is always indexed
+INDEXES = {
+    "resumes": [keys for keys, _ in RESUME_INDEXES],
+    "batches": [keys for keys, _ in BATCH_INDEXES],
+    "jobs": [keys for keys, _ in JOB_INDEXES],
+    "llm_cache": [CREATED_AT_INDEX],
+    "extraction_cache": [CREATED_AT_INDEX],
+}
+
+# (collection, filter, sort) for every query the server sends
+QUERIES = [
+    ("resumes", resume_filter("r1"), None),
+    ("resumes", owned_filter("r1", "j1"), None),
+    ("resumes", claim_filter("r1", {"processing_status": "uploaded", "job_id": None}), None),
+    ("resumes", stored_change_filter("r1", 3), None),
+    ("resumes", same_changes_filter("r1", 4), None),
+    ("resumes", legacy_change_filter("r1", "3"), None),
+    ("resumes", legacy_changes_filter("r1"), None),
+    ("resumes", batch_resumes_filter("b1"), None),
+    ("batches", batch_filter("b1"), None),
+    ("jobs", job_filter("j1"), None),
+    ("jobs", claimable_filter(NOW), CLAIM_SORT),
+    ("jobs", leased_filter({"id": "j1", "worker_id": "w1"}), None),
+    ("llm_cache", {"_id": "k1"}, None),
+    ("llm_cache", {}, EVICTION_SORT),
+    ("extraction_cache", {"_id": "k1"}, None),
+    ("extraction_cache", {}, EVICTION_SORT),
+]
+
+def branches(query):
+    """The filters a query's $or (if any) splits into"""
+    return query["$or"] if "$or" in query else [query]
+
+def test_every_query_leads_with_an_indexed_field():
+    for collection, query, sort in QUERIES:
+        leading = {keys[0][0] for keys in INDEXES[collection]} | {"_id"}
+        for branch in branches(query):
+            # An empty filter is only cheap when the index also gives the sort order
+            fields = set(branch) or {sort[0][0]}
+            assert fields & leading, (collection, query)
+
+def scanned_stages(plan):
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(scanned_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(scanned_stages(child))
+    return stages
+
+async def winning_plans():
+    client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=500)
+    try:
+        await client.admin.command("ping")
+    except Exception:
+        pytest.skip(f"No MongoDB at {MONGO_URL}")
+    database = client[f"test_indexes_{uuid.uuid4().hex[:8]}"]
+    try:
+        # The same index setup the server runs at startup
+        await ensure_resume_indexes(database.resumes)
+        await ensure_batch_indexes(database.batches)
+        await JobQueue(database.jobs, handler=None).ensure_indexes()
+        await LLMResponseCache(database.llm_cache).ensure_indexes()
+        await ExtractionCache(database.extraction_cache).ensure_indexes()
+        await database.resumes.insert_many([
+            {"id": f"r{n}", "job_id": f"j{n}", "batch_id": f"b{n % 3}", "processing_status": "uploaded"}
+            for n in range(50)
+        ])
+        await database.batches.insert_many([{"id": f"b{n}", "items": []} for n in range(50)])
+        await database.jobs.insert_many([
+            {"id": f"j{n}", "status": "queued", "available_at": NOW, "lease_expires_at": None, "worker_id": None}
+            for n in range(50)
+        ])
+        for cache in (database.llm_cache, database.extraction_cache):
+            await cache.insert_many([{"_id": f"k{n}", "created_at": NOW} for n in range(50)])
+        plans = []
+        for collection, query, sort in QUERIES:
+            cursor = database[collection].find(query)
+            if sort:
+                cursor = cursor.sort(sort).limit(1)
+            explanation = await cursor.explain()
+            plans.append(((collection, query), explanation["queryPlanner"]["winningPlan"]))
+        return plans
+    finally:
+        await client.drop_database(database.name)
+        client.close()
+
+def test_every_query_uses_an_index():
+    for query, plan in asyncio.run(winning_plans()):
+        assert "COLLSCAN" not in scanned_stages(plan), query
@@ -0,0 +1,166 @@
+"""
+Uploads are read in chunks under a size cap, with their type sniffed from
+the first chunk and their SHA-256 computed as they arrive. Zip archives
+from batch uploads are listed up front and expanded entry by entry under
+the same checks, along the path the batch endpoint takes (plan_batch_items,
+then read_batch_item).
+"""
+import io
+import os
+import asyncio
+import hashlib
+import zipfile
+
+import pytest
+from fastapi import UploadFile
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:1')
+os.environ.setdefault('DB_NAME', 'test_ingest')
+os.environ.setdefault('LLM_BACKEND', 'mock')
+
+import ingest
+import server
+from ingest import (
+    ingest_upload, open_zip_upload, UploadRejected, UploadTooLarge, IngestedUpload, MAX_UPLOAD_BYTES, UPLOAD_CHUNK_SIZE
+)
+
+ALLOWED = ['pdf', 'docx', 'doc', 'txt']
+
+def make_zip(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in entries:
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+class CountingStream(io.BytesIO):
+    """Records how many bytes were read from it"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+def upload(filename, data):
+    return UploadFile(io.BytesIO(data), size=len(data), filename=filename)
+
+def test_upload_is_hashed_as_it_is_read():
+    data = b"Jane Doe\nEngineer\n" * (3 * UPLOAD_CHUNK_SIZE // 10)
+    result = asyncio.run(ingest_upload(upload("jane.txt", data), 'txt'))
+    assert result == IngestedUpload(data, len(data), hashlib.sha256(data).hexdigest())
+
+def test_oversized_upload_is_cut_off_early():
+    stream = CountingStream(b"a" * (MAX_UPLOAD_BYTES * 2))
+    # No declared size: the cap is enforced while streaming
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(ingest_upload(UploadFile(stream, filename="big.txt"), 'txt'))
+    assert stream.bytes_read <= MAX_UPLOAD_BYTES + UPLOAD_CHUNK_SIZE
+
+def test_content_must_match_the_extension():
+    for file_type, data in [
+        ('pdf', b"PK\x03\x04 a zip"),
+        ('docx', b"%PDF-1.4"),
+        ('doc', b"plain text"),
+        ('txt', b"%PDF-1.4\x00\x01 binary"),
+        ('txt', b"\xff\xfe not utf-8"),
+    ]:
+        stream = CountingStream(data * UPLOAD_CHUNK_SIZE)
+        with pytest.raises(UploadRejected, match="does not match"):
+            asyncio.run(ingest_upload(UploadFile(stream, filename=f"resume.{file_type}"), file_type))
+        # Rejected on the first chunk, before reading the rest
+        assert stream.bytes_read == UPLOAD_CHUNK_SIZE
+    for file_type, data in [('pdf', b"%PDF-1.4"), ('docx', b"PK\x03\x04"), ('doc', b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1")]:
+        assert asyncio.run(ingest_upload(upload(f"resume.{file_type}", data), file_type)).size == len(data)
+
+def test_upload_endpoint_maps_rejections_to_status_codes():
+    async def status(filename, data, size=None):
+        try:
+            await server.upload_resume(UploadFile(io.BytesIO(data), size=size, filename=filename))
+        except server.HTTPException as e:
+            return e.status_code
+
+    assert asyncio.run(status("big.txt", b"a" * (MAX_UPLOAD_BYTES + 1))) == 413
+    assert asyncio.run(status("big.txt", b"a", size=MAX_UPLOAD_BYTES + 1)) == 413
+    assert asyncio.run(status("fake.pdf", b"not a pdf")) == 400
+    assert asyncio.run(status("empty.txt", b"")) == 400
+
+async def read_planned(files):
+    """(filename, file_type, IngestedUpload or UploadRejected) per item, as the batch endpoint reads them"""
+    items, archives = await server.plan_batch_items(files)
+    results = []
+    for filename, file_type, source in items:
+        try:
+            if isinstance(source, UploadRejected):
+                raise source
+            result = await server.read_batch_item(file_type, source)
+        except UploadRejected as e:
+            result = e
+        results.append((filename, file_type, result))
+    for archive in archives:
+        archive.close()
+    return results
+
+def test_entries_are_checked_individually():
+    data = make_zip([
+        ("resumes/jane.txt", b"Jane Doe\nEngineer"),
+        ("resumes/john.pdf", b"%PDF-1.4 ..."),
+        ("resumes/fake.pdf", b"not a pdf"),
+        ("resumes/notes.xlsx", b"PK..."),
+        ("resumes/empty.txt", b""),
+        ("__MACOSX/resumes/._jane.txt", b"\x00\x05"),
+        ("resumes/.DS_Store", b"\x00"),
+    ])
+    items = asyncio.run(read_planned([upload("all.zip", data), upload("cover.txt", b"Dear team")]))
+    outcomes = {name: (file_type, type(result)) for name, file_type, result in items}
+    assert outcomes == {
+        "jane.txt": ("txt", IngestedUpload),
+        "john.pdf": ("pdf", IngestedUpload),
+        "fake.pdf": ("pdf", UploadRejected),
+        "notes.xlsx": ("xlsx", UploadRejected),
+        "empty.txt": ("txt", UploadRejected),
+        "cover.txt": ("txt", IngestedUpload),
+    }
+    assert items[0][2].data == b"Jane Doe\nEngineer"
+
+def test_oversized_entry_is_rejected():
+    data = make_zip([("big.txt", b"a" * (MAX_UPLOAD_BYTES + 1))])
+    [(_, _, result)] = asyncio.run(read_planned([upload("big.zip", data)]))
+    assert isinstance(result, UploadRejected)
+
+def test_archive_limits():
+    [(_, _, result)] = asyncio.run(read_planned([upload("bad.zip", b"PK\x03\x04 truncated")]))
+    assert isinstance(result, UploadRejected)
+    [(_, _, result)] = asyncio.run(read_planned([upload("fake.zip", b"%PDF-1.4")]))
+    assert isinstance(result, UploadRejected)
+    data = make_zip([(f"{n}.txt", b"resume") for n in range(3)])
+    with pytest.raises(UploadRejected):
+        asyncio.run(open_zip_upload(upload("large.zip", data), max_bytes=len(data) - 1))
+
+def test_too_many_files_rejects_the_batch(monkeypatch):
+    monkeypatch.setattr(server, 'BATCH_MAX_FILES', 2)
+    data = make_zip([(f"{n}.txt", b"resume") for n in range(3)])
+    [(_, _, result)] = asyncio.run(read_planned([upload("three.zip", data)]))
+    assert isinstance(result, UploadRejected)
+    with pytest.raises(server.HTTPException):
+        asyncio.run(read_planned([upload(f"{n}.txt", b"resume") for n in range(3)]))
+
+def test_expanded_size_is_capped_across_concurrent_reads(monkeypatch):
+    monkeypatch.setattr(ingest, 'MAX_ARCHIVE_EXPANDED_BYTES', 10 * 1000)
+    data = make_zip([(f"{n}.txt", b"a" * 1000) for n in range(12)])
+
+    async def scenario():
+        items, [archive] = await server.plan_batch_items([upload("many.zip", data)])
+        results = await asyncio.gather(
+            *(server.read_batch_item(file_type, source) for _, file_type, source in items), return_exceptions=True
+        )
+        archive.close()
+        return archive.expanded, results
+
+    expanded, results = asyncio.run(scenario())
+    assert expanded == 12 * 1000
+    assert sum(isinstance(result, IngestedUpload) for result in results) == 10
+    assert sum(isinstance(result, UploadRejected) for result in results) == 2
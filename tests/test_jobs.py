@@ -0,0 +1,57 @@
+"""
+A job that fails for good must be reported to on_failure, including one
+abandoned by its workers before its handler could run.
+"""
+import asyncio
+from types import SimpleNamespace
+
+from jobs import JobQueue, PermanentJobError
+
+class JobCollection:
+    """Accepts every owned update, recording it"""
+
+    def __init__(self):
+        self.updates = []
+
+    async def update_one(self, query, update):
+        self.updates.append(update["$set"])
+        return SimpleNamespace(matched_count=1)
+
+def make_job(attempts, max_attempts=3):
+    return {"id": "j1", "file_id": "r1", "worker_id": "w1", "attempts": attempts, "max_attempts": max_attempts}
+
+def run_job(job, handler):
+    failures = []
+
+    async def on_failure(job, error):
+        failures.append((job["id"], error))
+
+    queue = JobQueue(JobCollection(), handler, on_failure=on_failure)
+    asyncio.run(queue._run(job))
+    return queue, failures
+
+def test_abandoned_job_is_reported_without_running_the_handler():
+    calls = []
+
+    async def handler(job, report_progress):
+        calls.append(job["id"])
+
+    queue, failures = run_job(make_job(attempts=4), handler)
+    assert calls == []
+    assert failures == [("j1", "Job abandoned by its workers")]
+    assert queue.collection.updates[-1]["status"] == "failed"
+
+def test_failures_are_reported_only_once_retries_are_over():
+    async def handler(job, report_progress):
+        raise RuntimeError("LLM unavailable")
+
+    _, failures = run_job(make_job(attempts=1), handler)
+    assert failures == []
+    _, failures = run_job(make_job(attempts=3), handler)
+    assert failures == [("j1", "LLM unavailable")]
+
+    async def permanent(job, report_progress):
+        raise PermanentJobError("Resume not found")
+
+    _, failures = run_job(make_job(attempts=1), permanent)
+    assert failures == [("j1", "Resume not found")]
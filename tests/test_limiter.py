@@ -0,0 +1,78 @@
+"""
+The LLM limiter must not leak slots when queued callers are cancelled,
+must follow AIMD (additive increase, one halving per overloaded round) and
+must serve waiting callers round-robin.
+"""
+import asyncio
+
+from limiter import AdaptiveLimiter, caller_key
+
+class RateLimited(Exception):
+    status_code = 429
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+        await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        # Cancel, then release before the cancelled task gets to run
+        queued.cancel()
+        limiter._release()
+        assert limiter.in_flight == 0
+        await asyncio.wait_for(limiter.acquire(), timeout=1)
+        assert limiter.in_flight == 1
+        assert queued.cancelled()
+        assert limiter.stats()["waiting"] == 0
+    asyncio.run(scenario())
+
+def test_aimd():
+    async def scenario():
+        limiter = AdaptiveLimiter(initial_limit=4, max_limit=16)
+        async with limiter.slot():
+            pass
+        assert limiter.limit == 4.25
+
+        started = asyncio.Event()
+
+        async def rate_limited_call():
+            async with limiter.slot():
+                await started.wait()
+                raise RateLimited()
+
+        # Two calls of one round are rate limited: the limit halves once
+        calls = [asyncio.create_task(rate_limited_call()) for _ in range(2)]
+        await asyncio.sleep(0)
+        started.set()
+        await asyncio.gather(*calls, return_exceptions=True)
+        assert limiter.limit == 2.125
+        assert limiter.stats()["decreases"] == 1
+
+        # A call started after the decrease belongs to a new round
+        try:
+            async with limiter.slot():
+                raise RateLimited()
+        except RateLimited:
+            pass
+        assert limiter.limit == 1.0625
+    asyncio.run(scenario())
+
+def test_callers_are_served_round_robin():
+    async def scenario():
+        limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+        await limiter.acquire()
+        order = []
+
+        async def call(key, name):
+            caller_key.set(key)
+            await limiter.acquire()
+            order.append(name)
+            limiter._release()
+
+        tasks = [asyncio.create_task(call("long", f"long{n}")) for n in range(3)]
+        tasks.append(asyncio.create_task(call("short", "short")))
+        await asyncio.sleep(0)
+        limiter._release()
+        await asyncio.gather(*tasks)
+        assert order == ["long0", "short", "long1", "long2"]
+    asyncio.run(scenario())
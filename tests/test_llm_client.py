@@ -0,0 +1,57 @@
+"""
+The client pool reuses a chat client only after resetting its history to
+the system prompt; a client whose history it cannot find is used once and
+dropped, and a client whose call failed is discarded.
+"""
+import asyncio
+import logging
+
+import pytest
+
+from llm_client import LLMClientPool, HISTORY_ATTRIBUTES
+from providers import EmergentProvider, MockChat
+
+class OpaqueChat:
+    """A client that keeps its conversation somewhere the pool cannot see"""
+
+    def __init__(self, index):
+        self.index = index
+
+async def borrow(pool, message=None, fail=False):
+    async with pool.client() as chat:
+        if message:
+            chat.messages.append({"role": "user", "content": message})
+        if fail:
+            raise RuntimeError("call failed")
+        return chat
+
+def test_reused_client_starts_from_the_system_prompt():
+    pool = LLMClientPool(lambda index: MockChat("Clean this resume"), size=2)
+    first = asyncio.run(borrow(pool, "Jane Doe"))
+    second = asyncio.run(borrow(pool))
+    assert second is first
+    assert second.messages == [{"role": "system", "content": "Clean this resume"}]
+    stats = pool.stats()
+    assert (stats["created"], stats["reused"], stats["reuse_rate"]) == (1, 1, 0.5)
+
+def test_unresettable_client_is_never_reused(caplog):
+    pool = LLMClientPool(OpaqueChat, size=2)
+    with caplog.at_level(logging.WARNING, logger="llm_client"):
+        chats = [asyncio.run(borrow(pool)) for _ in range(3)]
+    assert [chat.index for chat in chats] == [0, 1, 2]
+    stats = pool.stats()
+    assert (stats["idle"], stats["reused"], stats["reset_unsupported"]) == (0, 0, 3)
+    # Warned once, not per call
+    assert len([r for r in caplog.records if "cannot be reset" in r.message]) == 1
+
+def test_failed_client_is_discarded():
+    pool = LLMClientPool(lambda index: MockChat("Clean this resume"), size=2)
+    with pytest.raises(RuntimeError):
+        asyncio.run(borrow(pool, "Jane Doe", fail=True))
+    assert (pool.stats()["idle"], pool.stats()["discarded"]) == (0, 1)
+
+def test_llm_chat_history_can_be_reset():
+    # Runs where emergentintegrations is installed: the pool only pays off if LlmChat is resettable
+    pytest.importorskip("emergentintegrations.llm.chat")
+    chat = EmergentProvider(api_key="test").create_chat(0, "Clean this resume")
+    assert any(isinstance(getattr(chat, attribute, None), list) for attribute in HISTORY_ATTRIBUTES)
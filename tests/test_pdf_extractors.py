@@ -0,0 +1,39 @@
+"""
+Every PDF extractor must return one text per requested page, so a clean
+resume scores above the quality threshold whichever extractor reads it.
+"""
+import fitz
+import pytest
+
+from extraction import PDF_EXTRACTORS, PDF_QUALITY_THRESHOLD, open_pdf, score_page_texts
+
+LINES = [
+    "Jane Doe, Senior Software Engineer",
+    "Led a team of five engineers building payment services in Python.",
+    "Reduced API latency by 40% by introducing caching and batching.",
+]
+
+def make_pdf(pages):
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        for index, line in enumerate(LINES):
+            page.insert_text((72, 72 + 20 * index), f"{line} Page {number + 1}.")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+@pytest.mark.parametrize("name, extract", PDF_EXTRACTORS)
+def test_one_page_resume_scores_above_threshold(name, extract):
+    with open_pdf(make_pdf(1)) as pdf:
+        page_texts = extract(pdf)
+    assert len(page_texts) == 1
+    assert score_page_texts(page_texts) >= PDF_QUALITY_THRESHOLD
+
+@pytest.mark.parametrize("name, extract", PDF_EXTRACTORS)
+def test_page_ranges(name, extract):
+    with open_pdf(make_pdf(3)) as pdf:
+        assert len(extract(pdf)) == 3
+        page_texts = extract(pdf, 1, 3)
+    assert len(page_texts) == 2
+    assert "Page 2." in page_texts[0] and "Page 3." in page_texts[1]
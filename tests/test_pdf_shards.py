@@ -0,0 +1,63 @@
+"""
+Long PDFs are split into page shards extracted in parallel; the merged text
+must be exactly what serial extraction gives, and short PDFs stay whole.
+"""
+import os
+import asyncio
+
+import fitz
+import pytest
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:1')
+os.environ.setdefault('DB_NAME', 'test_pdf_shards')
+os.environ.setdefault('LLM_BACKEND', 'mock')
+
+import server
+import extraction
+from executor import ExtractionExecutor
+from extraction import PDF_MIN_PAGES_PER_SHARD, plan_pdf_shards
+
+def make_pdf(pages):
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Project {number + 1}: led a team of five engineers building payment services.")
+        page.insert_text((72, 92), f"Reduced API latency by {number % 50 + 10}% with caching and batching.")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+@pytest.fixture(scope="module")
+def executor():
+    executor = ExtractionExecutor(kind="process", max_workers=3)
+    yield executor
+    executor.shutdown()
+
+def extract(monkeypatch, executor, data):
+    monkeypatch.setattr(server, 'extraction_executor', executor)
+    submitted = executor.stats()["submitted"]
+    result = asyncio.run(server.extract_text_from_pdf(data))
+    return result, executor.stats()["submitted"] - submitted
+
+def test_shards_cover_every_page_once():
+    for page_count in (1, 7, 20, 61, 200):
+        for workers in (1, 3, 8):
+            ranges = plan_pdf_shards(page_count, workers)
+            assert ranges[0][0] == 0 and ranges[-1][1] == page_count
+            assert all(stop == start for (_, stop), (start, _) in zip(ranges, ranges[1:]))
+            assert len(ranges) <= workers
+            assert len(ranges) == 1 or min(stop - start for start, stop in ranges) >= PDF_MIN_PAGES_PER_SHARD
+
+def test_sharded_text_matches_serial_extraction(monkeypatch, executor):
+    data = make_pdf(60)
+    result, jobs = extract(monkeypatch, executor, data)
+    # One job to count the pages, then one per shard
+    assert jobs == 1 + len(plan_pdf_shards(60, executor.max_workers)) > 2
+    assert result == extraction.extract_text_from_pdf(data)
+    assert "Project 1:" in result.text and "Project 60:" in result.text
+
+def test_short_pdf_is_extracted_in_one_job(monkeypatch, executor):
+    data = make_pdf(server.PDF_SHARD_PAGE_THRESHOLD - 1)
+    result, jobs = extract(monkeypatch, executor, data)
+    assert jobs == 1
+    assert result == extraction.extract_text_from_pdf(data)
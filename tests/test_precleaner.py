@@ -0,0 +1,49 @@
+"""
+Pre-cleaning edits must rebuild the pre-cleaned text from the original, and
+positions in the pre-cleaned text must map back onto the original.
+"""
+from precleaner import preclean, has_prose
+
+TEXT = (
+    "- i led a team ,managed budgets,,and hiring  for them !!\n"
+    "• Shipped the API so.. it scaled\n"
+    "- Python,Go  ,Docker\n"
+)
+
+def apply_edits(text, edits):
+    for edit in reversed(edits):
+        assert text[edit.start:edit.end] == edit.original
+        text = text[:edit.start] + edit.suggested + text[edit.end:]
+    return text
+
+def test_mechanical_fixes():
+    result = preclean(TEXT)
+    assert result.text == (
+        "- I led a team, managed budgets, and hiring for them!\n"
+        "- Shipped the API so. it scaled\n"
+        "- Python, Go, Docker\n"
+    )
+    assert apply_edits(TEXT, result.edits) == result.text
+    for edit in result.edits:
+        assert result.text[edit.pre_start:edit.pre_end] == edit.suggested
+
+def test_positions_map_to_original():
+    result = preclean(TEXT)
+    position = result.text.index("Shipped")
+    assert result.to_original(position) == TEXT.index("Shipped")
+    # Inside an edit, positions snap to the edit's bounds
+    edit = result.edits[1]
+    assert result.to_original(edit.pre_start + 1) == edit.start
+    assert result.to_original(edit.pre_start + 1, is_end=True) == edit.end
+    assert preclean("Clean text.").edits == []
+
+def test_has_prose():
+    assert has_prose("Led a team of five engineers building payment systems.")
+    assert has_prose("- Responsable for managment of budgets\n- Leaded team of five engineer")
+    assert has_prose("EXPERIENCE\n- Led team")
+    assert not has_prose("jane@example.com | +1 555 0100 | London")
+    assert not has_prose("Python, Go, Docker, Kubernetes, AWS, GCP, Terraform")
+    assert not has_prose("Jan 2019 - Present")
+    assert not has_prose("Jane Doe\njane@example.com\n+44 20 7946 0958\nlinkedin.com/in/jane")
+    assert not has_prose("SKILLS\nSkills: Python, Go, Docker")
+    assert not has_prose("Senior Software Engineer, Acme Corp (2019 - Present)")
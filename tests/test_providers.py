@@ -0,0 +1,69 @@
+"""
+The mock LLM backend must be deterministic apart from its simulated latency
+and failures, so load tests and CI runs are comparable.
+"""
+import json
+import asyncio
+import random
+
+import pytest
+
+from providers import LLMProvider, MockProvider, MockProviderError, parse_latency
+from limiter import is_rate_limit_error
+
+MESSAGE = "Please clean and improve this resume text:\n\nLed teh managment of seperate teams."
+
+def test_mock_rewrites_and_lists_edits():
+    provider = MockProvider(latency='constant:0')
+    chat = provider.create_chat(0, "Return ONLY the cleaned text")
+    assert asyncio.run(provider.send(chat, MESSAGE)) == "Led the management of separate teams."
+    assert [message["role"] for message in chat.messages] == ["system", "user", "assistant"]
+
+    chat = provider.create_chat(1, 'Return {"edits": [...]}')
+    edits = json.loads(asyncio.run(provider.send(chat, MESSAGE)))["edits"]
+    assert [(edit["find"], edit["replace"]) for edit in edits] == [
+        ("teh", "the"), ("managment", "management"), ("seperate", "separate")
+    ]
+
+def test_mock_streams_in_chunks():
+    provider = MockProvider(latency='constant:0')
+    chat = provider.create_chat(0, "Return ONLY the cleaned text")
+
+    async def collect():
+        return [chunk async for chunk in provider.stream(chat, MESSAGE)]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) > 1
+    assert "".join(chunks) == "Led the management of separate teams."
+
+def test_mock_failures_follow_the_seed():
+    def outcomes():
+        provider = MockProvider(latency='constant:0', error_rate=0.2, rate_limit_rate=0.3, seed=7)
+        results = []
+        for index in range(50):
+            try:
+                asyncio.run(provider.send(provider.create_chat(index, ""), MESSAGE))
+                results.append("ok")
+            except MockProviderError as e:
+                results.append("429" if is_rate_limit_error(e) else "500")
+        return results
+
+    results = outcomes()
+    assert results == outcomes()
+    assert {"ok", "429", "500"} == set(results)
+
+def test_latency_specs():
+    rng = random.Random(1)
+    assert parse_latency("constant:0.25")(rng) == 0.25
+    assert 1 <= parse_latency("uniform:1,2")(rng) <= 2
+    assert parse_latency("lognormal:0.5,0.3")(rng) > 0
+    with pytest.raises(ValueError):
+        parse_latency("gaussian:1")
+
+def test_provider_without_send_cannot_be_created():
+    class ChatOnly(LLMProvider):
+        def create_chat(self, index, system_message):
+            return object()
+
+    with pytest.raises(TypeError):
+        ChatOnly()
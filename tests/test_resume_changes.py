@@ -0,0 +1,67 @@
+"""
+Accepting every change clean_resume_text reports must reproduce its
+cleaned text, also where the LLM's edits and the pre-cleaner's fixes touch
+the same words. Runs the server's pipeline with the LLM call replaced.
+"""
+import os
+import re
+import random
+import asyncio
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:1')
+os.environ.setdefault('DB_NAME', 'test_resume_changes')
+os.environ.setdefault('LLM_BACKEND', 'mock')
+
+import server
+from executor import ExtractionTimeout, ExtractionWorkerCrashed
+
+def accept_all(text, changes):
+    return server.apply_accepted_changes(text, [{**change.dict(), "accepted": True} for change in changes])[0]
+
+def clean_with(monkeypatch, text, rewrite):
+    async def fake_clean(core, bypass_cache=False):
+        return rewrite(core)
+    monkeypatch.setattr(server, 'clean_text_cached', fake_clean)
+    return asyncio.run(server.clean_resume_text(text, 'sectioned'))
+
+def squash(text):
+    return re.sub(r'\s+', ' ', text).strip()
+
+def test_llm_changes_sharing_a_fix_are_merged(monkeypatch):
+    text = "with with •  i Python project"
+    cleaned, changes = clean_with(monkeypatch, text, lambda core: "with with very • Python project")
+    for change, following in zip(changes, changes[1:]):
+        assert change.end_pos <= following.start_pos
+    assert squash(accept_all(text, changes)) == squash(cleaned)
+
+def test_accepting_everything_gives_the_cleaned_text(monkeypatch):
+    rng = random.Random(5)
+    words = ["i", "led", "the", "teh", "team", "of", "five", "•", "budgets", "and", "Python", ",", "hiring."]
+    for _ in range(200):
+        text = "".join(rng.choice(words) + rng.choice([" ", " ", "  ", " ,", ",,"]) for _ in range(rng.randint(6, 30)))
+
+        def rewrite(core):
+            tokens = core.split(" ")
+            for _ in range(rng.randint(1, 4)):
+                position = rng.randrange(len(tokens) + 1)
+                tokens[position:position + rng.randint(0, 2)] = [rng.choice(words) for _ in range(rng.randint(0, 2))]
+            return " ".join(tokens)
+
+        cleaned, changes = clean_with(monkeypatch, text, rewrite)
+        assert squash(accept_all(text, changes)) == squash(cleaned), text
+
+def test_parallel_diff_falls_back_to_inline(monkeypatch):
+    # Every other line changes, so the diff has several regions to shard
+    original = "\n".join(f"line {n} {'teh' if n % 2 else 'the'} team" for n in range(40))
+    cleaned = original.replace("teh", "the")
+    expected = asyncio.run(server.diff_texts(original, cleaned))
+    monkeypatch.setattr(server, 'DIFF_PARALLEL_MIN_TOKENS', 0)
+    monkeypatch.setattr(server.extraction_executor, 'kind', 'process')
+    for error in (ExtractionTimeout("too slow"), ExtractionWorkerCrashed("crashed")):
+        attempts = []
+        async def fail(fn, *args):
+            attempts.append(fn)
+            raise error
+        monkeypatch.setattr(server.extraction_executor, 'run', fail)
+        assert asyncio.run(server.diff_texts(original, cleaned)) == expected
+        assert attempts
@@ -0,0 +1,50 @@
+"""
+split_sections must cover its input exactly, in order, so per-section
+cleaning results map back onto original-text offsets.
+"""
+import random
+
+from sections import split_sections, estimate_tokens, is_heading
+
+RESUME = (
+    "Jane Doe\njane@example.com\n\n"
+    "PROFESSIONAL SUMMARY\nBackend engineer with eight years of experience.\n\n"
+    "Experience:\n" + "Led a team that shipped a payments API used by millions.\n" * 40 + "\n"
+    "Education\nBSc Computer Science, 2015\n\n"
+    "SKILLS\nPython, Go, MongoDB, Docker\n"
+)
+
+def assert_exact_cover(text, sections):
+    position = 0
+    for section in sections:
+        assert section.start == position
+        assert text[section.start:section.end] == section.text
+        position = section.end
+    assert position == len(text)
+
+def test_headings():
+    assert is_heading("EXPERIENCE")
+    assert is_heading("Work Experience")
+    assert is_heading("Technical Skills:")
+    assert not is_heading("Led a team that shipped a payments API.")
+    assert not is_heading("")
+
+def test_resume_is_split_at_headings_within_budget():
+    sections = split_sections(RESUME, max_tokens=200, min_tokens=20)
+    assert_exact_cover(RESUME, sections)
+    assert len(sections) > 3
+    assert all(estimate_tokens(section.text) <= 200 for section in sections)
+    assert {"Experience", "Education"} <= {section.title for section in sections}
+
+def test_short_text_is_one_section():
+    assert split_sections("Jane Doe\nEngineer") == [("", 0, "Jane Doe\nEngineer")]
+    assert split_sections("") == []
+
+def test_random_text_is_covered_exactly():
+    rng = random.Random(20240611)
+    vocabulary = ["led", "built", "the", "api", "EXPERIENCE", "Skills:", "", "\t"]
+    for _ in range(200):
+        lines = [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(0, 25)))
+                 for _ in range(rng.randint(0, 200))]
+        text = "\n".join(lines) + rng.choice(["", "\n", "\n\n"])
+        assert_exact_cover(text, split_sections(text, max_tokens=120, min_tokens=30))